@@ -4,11 +4,11 @@ from contextlib import contextmanager
 import time
 from abc import ABC
 from enum import Enum
-from typing import Optional, cast, Callable, Any
+from typing import Optional, cast, Callable, Any, Union
 
 from pygame import Color, Surface, Rect
 
-from engine.tmx import TiledMap, TiledObjectGroup, BaseTiledLayer, TiledTileLayer, TiledObject, TiledTileset, TiledElement, confirm_attr_type
+from engine.tmx import TiledMap, TiledObjectGroup, BaseTiledLayer, TiledTileLayer, TiledObject, TiledTileset, TiledElement, ChunkedTileData, confirm_attr_type
 
 MAX_UNDO = 5
 CREATE_IMAGE = "create_image"
@@ -66,27 +66,41 @@ class TiledTileLayerChange(Change):
     def __init__(self, action_controller: 'ActionsController') -> None:
         super().__init__(ChangeKind.CHANGE_TILED_LAYER, action_controller)
         self.layer: Optional[TiledTileLayer] = None
-        self.before_data: list[list[int]] = [[]]
-        self.after_data: list[list[int]] = [[]]
+        self.before_data: Union[list[list[int]], ChunkedTileData] = [[]]
+        self.after_data: Union[list[list[int]], ChunkedTileData] = [[]]
 
     def prepare(self, previous: Optional['TiledTileLayerChange']) -> None:
         self.layer = self.action_controller.tiled_layer
         if previous is not None:
             self.before_data = previous.after_data
         else:
-            self.before_data = [row.copy() for row in self.layer.data]
+            self.before_data = self._copy_data()
 
     def fix(self) -> None:
-        self.after_data = [row.copy() for row in self.layer.data]
+        self.after_data = self._copy_data()
         self.fixed = True
 
     def undo(self) -> None:
-        for i in range(len(self.layer.data)):
-            self.layer.data[i][:] = self.before_data[i]
+        self._restore_data(self.before_data)
 
     def redo(self) -> None:
+        self._restore_data(self.after_data)
+
+    def _copy_data(self) -> Union[list[list[int]], ChunkedTileData]:
+        data = self.layer.data
+        if isinstance(data, ChunkedTileData):
+            # infinite layer - rows can start anywhere, so all allocated chunks are kept
+            return data.copy()
+        return [row.copy() for row in data]
+
+    def _restore_data(self, data: Union[list[list[int]], ChunkedTileData]) -> None:
+        if isinstance(data, ChunkedTileData):
+            # layer gets its own copy so the same data can be restored again
+            self.layer.data = data.copy()
+            return
         for i in range(len(self.layer.data)):
-            self.layer.data[i][:] = self.after_data[i]
+            self.layer.data[i][:] = data[i]
+        self.layer.tiles_changed()
 
 
 class MoveAndResizeObjectChange(Change):
@@ -134,11 +148,11 @@ class AddObjectChange(Change):
         self.layer = layer
 
     def undo(self) -> None:
-        del self.layer.objects_id_map[self.obj.id]
+        self.layer.remove_object(self.obj)
         self.action_controller.notify_delete_object_change(self.layer, self.obj)
 
     def redo(self) -> None:
-        self.layer.objects_id_map[self.obj.id] = self.obj
+        self.layer.add_object(self.obj)
         self.action_controller.notify_add_object_change(self.layer, self.obj)
 
 
@@ -149,11 +163,11 @@ class DeleteObjectChange(Change):
         self.layer = layer
 
     def undo(self) -> None:
-        self.layer.objects_id_map[self.obj.id] = self.obj
+        self.layer.add_object(self.obj)
         self.action_controller.notify_add_object_change(self.layer, self.obj)
 
     def redo(self) -> None:
-        del self.layer.objects_id_map[self.obj.id]
+        self.layer.remove_object(self.obj)
         self.action_controller.notify_delete_object_change(self.layer, self.obj)
 
 
@@ -166,9 +180,11 @@ class AddElementPropertyChange(Change):
 
     def undo(self) -> None:
         del self.element.properties[self.key]
+        self.element.dirty_data = True
 
     def redo(self) -> None:
         self.element.properties[self.key] = self.value
+        self.element.dirty_data = True
 
 
 class UpdateElementPropertyChange(Change):
@@ -181,9 +197,11 @@ class UpdateElementPropertyChange(Change):
 
     def undo(self) -> None:
         self.element.properties[self.key] = self.old_value
+        self.element.dirty_data = True
 
     def redo(self) -> None:
         self.element.properties[self.key] = self.new_value
+        self.element.dirty_data = True
 
 
 class DeleteElementPropertyChange(Change):
@@ -195,9 +213,11 @@ class DeleteElementPropertyChange(Change):
 
     def undo(self) -> None:
         self.element.properties[self.key] = self.old_value
+        self.element.dirty_data = True
 
     def redo(self) -> None:
         del self.element.properties[self.key]
+        self.element.dirty_data = True
 
 
 class UpdateElementAttributeChange(Change):
@@ -210,10 +230,12 @@ class UpdateElementAttributeChange(Change):
 
     def undo(self) -> None:
         setattr(self.element, self.key, self.old_value)
+        self.element.dirty_data = True
         self.action_controller.notify_element_attr_change(self.element, ChangeKind.UPDATE_ATTRIBUTE, self.key, self.old_value)
 
     def redo(self) -> None:
         setattr(self.element, self.key, self.new_value)
+        self.element.dirty_data = True
         self.action_controller.notify_element_attr_change(self.element, ChangeKind.UPDATE_ATTRIBUTE, self.key, self.new_value)
 
 
@@ -483,6 +505,8 @@ class ActionsController:
 
     def undo(self) -> None:
         with self.with_clean_flag():
+            # otherwise redo would fix the change again - with what undo left
+            self.fix_change()
             if self.pointer > 0:
                 if not self.changes[self.pointer - 1].fixed:
                     self.changes[self.pointer - 1].fix()
@@ -548,7 +572,7 @@ class ActionsController:
         if self.change_kind != ChangeKind.CHANGE_TILED_LAYER:
             self._add_change(TiledTileLayerChange(self))
 
-        self._tiled_layer.data[y][x] = gid
+        self._tiled_layer.set_gid_at(x, y, gid)
         self.last_change_timestamp = time.time()
 
     def move_object(self, obj: TiledObject, x: int, y: int) -> None:
@@ -575,7 +599,7 @@ class ActionsController:
         layer.map.nextobjectid += 1
         self._add_change(AddObjectChange(self, obj, layer))
 
-        layer.objects_id_map[obj.id] = obj
+        layer.add_object(obj)
 
         self.last_change_timestamp = time.time()
         self.notify_add_object_change(layer, obj)
@@ -583,7 +607,7 @@ class ActionsController:
     def delete_object(self, obj: TiledObject) -> None:
         layer = cast(TiledObjectGroup, obj.parent)
         self._add_change(DeleteObjectChange(self, obj, layer))
-        del layer.objects_id_map[obj.id]
+        layer.remove_object(obj)
 
         self.last_change_timestamp = time.time()
 
@@ -591,6 +615,7 @@ class ActionsController:
         self._add_change(AddElementPropertyChange(self, element, key, value))
 
         element.properties[key] = value
+        element.dirty_data = True
 
         self.last_change_timestamp = time.time()
         self.notify_element_property_change(element, ChangeKind.ADD_PROPERTY, key, value)
@@ -616,6 +641,7 @@ class ActionsController:
             element.properties[key] = float(value)
         else:
             element.properties[key] = value
+        element.dirty_data = True
 
         self.last_change_timestamp = time.time()
         self.notify_element_property_change(element, ChangeKind.UPDATE_PROPERTY, key, value)
@@ -623,6 +649,7 @@ class ActionsController:
     def delete_element_property(self, element: TiledElement, key: str) -> None:
         self._add_change(DeleteElementPropertyChange(self, element, key))
         del element.properties[key]
+        element.dirty_data = True
 
         self.last_change_timestamp = time.time()
         self.notify_element_property_change(element, ChangeKind.DELETE_PROPERTY, key, None)
@@ -649,6 +676,7 @@ class ActionsController:
         self._add_change(UpdateElementAttributeChange(self, element, key, value))
 
         setattr(element, key, value)
+        element.dirty_data = True
 
         self.last_change_timestamp = time.time()
         self.notify_element_attr_change(element, ChangeKind.UPDATE_ATTRIBUTE, key, value)
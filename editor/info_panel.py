@@ -53,10 +53,8 @@ class InfoPanel(Component):
 
     def tile_selection_changed(self, selection: Optional[list[list[int]]]) -> None:
         def original_gid(gid: int) -> int:
-            for tileset in self.actions_controller.tiled_map.tilesets:
-                if gid < tileset.firstgid + tileset.tilecount:
-                    return gid - tileset.firstgid
-            return -1
+            tileset_and_tile_id = self.actions_controller.tiled_map.tileset_for_gid(gid)
+            return tileset_and_tile_id[1] if tileset_and_tile_id is not None else -1
 
         selected_gid = selection[0][0] if selection is not None and len(selection) == 1 and len(selection[0]) == 1 else None
         if selected_gid is not None:
@@ -881,6 +881,7 @@ class MapController(ScrollableCanvas):
                 for y in range(s.y, s.bottom):
                     for x in range(s.x, s.right):
                         self._tiled_layer.data[y][x] = 0
+                self._tiled_layer.tiles_changed(s)
 
     def plot(self, x: int, y: int, gid: int) -> None:
         if self.is_in_selection(x, y):
@@ -53,7 +53,8 @@ class Debug:
         if not v:
             del self.game_context.player.previous_positions[:]
 
-    def draw(self, screen: Surface) -> None:
+    def draw(self, screen: Surface) -> list[Rect]:
+        rects = []
         screen_rect = screen.get_rect()
         if self.utilisation_rect.right != screen_rect.right or self.utilisation_rect.bottom != screen_rect.bottom:
             self.utilisation_rect = Rect(screen_rect.w - self._back_buffer_len - 2,
@@ -68,29 +69,29 @@ class Debug:
         del self._back_buffer[0]
 
         if self.debug_key_expected:
-            screen.blit(self.input_expected_text, (0, 0))
+            rects.append(screen.blit(self.input_expected_text, (0, 0)))
 
         if self.show_fps:
             fps = self.frameclock.get_fps()
-            screen.blit(self.debug_font_small.render(f"{fps:3.1f} fps", True, self.debug_colour_main), (screen_rect.right - 90, 0))
+            rects.append(screen.blit(self.debug_font_small.render(f"{fps:3.1f} fps", True, self.debug_colour_main), (screen_rect.right - 90, 0)))
 
         if self.show_player:
             player = self.game_context.player
-            screen.blit(
+            rects.append(screen.blit(
                 self.debug_font_small.render(f"P: {player.vx:3.1f},{player.vy:3.1f} {player.hit_velocity:3.1f} {'_' if player.on_the_ground else ' '}", True, self.debug_colour_main),
-                (200, 0))
+                (200, 0)))
 
         if self.show_utilisation:
-            pygame.draw.rect(screen,
-                             self.debug_colour_main,
-                             self.utilisation_rect,
-                             width=1)
+            rects.append(pygame.draw.rect(screen,
+                                          self.debug_colour_main,
+                                          self.utilisation_rect,
+                                          width=1))
             points = [
                 (self.utilisation_rect.x + 1 + i, self.utilisation_rect.bottom - v + 1) for i, v in enumerate(self._back_buffer)
             ]
             points.append((self.utilisation_rect.right, self.utilisation_rect.bottom))
             points.append((self.utilisation_rect.left, self.utilisation_rect.bottom + 1))
-            pygame.draw.polygon(screen, self.debug_colour_main, points)
+            rects.append(pygame.draw.polygon(screen, self.debug_colour_main, points))
 
         if self._show_jumps:
             if len(self.game_context.player.previous_positions) > 1:
@@ -100,4 +101,6 @@ class Debug:
                 positions = [
                     (x - xo, y - yo) for x, y in self.game_context.player.previous_positions
                 ]
-                pygame.draw.lines(screen, (255, 255, 255), False, positions, width=2)
+                rects.append(pygame.draw.lines(screen, (255, 255, 255), False, positions, width=2))
+
+        return rects
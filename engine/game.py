@@ -1,15 +1,44 @@
 from typing import Callable, Optional
 
 import pygame
-from pygame import Surface
+from pygame import Surface, Rect
 
 from engine.debug import Debug
 from engine.game_context import GameContext
+from engine.utils import merge_rects
+
+
+def open_display(window_size: tuple[int, int], scale: int = 1, flags: int = 0, vsync: bool = False) -> tuple[Surface, Optional[Surface]]:
+    """Opens window and returns surface of window_size // scale the game is drawn to and window Game scales it to.
+
+    Window is opened at whole multiple of the screen - window_size rounded down to multiple of scale. Window is None when screen is the window itself: when scale is 1, or with vsync (or pygame.SCALED in flags),
+    where SDL scales it on each flip or update by the largest whole multiple that fits the desktop and waits
+    for vertical blank. Without a renderer (like with dummy video driver) Game scales it instead.
+    """
+    size = (window_size[0] // scale, window_size[1] // scale)
+    if vsync or flags & pygame.SCALED:
+        try:
+            return pygame.display.set_mode(size, flags | pygame.SCALED, vsync=1 if vsync else 0), None
+        except pygame.error:
+            flags &= ~pygame.SCALED
+
+    window = pygame.display.set_mode((size[0] * scale, size[1] * scale), flags)
+    if scale == 1:
+        return window, None
+    return Surface(size).convert(), window
 
 
 class Game:
-    def __init__(self, screen: Surface, game_context: GameContext, framerate: int, debug: bool = False) -> None:
+    def __init__(self, screen: Surface, game_context: GameContext, framerate: int, debug: bool = False, dirty_rects: bool = False,
+                 window: Optional[Surface] = None) -> None:
         self.screen = screen
+        # when set, screen is scaled to it by whole multiple once a frame (see open_display)
+        self.window = window
+        self.scale = 1
+        if window is not None:
+            self.scale = window.get_width() // screen.get_width()
+            if window.get_size() != (screen.get_width() * self.scale, screen.get_height() * self.scale):
+                raise ValueError(f"Window of {window.get_size()} is not whole multiple of screen of {screen.get_size()}")
         self.game_context = game_context
         self.frameclock = pygame.time.Clock()
         self.framerate = 60
@@ -17,8 +46,14 @@ class Game:
 
         self.previous_keys = pygame.key.get_pressed()
         self.current_keys = pygame.key.get_pressed()
-        self.draw_before_map: Optional[Callable[[Surface], None]] = None
-        self.draw_after_map: Optional[Callable[[Surface], None]] = None
+        # both return screen areas they have drawn to, None when it could be anywhere
+        self.draw_before_map: Optional[Callable[[Surface], Optional[list[Rect]]]] = None
+        self.draw_after_map: Optional[Callable[[Surface], Optional[list[Rect]]]] = None
+
+        # only changed areas of screen are drawn and presented
+        self.dirty_rects = dirty_rects
+        # areas drawn over levels on last frame, None when whole screen is to be drawn
+        self._overlay_rects: Optional[list[Rect]] = None
 
     def main_loop(self) -> None:
         leave = False
@@ -37,9 +72,9 @@ class Game:
                             if event.key == pygame.K_k and event.mod & pygame.KMOD_LCTRL:
                                 self.debug.debug_key_expected = True
                 elif event.type == pygame.MOUSEBUTTONDOWN:
-                    self.game_context.process_mouse_down(event.pos)
+                    self.game_context.process_mouse_down((event.pos[0] // self.scale, event.pos[1] // self.scale))
                 elif event.type == pygame.MOUSEBUTTONUP:
-                    self.game_context.process_mouse_up(event.pos)
+                    self.game_context.process_mouse_up((event.pos[0] // self.scale, event.pos[1] // self.scale))
 
             self.previous_keys = self.current_keys
             self.current_keys = pygame.key.get_pressed()
@@ -55,12 +90,65 @@ class Game:
             elapsed_ms = self.frameclock.tick(60)
             self.game_context.animate(elapsed_ms)
 
+            if self.dirty_rects:
+                self.draw_dirty_rects()
+            else:
+                self.screen.fill((0, 0, 0))
+
+                if self.draw_before_map: self.draw_before_map(self.screen)
+                self.game_context.draw(self.screen)
+                if self.draw_after_map: self.draw_after_map(self.screen)
+                if self.debug: self.debug.draw(self.screen)
+
+                self.present()
+            self.frameclock.tick(self.framerate)
+
+    def draw_dirty_rects(self) -> None:
+        # Draws and presents only what changed - levels report what they rendered again, overlays what they drew.
+        # Where overlays were on last frame, levels are shown again and where nothing is known, everything is drawn.
+        overlay_rects = self._overlay_rects
+        if overlay_rects is None:
             self.screen.fill((0, 0, 0))
+        else:
+            for rect in overlay_rects:
+                self.screen.fill((0, 0, 0), rect)
+
+        before_rects = self.draw_before_map(self.screen) if self.draw_before_map else []
+        if overlay_rects is not None and before_rects is not None:
+            self.game_context.expose(overlay_rects + before_rects)
+        self.game_context.draw(self.screen)
+        level_rects = self.game_context.dirty_rects()
 
-            if self.draw_before_map: self.draw_before_map(self.screen)
-            self.game_context.draw(self.screen)
-            if self.draw_after_map: self.draw_after_map(self.screen)
-            if self.debug: self.debug.draw(self.screen)
+        after_rects = self.draw_after_map(self.screen) if self.draw_after_map else []
+        debug_rects = self.debug.draw(self.screen) if self.debug else []
 
+        overlays_known = after_rects is not None and debug_rects is not None
+        if overlay_rects is None or before_rects is None or level_rects is None or not overlays_known:
+            self.present()
+            # on screen that was not cleared, levels that cannot tell what they changed could have left anything
+            self._overlay_rects = after_rects + debug_rects if overlays_known and (overlay_rects is None or level_rects is not None) else None
+        else:
+            self._overlay_rects = after_rects + debug_rects
+            self.present(merge_rects(overlay_rects + before_rects + level_rects + self._overlay_rects))
+
+    def present(self, rects: Optional[list[Rect]] = None) -> None:
+        """Shows rects of screen (all of it when None), scaled to window when there is one"""
+        if self.window is not None:
+            scale = self.scale
+            if rects is None:
+                pygame.transform.scale(self.screen, self.window.get_size(), self.window)
+            else:
+                screen_rect = self.screen.get_rect()
+                window_rects = []
+                for rect in rects:
+                    rect = rect.clip(screen_rect)
+                    if rect.width > 0 and rect.height > 0:
+                        window_rect = Rect(rect.x * scale, rect.y * scale, rect.width * scale, rect.height * scale)
+                        pygame.transform.scale(self.screen.subsurface(rect), window_rect.size, self.window.subsurface(window_rect))
+                        window_rects.append(window_rect)
+                rects = window_rects
+
+        if rects is None:
             pygame.display.flip()
-            self.frameclock.tick(self.framerate)
+        else:
+            pygame.display.update(rects)
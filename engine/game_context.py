@@ -43,6 +43,9 @@ class GameContext(ABC):
 
         self._closure_objects_attribute_names = []
         self.visible_levels: dict[Level, LevelTransition] = {}
+        # transitions drawn on last draw - when they change, what is on screen is not known
+        self._drawn_transitions: list[LevelTransition] = []
+        self._transitions_changed = True
         self.player = Player()
         self.level_no = 1
         self.level: Optional[Level] = None
@@ -219,7 +222,7 @@ class GameContext(ABC):
 
     @property
     @in_context
-    def tiles_by_name(self) -> ChainMap[str, int]:
+    def tiles_by_name(self) -> dict[str, int]:
         return self.level.map.tiles_by_name
 
     @property
@@ -288,14 +291,33 @@ class GameContext(ABC):
         if activate:
             self.set_level(level)
 
+    def expose(self, rects: list[Rect]) -> None:
+        """Screen areas visible levels must be shown in again on next draw, as something was drawn over them"""
+        for level_transition in self.visible_levels.values():
+            level_transition.expose(rects)
+
+    def dirty_rects(self) -> Optional[list[Rect]]:
+        """Screen areas visible levels changed on last draw, None when they could be anywhere"""
+        if self._transitions_changed:
+            return None
+        rects = []
+        for level_transition in self._drawn_transitions:
+            if level_transition.dirty_rects is None:
+                return None
+            rects += level_transition.dirty_rects
+        return rects
+
     def draw(self, surface: Surface) -> None:
-        for level_transition in [lt for lt in self.visible_levels.values()]:
+        drawn_transitions = [lt for lt in self.visible_levels.values()]
+        for level_transition in drawn_transitions:
             replacement = level_transition.draw(surface)
             if replacement is not None:
                 if replacement.remove:
                     del self.visible_levels[level_transition.level]
                 else:
                     self.visible_levels[level_transition.level] = replacement
+        self._transitions_changed = drawn_transitions != self._drawn_transitions or drawn_transitions != list(self.visible_levels.values())
+        self._drawn_transitions = drawn_transitions
 
     def check_next_position(
             self,
@@ -404,8 +426,9 @@ class GameContext(ABC):
             level = self.level
             level_map = level.map
 
-            next_rect.x = min(max(0, int(next_rect.x + x)), level.width - level_map.tilewidth)
-            next_rect.y = min(max(0, int(next_rect.y + y)), level.height - level_map.tileheight)
+            map_rect = level.map_rect
+            next_rect.x = min(max(map_rect.x, int(next_rect.x + x)), map_rect.right - level_map.tilewidth)
+            next_rect.y = min(max(map_rect.y, int(next_rect.y + y)), map_rect.bottom - level_map.tileheight)
 
         if isinstance(obj, Player):
             if (next_rect.x < obj.restricted_rect.x
@@ -584,15 +607,16 @@ class GameContext(ABC):
 
     @in_context
     def teleport_to_object(self, who: PlayerOrObject, obj_name: str) -> None:
-        for obj in self.level.objects:
-            if obj.name == obj_name:
-                x = obj.rect.centerx
-                y = obj.rect.centery
-                self.move_object(who, x, y, absolute=True)
-                print(f"Teleported {who.name} to {x}, {y}")
-                self.prevent_moving()
-                self.level.invalidated = True
-                return
+        try:
+            obj = self.level.objects_by_name[obj_name]
+        except KeyError:
+            return
+        x = obj.rect.centerx
+        y = obj.rect.centery
+        self.move_object(who, x, y, absolute=True)
+        print(f"Teleported {who.name} to {x}, {y}")
+        self.prevent_moving()
+        self.level.invalidated = True
 
     @in_context
     def push_object(self, this: TiledObject, obj: TiledObject, test_collisions: bool = True) -> None:
@@ -1,5 +1,7 @@
 import math
 import os.path
+import sys
+import time
 from itertools import chain
 from typing import Union, Optional, cast, Any, Tuple
 
@@ -9,21 +11,36 @@ from pygame import Surface, Rect
 from engine.collision_result import CollisionResult
 from engine.level_context import LevelContext
 from engine.player import Player
-from engine.utils import clip
-from engine.tmx import TiledMap, TiledTileLayer, TiledObjectGroup, TiledObject, TiledGroupLayer, TileFlags, BaseTiledLayer
+from engine.utils import clip, merge_rects
+from engine.tmx_cache import load_map
+from engine.tmx import TiledMap, TiledTileLayer, TiledObjectGroup, TiledObject, TiledGroupLayer, TileFlags, BaseTiledLayer, TileChunkCache, \
+    CHUNK_CACHE_SIZE, CHUNK_CACHE_MEMORY
 from engine.walking_animation import Orientation, WalkingAnimation
 
 offscreen_rendering = True
+# offscreen surface is scrolled with the level and only what changed on it is rendered again
+scroll_rendering = True
+
+# when more areas than this or more than this share of the viewport changed, whole viewport is rendered
+MAX_DIRTY_AREAS = 48
+MAX_DIRTY_SHARE = 0.5
+
+# tile layers drawn one after another are composited into one set of chunks
+composite_layers = True
 
 
 class ObjectByNameWrapper:
-    def __init__(self, objects: dict[TiledObject, Rect]) -> None:
-        self.objects = objects
+    def __init__(self, level: 'Level') -> None:
+        self.level = level
 
     def __getitem__(self, key: str) -> TiledObject:
-        for obj in self.objects:
-            if obj.name == key:
-                return obj
+        # Level's objects are objects layer's objects without player
+        objects_layer = self.level.objects_layer
+        if objects_layer is not None:
+            # first object with that name that is not the player
+            for obj in objects_layer.objects_name_map.get(key, []):
+                if obj in self.level.objects:
+                    return obj
         raise KeyError(f"No object with name {key}")
 
     def __setitem__(self, key: str, value: TiledObject) -> None:
@@ -33,6 +50,35 @@ class ObjectByNameWrapper:
         raise NotImplemented()
 
 
+class CompositeTileLayers:
+    """Tile layers drawn one after another, baked into one set of chunks composited from all of them.
+
+    Maps that fit in max_memory get a single chunk covering the whole map. While any of the layers
+    is hidden, layers are drawn one by one (and not from chunks) instead.
+    """
+    def __init__(self, layers: list[TiledTileLayer], max_memory: int = CHUNK_CACHE_MEMORY) -> None:
+        self.layers = layers
+        tiled_map = layers[0].map
+        size = tiled_map.pixel_width, tiled_map.pixel_height
+        chunk_size = size if not tiled_map.infinite and size[0] * size[1] * 4 <= max_memory else CHUNK_CACHE_SIZE
+        self.chunk_cache = TileChunkCache(layers, chunk_size, max_memory)
+
+    @property
+    def visible(self) -> bool:
+        return any(layer.visible for layer in self.layers)
+
+    def composited(self) -> bool:
+        return all(layer.visible for layer in self.layers)
+
+    def draw(self, surface: Surface, viewport: Rect, xo: int, yo: int, current_time: Optional[float] = None) -> None:
+        if self.composited():
+            self.chunk_cache.draw(surface, viewport, xo, yo, current_time)
+        else:
+            for layer in self.layers:
+                if layer.visible:
+                    layer.draw(surface, viewport, xo, yo, current_time)
+
+
 class Level:
     @classmethod
     def load_levels(cls, screen_size: Rect, *filenames: Union[str, dict[str, str]], **named_filenames) -> dict[str, 'Level']:
@@ -41,8 +87,9 @@ class Level:
             filename = filename.replace("\\", "/")
             filename = filename.replace("/", os.path.sep)
 
-            tmx_data = TiledMap()
-            tmx_data.load(filename)
+            # Layers that are never drawn (parts of other levels, ignored layers) are never decoded,
+            # compiled cache next to the file is used when it is not stale and tilesets are shared between levels
+            tmx_data = load_map(filename, lazy_layers=True, shared_tilesets=True)
 
             if list(tmx_data.layers)[0].name.startswith("group_"):
                 return {f"{name}_{i}": Level(screen_size, tmx_data, i + 1) for i, l in enumerate([l for l in tmx_data.layers if l.name.startswith("group_")])}
@@ -65,12 +112,11 @@ class Level:
         self.map = tiled_map
         self.tile_width = tiled_map.tilewidth
         self.tile_height = tiled_map.tileheight
-        self.width = tiled_map.width * self.tile_width
-        self.height = tiled_map.height * self.tile_height
 
-        self.map_rect = Rect(0, 0, 0, 0)
-        self.map_rect.width = tiled_map.width * tiled_map.tilewidth
-        self.map_rect.height = tiled_map.height * tiled_map.tileheight
+        # for infinite maps this is painted area, which can start left of or above 0, 0
+        self.map_rect = tiled_map.rect.copy()
+        self.width = self.map_rect.width
+        self.height = self.map_rect.height
 
         self.part_no = part_no
 
@@ -90,12 +136,21 @@ class Level:
         self.objects_layer: Optional[TiledObjectGroup] = None
 
         self.objects: dict[TiledObject, Rect] = {}
-        self.objects_by_name = ObjectByNameWrapper(self.objects)
+        self.objects_by_name = ObjectByNameWrapper(self)
         self.player_object: Optional[TiledObject] = None
 
         self.invalidated = True
         self.always = True
 
+        # what offscreen_surface shows: offset and layers' visibility it was rendered with,
+        # objects' map rects and images and animation frames on it, and map areas changed since
+        self._rendered_surface: Optional[Surface] = None
+        self._rendered_offset = (0, 0)
+        self._rendered_visibility: list[bool] = []
+        self._rendered_objects: dict[TiledObject, tuple[Rect, Surface]] = {}
+        self._rendered_frame_gids: dict[int, int] = {}
+        self._changed_map_areas: Optional[list[Rect]] = []
+
         self.level_context_class_str = tiled_map.properties["level_context"] if "level_context" in tiled_map.properties else None
         self.level_context: Optional[LevelContext] = None
 
@@ -163,11 +218,34 @@ class Level:
         if self.over_layer is not None:
             self.layers.append(self.over_layer)
 
+        for layer in self.layers:
+            if isinstance(layer, TiledTileLayer):
+                layer.tiles_changed_callbacks.append(self._tiles_changed)
+
+        # what is drawn - runs of tile layers next to each other are drawn as one
+        runs: list[list[Union[TiledTileLayer, TiledObjectGroup]]] = []
+        for layer in self.layers:
+            if composite_layers and isinstance(layer, TiledTileLayer) and len(runs) > 0 and isinstance(runs[-1][-1], TiledTileLayer):
+                runs[-1].append(layer)
+            else:
+                runs.append([layer])
+
+        # tile layers are drawn from pre-rendered chunks - all caches of the level share CHUNK_CACHE_MEMORY
+        max_memory = CHUNK_CACHE_MEMORY // max(1, sum(1 for run in runs if isinstance(run[0], TiledTileLayer)))
+        self.drawn_layers: list[Union[TiledTileLayer, TiledObjectGroup, CompositeTileLayers]] = []
+        for run in runs:
+            if len(run) > 1:
+                self.drawn_layers.append(CompositeTileLayers(cast(list[TiledTileLayer], run), max_memory))
+                continue
+            layer = run[0]
+            if isinstance(layer, TiledTileLayer) and layer.chunk_cache is None:
+                layer.chunk_cache = TileChunkCache([layer], max_memory=max_memory)
+            self.drawn_layers.append(layer)
+
         self.on_collision_tiles_properties: dict[int, dict[str, Any]] = {}  # gid to tile properties where tile properties has 'on_collision' in
-        for tile_id in self.map.tiles:
-            properties = self.map.tiles[tile_id].properties
-            if "on_collision" in properties:
-                self.on_collision_tiles_properties[tile_id] = properties
+        for tile_id, tile in self.map.tiles.items():
+            if "on_collision" in tile:
+                self.on_collision_tiles_properties[tile_id] = tile.properties
 
         self.on_animate_objects: list[TiledObject] = [
             obj for obj in self.objects if "on_animate" in obj.properties
@@ -178,10 +256,9 @@ class Level:
             return t1[0]
 
         object_gids: dict[int, dict[Orientation, list[Tuple[int, int]]]] = {}
-        for tile_id in self.map.tiles:
-
-            properties = self.map.tiles[tile_id].properties
-            if len(properties) > 0:
+        for tile_id, tile in self.map.tiles.items():
+            if tile.has_properties():
+                properties = tile.properties
                 gid = tile_id
                 for obj in self.objects_layer.objects:
                     if obj.type in properties:
@@ -264,7 +341,7 @@ class Level:
     def start(self, player: Player) -> None:
         player.tiled_object = self.player_object
 
-        player.restricted_rect.update(0, 0, self.map.pixel_width, self.map.pixel_height)
+        player.restricted_rect.update(self.map_rect)
         self.player_object.visible = True
 
     def stop(self) -> None:
@@ -273,7 +350,7 @@ class Level:
     def remove_object(self, obj: TiledObject) -> None:
         if obj in self.objects:
             del self.objects[obj]
-            del self.objects_layer.objects_id_map[obj.id]
+            self.objects_layer.remove_object(obj)
 
     def objects_at_position(self, pos: tuple) -> list[TiledObject]:
         screen_pos = Rect(0, 0, 0, 0)
@@ -285,40 +362,167 @@ class Level:
                 res.append(obj)
         return res
 
-    def render_to(self, surface: Surface, xo: int, yo: int) -> None:
-        for layer in self.layers:
+    def _tiles_changed(self, _layer: TiledTileLayer, area: Optional[Rect]) -> None:
+        self.invalidated = True
+        if area is None:
+            self._changed_map_areas = None
+        elif self._changed_map_areas is not None:
+            self._changed_map_areas.append(Rect(area.x * self.tile_width, area.y * self.tile_height, area.width * self.tile_width, area.height * self.tile_height))
+
+    def render_to(self, surface: Surface, xo: int, yo: int, current_time: Optional[float] = None) -> None:
+        # one clock for the whole frame - animation frames are worked out once for all layers
+        if current_time is None:
+            current_time = time.time()
+        for layer in self.drawn_layers:
             if layer.visible:
                 # if offscreen_rendering:
-                layer.draw(surface, self.off_screen_viewport, xo, yo)
+                layer.draw(surface, self.off_screen_viewport, xo, yo, current_time)
+
+    def _render_area(self, surface: Surface, area: Rect, current_time: float) -> None:
+        # layers are drawn into area (of offscreen surface) only, at the same place render_to would draw them
+        xo = self.off_screen_viewport.x - self.x_offset - area.x
+        yo = self.off_screen_viewport.y - self.y_offset - area.y
+        with clip(surface, area):
+            surface.fill(self.background_colour, area)
+            for layer in self.drawn_layers:
+                if layer.visible:
+                    layer.draw(surface, area, xo, yo, current_time)
+
+    def render_offscreen(self, full: bool = False) -> list[Rect]:
+        """Brings offscreen_surface up to date and returns areas of it that changed.
+
+        With scroll_rendering it is scrolled by the change of offset and only newly exposed strips,
+        moved or changed objects, animated tiles that changed frame and changed tiles are rendered again.
+        """
+        if not (full or self.always or self.invalidated):
+            return []
+        self.invalidated = False
+
+        surface = self.offscreen_surface
+        area = self.off_screen_viewport.clip(surface.get_rect())
+        current_time = time.time()
+        frame_gids = self.map.animation_frame_gids(current_time)
+        visibility = [layer.visible for layer in self.layers]
+        objects = self._objects_on_screen(area.move(self.x_offset - self.off_screen_viewport.x, self.y_offset - self.off_screen_viewport.y))
+
+        dirty = None
+        if scroll_rendering and not full and surface is self._rendered_surface and visibility == self._rendered_visibility:
+            dirty = self._scroll_offscreen(surface, area, frame_gids, objects)
+
+        if dirty is None:
+            surface.fill(self.background_colour)
+            self.render_to(surface, -self.x_offset, -self.y_offset, current_time)
+            dirty = [area]
+        else:
+            for rect in dirty:
+                self._render_area(surface, rect, current_time)
+            if (self.x_offset, self.y_offset) != self._rendered_offset:
+                # all of it has moved
+                dirty = [area]
+
+        self._rendered_surface = surface
+        self._rendered_offset = (self.x_offset, self.y_offset)
+        self._rendered_visibility = visibility
+        self._rendered_objects = objects
+        self._rendered_frame_gids = frame_gids
+        self._changed_map_areas = []
+        return dirty
+
+    def _objects_on_screen(self, map_area: Rect) -> dict[TiledObject, tuple[Rect, Surface]]:
+        # only objects that can be in map_area are looked at
+        objects = {}
+        for layer in self.layers:
+            if isinstance(layer, TiledObjectGroup) and layer.visible:
+                for obj in layer.objects_in(map_area):
+                    image = obj.image
+                    if image and obj.visible:
+                        # a pixel around for positions that are not whole
+                        objects[obj] = (Rect(int(obj.x) - 1, int(obj.y) - 1, image.get_width() + 2, image.get_height() + 2), image)
+        return objects
+
+    def _scroll_offscreen(self, surface: Surface, area: Rect, frame_gids: dict[int, int], objects: dict[TiledObject, tuple[Rect, Surface]]) -> Optional[list[Rect]]:
+        # Scrolls what is on surface and returns areas that are to be rendered again, None when all of it should be
+        if self._changed_map_areas is None:
+            return None
+        dx = self._rendered_offset[0] - self.x_offset
+        dy = self._rendered_offset[1] - self.y_offset
+        if abs(dx) >= area.width or abs(dy) >= area.height:
+            return None
+
+        dirty = []
+        if dx != 0 or dy != 0:
+            with clip(surface, area):
+                surface.scroll(dx, dy)
+            if dx > 0:
+                dirty.append(Rect(area.x, area.y, dx, area.height))
+            elif dx < 0:
+                dirty.append(Rect(area.right + dx, area.y, -dx, area.height))
+            if dy > 0:
+                dirty.append(Rect(area.x, area.y, area.width, dy))
+            elif dy < 0:
+                dirty.append(Rect(area.x, area.bottom + dy, area.width, -dy))
+
+        # everything else is in map pixels
+        changed = self._changed_map_areas.copy()
+
+        rendered_objects = self._rendered_objects.copy()
+        for obj, drawn in objects.items():
+            rendered = rendered_objects.pop(obj, None)
+            if rendered != drawn:
+                changed.append(drawn[0])
+                if rendered is not None:
+                    changed.append(rendered[0])
+        changed.extend(rendered[0] for rendered in rendered_objects.values())
+
+        rendered_frame_gids = self._rendered_frame_gids
+        changed_gids = {gid for gid, frame_gid in frame_gids.items() if rendered_frame_gids.get(gid) != frame_gid}
+        if len(changed_gids) > 0:
+            tile_width = self.tile_width
+            tile_height = self.tile_height
+            first_column = self.x_offset // tile_width
+            first_row = self.y_offset // tile_height
+            visible_tiles = Rect(first_column, first_row,
+                                 (self.x_offset + area.width - 1) // tile_width - first_column + 1,
+                                 (self.y_offset + area.height - 1) // tile_height - first_row + 1)
+            for layer in self.layers:
+                if isinstance(layer, TiledTileLayer) and layer.visible:
+                    for x, y, gid in layer.animated_cells(visible_tiles):
+                        if gid in changed_gids:
+                            changed.append(Rect(x * tile_width, y * tile_height, tile_width, tile_height))
+
+        to_surface_x = self.off_screen_viewport.x - self.x_offset
+        to_surface_y = self.off_screen_viewport.y - self.y_offset
+        dirty.extend(rect.move(to_surface_x, to_surface_y).clip(area) for rect in changed)
+        dirty = merge_rects([rect for rect in dirty if rect.width > 0 and rect.height > 0])
+        if len(dirty) > MAX_DIRTY_AREAS or sum(rect.width * rect.height for rect in dirty) > area.width * area.height * MAX_DIRTY_SHARE:
+            return None
+        return dirty
 
     def draw(self, surface: Surface) -> None:
         with clip(surface, self.viewport) as clip_rect:
             if offscreen_rendering:
-                if self.always or self.invalidated:
-                    self.invalidated = False
-                    self.offscreen_surface.fill(self.background_colour)
-                    self.render_to(self.offscreen_surface, -self.x_offset, -self.y_offset)
+                self.render_offscreen()
                 surface.blit(self.offscreen_surface, self.viewport.topleft)
             else:
                 self.render_to(surface, clip_rect.x - self.x_offset, clip_rect.y - self.y_offset)
 
     def update_map_position(self, xy: tuple[int, int], speed: int = 0) -> None:
-        def place(screen_half: int, player_pos: float, map_width: int) -> int:
+        def place(screen_half: int, player_pos: float, map_start: int, map_width: int) -> int:
             player_pos = int(player_pos)
             offset = player_pos - screen_half
-            if offset < 0: offset = 0
-            if offset + 2 * screen_half > map_width: offset = map_width - 2 * screen_half
+            if offset < map_start: offset = map_start
+            if offset + 2 * screen_half > map_start + map_width: offset = map_start + map_width - 2 * screen_half
             return offset
 
         if self.map_rect.width < self.viewport.width:
-            xo = -(self.viewport.width - self.map_rect.width) // 2
+            xo = self.map_rect.x - (self.viewport.width - self.map_rect.width) // 2
         else:
-            xo = place(self.viewport.width // 2, xy[0], self.map_rect.width)
+            xo = place(self.viewport.width // 2, xy[0], self.map_rect.x, self.map_rect.width)
 
         if self.map_rect.height < self.viewport.height:
-            yo = -(self.viewport.height - self.map_rect.height) // 2
+            yo = self.map_rect.y - (self.viewport.height - self.map_rect.height) // 2
         else:
-            yo = place(self.viewport.height // 2, xy[1], self.map_rect.height)
+            yo = place(self.viewport.height // 2, xy[1], self.map_rect.y, self.map_rect.height)
 
         if xo != self.x_offset or yo != self.y_offset:
             self.invalidated = True
@@ -361,14 +565,18 @@ class Level:
         t_x = t_col * t_w
         t_y = t_row * t_h
 
+        # infinite maps have no right or bottom edge - cells are resolved through layers' chunks
+        rows = self.map.height if not self.map.infinite else sys.maxsize
+        columns = self.map.width if not self.map.infinite else sys.maxsize
+
         try:
-            while t_y + t_h >= rect.y and t_y < rect.bottom and t_row < self.map.height:
-                while t_x + t_w > rect.x and t_x < rect.right and t_col < self.map.width:
+            while t_y + t_h >= rect.y and t_y < rect.bottom and t_row < rows:
+                while t_x + t_w > rect.x and t_x < rect.right and t_col < columns:
                     collision_result.rects[collision_result.total].update(t_x, t_y, t_w, t_h)
-                    collision_result.gids[collision_result.total] = main_layer.data[t_row][t_col]
+                    collision_result.gids[collision_result.total] = main_layer.gid_at(t_col, t_row)
                     collision_result.total += 1
 
-                    background_gid = background_layer.data[t_row][t_col]
+                    background_gid = background_layer.gid_at(t_col, t_row)
                     if background_gid in tiled_map.tiles and "colliders" in tiled_map.tiles[background_gid].properties:
                         colliders: list[TiledObject] = tiled_map.tiles[background_gid].properties["colliders"]
                         collided_rect = next((r for r in map(lambda o: o.rect.move(t_x, t_y), colliders) if rect.colliderect(r)), None)
@@ -64,6 +64,7 @@ class Player(TiledObject):
         rect = self.rect
         old_pos = int_tuple(rect.topleft)
         new_pos = int_tuple(pos)
+        # rect is shared with tiled object - its layer is told about the move through it
         rect.topleft = pos
 
         if self.save_previous_positions:
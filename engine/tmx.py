@@ -1,15 +1,21 @@
 from pathlib import Path
 
 import gzip
+import inspect
+import io
 import itertools
 import logging
 import os
 import struct
+import sys
 import time
 import zlib
 from abc import ABC, abstractmethod
+from array import array
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 from base64 import b64decode, b64encode
-from collections import defaultdict, ChainMap, namedtuple
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, ChainMap, namedtuple, OrderedDict
 from copy import deepcopy
 from typing import Any, Optional, Callable, NamedTuple, Union, TypeVar, Iterable, cast, Mapping
 from xml.etree import ElementTree
@@ -19,6 +25,11 @@ import pygame
 from pygame import Surface, Rect, Color
 from pygame.transform import flip, rotate
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from engine.collision_result import CollisionResult
 
 from engine.helper import backup_file
@@ -36,6 +47,25 @@ TiledTileAnimation = namedtuple('TiledTileAnimation', ["tileid", "duration"])
 
 
 OUTPUT_ALWAYS = b"this is random value that will never appear in the value of attributes"
+# default of attribute lookups that must tell a missing attribute from one set to None
+_MISSING = object()
+
+IMAGE_LOADER_THREADS = min(8, os.cpu_count() or 1)
+LAYER_COMPRESSION_THREADS = min(8, os.cpu_count() or 1)
+
+# zlib/gzip compression levels for tile layer data
+COMPRESSION_LEVEL_FAST = 1
+COMPRESSION_LEVEL_DEFAULT = 6
+COMPRESSION_LEVEL_BEST = 9
+
+# size of chunks (in tiles) of new infinite layers - Tiled's default
+CHUNK_SIZE = 16
+
+# size (in pixels) of pre-rendered chunks of tile layers and memory one cache of them can take
+CHUNK_CACHE_SIZE = 256
+CHUNK_CACHE_MEMORY = 32 * 1024 * 1024
+# size (in pixels) of cells of object layers' spatial index
+OBJECTS_GRID_SIZE = 256
 
 
 def escape(data: str) -> str:
@@ -204,17 +234,181 @@ class TileFlags(NamedTuple):
 NO_TRANSFORM_TILE_FLAGS = TileFlags(False, False, False)
 
 
+def _row_area(x: Union[int, slice], y: int, width: int) -> Rect:
+    # area (in tiles) changed by writing to x (index or slice) of row y
+    if isinstance(x, slice):
+        return Rect(0, y, width, 1)
+    return Rect(x % width if width > 0 else x, y, 1, 1)
+
+
+class TileRow(list):
+    """Row of list backed tile layer - writes through it are tiles_changed of its layer"""
+    __slots__ = ("layer", "y")
+
+    def __init__(self, layer: Optional['TiledTileLayer'], y: int, gids: Iterable[int]) -> None:
+        super().__init__(gids)
+        self.layer = layer
+        self.y = y
+
+    def __setitem__(self, x: Union[int, slice], gid: Union[int, Iterable[int]]) -> None:
+        super().__setitem__(x, gid)
+        if self.layer is not None:
+            self.layer.tiles_changed(_row_area(x, self.y, len(self)))
+
+
+class CompactTileRow:
+    """Thin view over one row of compact layer storage. Reads return plain ints."""
+    __slots__ = ("row", "y", "layer")
+
+    def __init__(self, row: 'numpy.ndarray', y: int = 0, layer: Optional['TiledTileLayer'] = None) -> None:
+        self.row = row
+        self.y = y
+        self.layer = layer
+
+    def __getitem__(self, x: Union[int, slice]) -> Union[int, list[int]]:
+        if isinstance(x, slice):
+            return self.row[x].tolist()
+        return int(self.row[x])
+
+    def __setitem__(self, x: Union[int, slice], gid: Union[int, Iterable[int]]) -> None:
+        self.row[x] = gid
+        if self.layer is not None:
+            self.layer.tiles_changed(_row_area(x, self.y, len(self.row)))
+
+    def __len__(self) -> int:
+        return len(self.row)
+
+    def __iter__(self) -> Iterable[int]:
+        return iter(self.row.tolist())
+
+    def __eq__(self, other: Any) -> bool:
+        return self.row.tolist() == list(other)
+
+    def copy(self) -> list[int]:
+        return self.row.tolist()
+
+
+class CompactTileData:
+    """Thin view over contiguous uint32 2D array so existing data[y][x] users keep working."""
+    __slots__ = ("array", "layer")
+
+    def __init__(self, array: 'numpy.ndarray', layer: Optional['TiledTileLayer'] = None) -> None:
+        self.array = array
+        self.layer = layer
+
+    def __getitem__(self, y: int) -> CompactTileRow:
+        return CompactTileRow(self.array[y], y % self.array.shape[0], self.layer)
+
+    def __len__(self) -> int:
+        return self.array.shape[0]
+
+    def __iter__(self) -> Iterable[CompactTileRow]:
+        return (CompactTileRow(row, y, self.layer) for y, row in enumerate(self.array))
+
+    def tolist(self) -> list[list[int]]:
+        return self.array.tolist()
+
+
+class ChunkedTileRow:
+    """Thin view over one row of chunked layer storage. Cells outside of allocated chunks read as 0."""
+    __slots__ = ("chunks", "y")
+
+    def __init__(self, chunks: 'ChunkedTileData', y: int) -> None:
+        self.chunks = chunks
+        self.y = y
+
+    def __getitem__(self, x: int) -> int:
+        return self.chunks.get(x, self.y)
+
+    def __setitem__(self, x: int, gid: int) -> None:
+        self.chunks.set(x, self.y, gid)
+        if self.chunks.layer is not None:
+            self.chunks.layer.tiles_changed(Rect(x, self.y, 1, 1))
+
+
+class ChunkedTileData:
+    """Sparse storage of infinite layer - fixed size chunks keyed by chunk coordinate. Empty chunks are never allocated."""
+    __slots__ = ("chunk_width", "chunk_height", "chunks", "layer")
+
+    def __init__(self, chunk_width: int = CHUNK_SIZE, chunk_height: int = CHUNK_SIZE) -> None:
+        self.chunk_width = chunk_width
+        self.chunk_height = chunk_height
+        # (x // chunk_width, y // chunk_height) -> chunk_width * chunk_height gids, row by row
+        self.chunks: dict[tuple[int, int], list[int]] = {}
+        # layer that is told about writes through rows
+        self.layer: Optional['TiledTileLayer'] = None
+
+    def __getitem__(self, y: int) -> ChunkedTileRow:
+        return ChunkedTileRow(self, y)
+
+    def get(self, x: int, y: int) -> int:
+        chunk = self.chunks.get((x // self.chunk_width, y // self.chunk_height))
+        if chunk is None:
+            return 0
+        return chunk[(y % self.chunk_height) * self.chunk_width + x % self.chunk_width]
+
+    def set(self, x: int, y: int, gid: int) -> None:
+        key = x // self.chunk_width, y // self.chunk_height
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            if gid == 0:
+                return
+            chunk = [0] * (self.chunk_width * self.chunk_height)
+            self.chunks[key] = chunk
+        chunk[(y % self.chunk_height) * self.chunk_width + x % self.chunk_width] = gid
+
+    def set_area(self, x: int, y: int, width: int, gids: list[int]) -> None:
+        """Stores gids of width x (len(gids) // width) area (<chunk> element) with top left corner at x, y"""
+        if (width == self.chunk_width and len(gids) == self.chunk_width * self.chunk_height
+                and x % self.chunk_width == 0 and y % self.chunk_height == 0):
+            if any(gids):
+                self.chunks[(x // self.chunk_width, y // self.chunk_height)] = gids
+            return
+
+        for i, gid in enumerate(gids):
+            if gid:
+                self.set(x + i % width, y + i // width, gid)
+
+    def copy(self) -> 'ChunkedTileData':
+        """Copy of all allocated chunks, not attached to any layer"""
+        chunks = ChunkedTileData(self.chunk_width, self.chunk_height)
+        chunks.chunks = {key: chunk.copy() for key, chunk in self.chunks.items()}
+        return chunks
+
+    def sorted_chunks(self) -> list[tuple[tuple[int, int], list[int]]]:
+        """Allocated chunks top to bottom, left to right"""
+        return sorted(self.chunks.items(), key=lambda item: (item[0][1], item[0][0]))
+
+    def bounds(self) -> Rect:
+        """Area covered by allocated chunks, in tiles"""
+        if len(self.chunks) == 0:
+            return Rect(0, 0, 0, 0)
+        min_x = min(x for x, _ in self.chunks)
+        min_y = min(y for _, y in self.chunks)
+        max_x = max(x for x, _ in self.chunks)
+        max_y = max(y for _, y in self.chunks)
+        return Rect(
+            min_x * self.chunk_width, min_y * self.chunk_height,
+            (max_x - min_x + 1) * self.chunk_width, (max_y - min_y + 1) * self.chunk_height)
+
+
 class TiledElement(ABC):
+    # Empty so subclasses can be fully slotted; all other subclasses still get __dict__
+    __slots__ = ()
+
     ATTRIBUTES = {}
     OPTIONAL_CUSTOM_PROPERTIES = {}
 
     def __init__(self, parent: Optional['TiledElement'] = None) -> None:
         self.parent = parent
-        self.properties: dict[str, Any] = {}
+        self._init_properties()
         self.dirty_data = False
         # self.id: int = 0
         # self.name: str = ""
 
+    def _init_properties(self) -> None:
+        self.properties: dict[str, Any] = {}
+
     def __getitem__(self, key: str) -> Any:
         return self.properties[key]
 
@@ -242,7 +436,8 @@ class TiledElement(ABC):
         for subnode in node.findall("property"):
             cls: Optional[Callable[[Any], Any]] = PROPERTY_TYPES[subnode.get("type")] if "type" in subnode.keys() else None
 
-            name = subnode.get("name")
+            # the same few property names repeat across thousands of objects - share one string
+            name = sys.intern(subnode.get("name"))
 
             if "class" == subnode.get("type"):
                 raise NotImplemented("Class being type of property")
@@ -264,55 +459,93 @@ class TiledElement(ABC):
                 setattr(self, key, properties[key])
 
     def _parse_xml(self, node: Element) -> None:
+        self._parse_xml_attributes(node)
+
+        for child_node in list(node):
+            self._parse_xml_child(child_node)
+
+    @classmethod
+    def _attribute_binders(cls) -> dict[str, Optional[tuple[Callable[[str], Any], str]]]:
+        """XML attribute name to converter and name of attribute to set (None if element doesn't have it), of this class only"""
+        binders = cls.__dict__.get("_ATTRIBUTE_BINDERS")
+        if binders is None:
+            binders = {}
+            cls._ATTRIBUTE_BINDERS = binders
+        return binders
+
+    def _compile_attribute_binder(self, key: str) -> Optional[tuple[Callable[[str], Any], str]]:
+        if key in self.ATTRIBUTES:
+            converter = self.ATTRIBUTES[key].type
+            if converter is bool:
+                converter = convert_to_bool
+        else:
+            converter = TYPES[key]
+
+        # binder is shared by all instances of the class, so it is decided from what the class defines -
+        # only attributes the class does not define are looked up in (set by __init__ of) this instance
+        attribute = inspect.getattr_static(type(self), key, _MISSING)
+        if attribute is _MISSING:
+            attribute = inspect.getattr_static(self, key, _MISSING)
+            if attribute is _MISSING:
+                return None
+        if callable(attribute) or isinstance(attribute, (staticmethod, classmethod)):
+            return None
+
+        # read only properties are backed by attribute with the same name prefixed with '_'
+        if isinstance(attribute, property) and attribute.fset is None:
+            return converter, "_" + key
+        return converter, key
+
+    def _parse_xml_attributes(self, node: Element) -> None:
+        binders = self._attribute_binders()
         for key, value in node.items():
+            if key in binders:
+                binder = binders[key]
+            else:
+                binder = self._compile_attribute_binder(key)
+                binders[key] = binder
+
+            if binder is None:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Object {self} does not have attr {key}")
+                continue
+
+            converter, name = binder
             try:
-                if key in self.ATTRIBUTES:
-                    typ = self.ATTRIBUTES[key].type
-                    if typ is bool:
-                        typ = convert_to_bool
-                    casted_value = typ(value)
-                else:
-                    casted_value = TYPES[key](value)
+                casted_value = converter(value)
             except ValueError as e:
-                raise ValueError(f"Failed to convert {key} to type {typ}", e)
-            if hasattr(self, key) and not isinstance(getattr(self, key), Callable):
-                try:
-                    setattr(self, key, casted_value)
-                except AttributeError:
-                    setattr(self, "_" + key, casted_value)
-            else:
-                logger.debug(f"Object {self} does not have attr {key}")
+                raise ValueError(f"Failed to convert {key} to type {converter}", e)
+            setattr(self, name, casted_value)
 
+    def _parse_xml_child(self, child_node: Element) -> None:
         types = self.NODE_TYPES
 
-        for child_node in list(node):
-            if child_node.tag in types:
-                node_type = types[child_node.tag]
-
-                if node_type.factory_method:
-                    cast(Callable[[TiledElement, Element], None], node_type.factory_method)(self, child_node)
-                elif node_type.type_constructor:
-                    obj = cast(TiledElement, node_type.type_constructor(self))
-                    obj._parse_xml(child_node)
-                    if node_type.destination is not None:
-                        if hasattr(self, node_type.destination):
-                            destination = getattr(self, node_type.destination)
-                            if isinstance(destination, list):
-                                destination.append(obj)
-                            elif isinstance(destination, dict):
-                                name = getattr(obj, "name")
-                                destination[name] = obj
-                            elif isinstance(destination, Callable):
-                                destination(obj)
-                            else:
-                                if not isinstance(getattr(self, node_type.destination), Callable):
-                                    setattr(self, node_type.destination, obj)
+        if child_node.tag in types:
+            node_type = types[child_node.tag]
+
+            if node_type.factory_method:
+                cast(Callable[[TiledElement, Element], None], node_type.factory_method)(self, child_node)
+            elif node_type.type_constructor:
+                obj = cast(TiledElement, node_type.type_constructor(self))
+                obj._parse_xml(child_node)
+                if node_type.destination is not None:
+                    if hasattr(self, node_type.destination):
+                        destination = getattr(self, node_type.destination)
+                        if isinstance(destination, list):
+                            destination.append(obj)
+                        elif isinstance(destination, dict):
+                            name = getattr(obj, "name")
+                            destination[name] = obj
+                        elif callable(destination):
+                            destination(obj)
                         else:
-                            raise KeyError(f"Cannot set {child_node.tag} on {self}")
-                else:
-                    pass
+                            setattr(self, node_type.destination, obj)
+                    else:
+                        raise KeyError(f"Cannot set {child_node.tag} on {self}")
             else:
-                raise KeyError(f"Cannot set {child_node.tag} on {self} - no type defined")
+                pass
+        else:
+            raise KeyError(f"Cannot set {child_node.tag} on {self} - no type defined")
 
     def _save(self, stream, indent: int) -> None:
         tag = self._tag_name()
@@ -422,6 +655,8 @@ class TiledElement(ABC):
 
 
 class TiledSubElement(TiledElement, ABC):
+    __slots__ = ()
+
     def __init__(self, parent: Optional['TiledElement'] = None) -> None:
         super().__init__(parent)
 
@@ -433,6 +668,43 @@ class TiledSubElement(TiledElement, ABC):
             self.map: Optional[TiledMap] = tiled_map
 
 
+class LazyPropertiesElement(TiledElement, ABC):
+    """Element that comes in large numbers - its properties dictionary is created only when first used"""
+    __slots__ = ("_properties", )
+
+    def _init_properties(self) -> None:
+        self._properties: Optional[dict[str, Any]] = None
+
+    def _new_properties(self) -> dict[str, Any]:
+        return {}
+
+    @property
+    def properties(self) -> dict[str, Any]:
+        if self._properties is None:
+            self._properties = self._new_properties()
+        return self._properties
+
+    @properties.setter
+    def properties(self, properties: dict[str, Any]) -> None:
+        self._properties = properties
+
+    def has_properties(self) -> bool:
+        return self._properties is not None and len(self._properties) > 0
+
+    def __contains__(self, key: str) -> bool:
+        return self._properties is not None and key in self._properties
+
+    def _get_xml_properties(self) -> dict:
+        return super()._get_xml_properties() if self._properties is not None else {}
+
+    def _slots_state(self) -> dict[str, Any]:
+        return {
+            name: getattr(self, name)
+            for cls in type(self).__mro__ for name in cls.__dict__.get("__slots__", ())
+            if hasattr(self, name)
+        }
+
+
 class BaseTiledLayer(TiledSubElement, ABC):
     ATTRIBUTES = TiledElement.ATTRIBUTES | {
         "id": F(convert_to_int, False), "name": F(str, True),
@@ -461,18 +733,210 @@ class TiledTileLayer(BaseTiledLayer):
         self._width: int = int(self.map.width) if self.map is not None else 0
         self._height: int = int(self.map.height) if self.map is not None else 0
 
-        self.data: list[list[int]] = [[0] * self.width for _ in range(self.height)]
-        self.animate_layer: bool = False
+        self.compact: bool = self.map is not None and self.map.compact_layers
+        self.lazy: bool = self.map is not None and self.map.lazy_layers
+        # tiles of lazy layers are allocated (or decoded) only when first accessed
+        self._data: list[TileRow] = []
+        self._array: Optional['numpy.ndarray'] = None
+        # layers of infinite maps keep tiles in sparse chunks instead
+        self._chunks: Optional[ChunkedTileData] = None
+        if self.map is not None and self.map.infinite:
+            self._set_chunks(ChunkedTileData())
+        elif not self.lazy:
+            self._allocate()
+        self._animate_layer: bool = False
         self.original_encoding: Optional[str] = None
         self.original_compression: Optional[str] = None
+        # when lazy - undecoded content of <data> element or, from map cache, gids that were already registered
+        self._payload: Optional[Union[str, memoryview]] = None
+        # base64 content of <data> element as last loaded or saved - written again while layer is not dirty_data
+        self._saved_data: Optional[str] = None
+        # incremented on each change of tiles, callbacks are called with changed area in tiles (None for whole layer)
+        self.data_version: int = 0
+        self.tiles_changed_callbacks: list[Callable[['TiledTileLayer', Optional[Rect]], None]] = []
+        # when set, layer is drawn from pre-rendered chunks
+        self.chunk_cache: Optional['TileChunkCache'] = None
+        # what draw blitted last and what it depends on
+        self._blits_key: Optional[tuple] = None
+        self._blits: list[tuple[Surface, tuple[int, int]]] = []
+        self._animated_blits: list[tuple[int, int]] = []
+        # row to column to gid of cells with animated tiles - kept up to date by check_if_animated_gids and tiles_changed
+        self._animated_cells: dict[int, dict[int, int]] = {}
+
+    def __getstate__(self) -> dict:
+        # Tile data is stored separately (see engine.tmx_cache)
+        state = self.__dict__.copy()
+        state["_data"] = []
+        state["_array"] = None
+        state["_saved_data"] = None
+        state["tiles_changed_callbacks"] = []
+        state["chunk_cache"] = None
+        state["_blits_key"] = None
+        state["_blits"] = []
+        state["_animated_blits"] = []
+        return state
+
+    def _allocate(self) -> None:
+        if self.compact:
+            self._array = numpy.zeros((self._height, self._width), dtype=numpy.uint32)
+        else:
+            self._data = self._rows([0] * self.width for _ in range(self.height))
+
+    def _allocated(self) -> bool:
+        return self._chunks is not None or self._array is not None or len(self._data) > 0 or self._height == 0
+
+    def _set_chunks(self, chunks: Optional[ChunkedTileData]) -> None:
+        self._chunks = chunks
+        if chunks is not None:
+            chunks.layer = self
+
+    @property
+    def chunked(self) -> bool:
+        return self._chunks is not None
+
+    @property
+    def bounds(self) -> Rect:
+        """Area of the layer that can have tiles, in tiles"""
+        if self._chunks is not None:
+            return self._chunks.bounds()
+        return Rect(0, 0, self._width, self._height)
+
+    @property
+    def decoded(self) -> bool:
+        return self._payload is None
+
+    @property
+    def animate_layer(self) -> bool:
+        """Whether layer has cells with animated tiles - decodes lazy layer to find out"""
+        self._ensure_decoded()
+        return self._animate_layer
+
+    @animate_layer.setter
+    def animate_layer(self, animate_layer: bool) -> None:
+        self._animate_layer = animate_layer
+
+    def _ensure_decoded(self) -> None:
+        if self._payload is not None:
+            payload = self._payload
+            self._payload = None
+            if isinstance(payload, str):
+                self._decode(payload, self.original_encoding, self.original_compression)
+            else:
+                self._decode_registered_gids(payload)
+        elif not self._allocated():
+            # lazy layer that has no tiles to decode
+            self._allocate()
+
+    def load_registered_gids(self, gids: memoryview) -> None:
+        """Sets all tiles from little-endian uint32 gids already registered with the map (see engine.tmx_cache).
+        Lazy layer keeps them (and whatever buffer they are in) until it is first accessed."""
+        self._payload = gids
+        self._saved_data = None
+        if not self.lazy:
+            self._ensure_decoded()
+
+    @property
+    def data(self) -> Union[list[TileRow], CompactTileData, ChunkedTileData]:
+        """Tiles as data[y][x] - writes through rows are seen as tiles_changed"""
+        self._ensure_decoded()
+        if self._chunks is not None:
+            return self._chunks
+        if self._array is not None:
+            return CompactTileData(self._array, self)
+        return self._data
+
+    @data.setter
+    def data(self, data: Union[list[list[int]], CompactTileData, ChunkedTileData, 'numpy.ndarray']) -> None:
+        self._payload = None
+        if isinstance(data, ChunkedTileData):
+            self._set_chunks(data)
+            if self.map is not None:
+                self.map._map_rect = None
+        elif self.compact:
+            if isinstance(data, CompactTileData):
+                data = data.array
+            self._array = numpy.ascontiguousarray(data, dtype=numpy.uint32)
+        else:
+            # rows are copied into ones that tell this layer about writes
+            self._data = self._rows(data)
+        self.tiles_changed()
+
+    def _rows(self, rows: Iterable[Iterable[int]]) -> list[TileRow]:
+        return [TileRow(self, y, row) for y, row in enumerate(rows)]
+
+    def gid_at(self, x: int, y: int) -> int:
+        """Returns gid at given tile position, 0 outside of the layer"""
+        if self._chunks is not None:
+            return self._chunks.get(x, y)
+        if 0 <= x < self._width and 0 <= y < self._height:
+            self._ensure_decoded()
+            if self._array is not None:
+                return int(self._array[y, x])
+            return self._data[y][x]
+        return 0
+
+    def set_gid_at(self, x: int, y: int, gid: int) -> None:
+        """Sets gid at given tile position and invalidates only what was drawn from that cell"""
+        if self._chunks is not None:
+            self._chunks.set(x, y, gid)
+        else:
+            self._ensure_decoded()
+            if self._array is not None:
+                self._array[y, x] = gid
+            else:
+                # row calls tiles_changed itself
+                self._data[y][x] = gid
+                return
+        self.tiles_changed(Rect(x, y, 1, 1))
+
+    def tiles_changed(self, area: Optional[Rect] = None) -> None:
+        """Must be called after tiles were changed through data - area is in tiles, None for the whole layer"""
+        self.dirty_data = True
+        self.data_version += 1
+        self._index_animated_cells(area)
+        self._animate_layer = len(self._animated_cells) > 0
+        for callback in self.tiles_changed_callbacks:
+            callback(self, area)
+
+    def cells(self, area: Rect) -> Iterable[tuple[int, int, int]]:
+        """Yields X, Y, GID tuples for each non-empty tile in area (in tiles)"""
+        self._ensure_decoded()
+        if self._chunks is not None:
+            yield from self._chunks_cells(area)
+            return
+
+        area = area.clip(0, 0, self._width, self._height)
+        if self._array is not None:
+            rows = self._array[area.top:area.bottom, area.left:area.right].tolist()
+        else:
+            rows = [row[area.left:area.right] for row in self._data[area.top:area.bottom]]
+        for y, row in enumerate(rows, area.top):
+            for x, gid in enumerate(row, area.left):
+                if gid > 0:
+                    yield x, y, gid
 
     def _reshape(self, w: int, h: int) -> None:
-        data = [[0] * w for _ in range(h)]
-        for y in range(h):
-            if y < self._height:
-                l = min(w, self._width)
-                data[y][:l] = self.data[y][:l]
-        self.data = data
+        if self._chunks is not None:
+            # infinite layer - width and height only describe its bounds
+            return
+        if self._payload is None and not self._allocated():
+            # lazy layer - it is allocated with new size when first accessed
+            return
+        self._ensure_decoded()
+        if self._array is not None:
+            array = numpy.zeros((h, w), dtype=numpy.uint32)
+            rows = min(h, self._height)
+            columns = min(w, self._width)
+            array[:rows, :columns] = self._array[:rows, :columns]
+            self._array = array
+        else:
+            data = [[0] * w for _ in range(h)]
+            for y in range(h):
+                if y < self._height:
+                    l = min(w, self._width)
+                    data[y][:l] = self._data[y][:l]
+            self._data = self._rows(data)
+        self.tiles_changed()
 
     @property
     def width(self) -> int:
@@ -492,42 +956,165 @@ class TiledTileLayer(BaseTiledLayer):
         if self._height != h: self._reshape(self._width, h)
         self._height = h
 
+    @staticmethod
+    def _decode_base64(text: str, compression: Optional[str]) -> bytes:
+        if compression == "gzip":
+            return gzip.decompress(b64decode(text))
+        elif compression == "zlib":
+            return zlib.decompress(b64decode(text))
+        return b64decode(text)
+
     def _parse_xml_data(self, data_node: Element) -> None:
         encoding = data_node.get("encoding", None)
         compression = data_node.get("compression", None)
         self.original_encoding = encoding
         self.original_compression = compression
+
+        chunk_nodes = data_node.findall("chunk")
+        if len(chunk_nodes) > 0:
+            # Infinite map - chunks are always decoded straight away, they are not kept once empty ones are dropped
+            self._decode_chunks(chunk_nodes, encoding, compression)
+            return
+
+        if self._chunks is not None:
+            # Layer of infinite map that was saved with all its tiles in one block - decoding fills in its rows
+            self._set_chunks(None)
+
         if encoding == "base64":
-            if compression == "gzip":
-                data = gzip.decompress(b64decode(data_node.text))
-            elif compression == "zlib":
-                data = zlib.decompress(b64decode(data_node.text))
-            else:
-                data = b64decode(data_node.text)
-            data = list(struct.unpack("<%dL" % (len(data) // 4), data))
-        elif encoding == "csv":
-            data = [int(i) for i in data_node.text.split(",")]
+            self._saved_data = data_node.text.strip()
+
+        if self.lazy:
+            self._payload = data_node.text.strip()
         else:
-            raise NotImplementedError(f"Unknown encoding for data {encoding}")
+            self._decode(data_node.text, encoding, compression)
+
+    def _decode_chunks(self, chunk_nodes: list[Element], encoding: Optional[str], compression: Optional[str]) -> None:
+        chunks: Optional[ChunkedTileData] = None
+        register_raw_gid = self.map.register_raw_gid
+        for chunk_node in chunk_nodes:
+            width = int(chunk_node.get("width"))
+            if chunks is None:
+                chunks = ChunkedTileData(width, int(chunk_node.get("height")))
+            gids = [register_raw_gid(gid) for gid in self._decode_gids(chunk_node.text, encoding, compression)]
+            chunks.set_area(int(chunk_node.get("x")), int(chunk_node.get("y")), width, gids)
+        self._set_chunks(chunks)
+        self.check_if_animated_gids()
+
+    def _decode_gids(self, text: str, encoding: Optional[str], compression: Optional[str]) -> list[int]:
+        if encoding == "base64":
+            data = self._decode_base64(text, compression)
+            return list(struct.unpack("<%dL" % (len(data) // 4), data))
+        elif encoding == "csv":
+            return [int(i) for i in text.split(",")]
+        raise NotImplementedError(f"Unknown encoding for data {encoding}")
+
+    def _decode(self, text: str, encoding: Optional[str], compression: Optional[str]) -> None:
+        if self.compact:
+            self._decode_compact(text, encoding, compression)
+            return
+
+        data = self._decode_gids(text, encoding, compression)
 
         columns = int(self.width)
         for i in range(len(data)):
-            if i > 0:
-                data[i] = self.map.register_raw_gid(data[i])
+            data[i] = self.map.register_raw_gid(data[i])
 
-        self.data = [data[i: i + columns] for i in range(0, len(data), columns)]
+        self._data = self._rows(data[i: i + columns] for i in range(0, len(data), columns))
+        self.check_if_animated_gids()
+
+    def _decode_registered_gids(self, gids: memoryview) -> None:
+        width = self._width
+        height = self._height
+        if self.compact:
+            self._array = numpy.frombuffer(gids, dtype="<u4", count=width * height).reshape((height, width))
+        else:
+            with gids.cast("I") as cells:
+                flat = cells.tolist()
+            self._data = self._rows(flat[i: i + width] for i in range(0, len(flat), width))
+        self.check_if_animated_gids()
+
+    def _decode_compact(self, text: str, encoding: Optional[str], compression: Optional[str]) -> None:
+        if encoding == "base64":
+            array = numpy.frombuffer(self._decode_base64(text, compression), dtype="<u4")
+        elif encoding == "csv":
+            array = numpy.array([int(i) for i in text.split(",")], dtype=numpy.uint32)
+        else:
+            raise NotImplementedError(f"Unknown encoding for data {encoding}")
+
+        array = array.astype(numpy.uint32).reshape((int(self.height), int(self.width)))
+
+        # Only flipped/rotated (or otherwise unknown) gids need registering - do it once per distinct value,
+        # in order they are first seen, and map all cells in one pass
+        unknown = array > self.map.maxgid
+        raw_gids, first_seen, inverse = numpy.unique(array[unknown], return_index=True, return_inverse=True)
+        gids = numpy.empty(len(raw_gids), dtype=numpy.uint32)
+        for i in numpy.argsort(first_seen).tolist():
+            gids[i] = self.map.register_raw_gid(int(raw_gids[i]))
+        array[unknown] = gids[inverse]
+
+        self._array = array
         self.check_if_animated_gids()
 
     def check_if_animated_gids(self) -> None:
-        for row in self.data:
-            for gid in row:
-                if gid in self.map.tile_animations:
-                    self.animate_layer = True
-                    return
-        self.animate_layer = False
+        """Must be called after map's tile animations were changed"""
+        self._ensure_decoded()
+        self._index_animated_cells()
+        self._animate_layer = len(self._animated_cells) > 0
+
+    def _index_animated_cells(self, area: Optional[Rect] = None) -> None:
+        # Brings index of animated cells up to date in area (in tiles), in the whole layer when area is None
+        animated_cells = self._animated_cells
+        if area is None:
+            animated_cells.clear()
+        else:
+            for y in [y for y in animated_cells if area.top <= y < area.bottom]:
+                row = animated_cells[y]
+                for x in [x for x in row if area.left <= x < area.right]:
+                    del row[x]
+                if len(row) == 0:
+                    del animated_cells[y]
+
+        tile_animations = self.map.tile_animations
+        if len(tile_animations) == 0:
+            return
+        animated_gids = tile_animations.keys()
+
+        if self._chunks is not None:
+            if area is not None:
+                for x, y, gid in self._chunks_cells(area):
+                    if gid in tile_animations:
+                        animated_cells.setdefault(y, {})[x] = gid
+                return
+            chunk_width = self._chunks.chunk_width
+            chunk_height = self._chunks.chunk_height
+            for (chunk_x, chunk_y), chunk in self._chunks.chunks.items():
+                if not animated_gids.isdisjoint(chunk):
+                    for i, gid in enumerate(chunk):
+                        if gid in tile_animations:
+                            animated_cells.setdefault(chunk_y * chunk_height + i // chunk_width, {})[chunk_x * chunk_width + i % chunk_width] = gid
+            return
+
+        if area is not None:
+            area = area.clip(0, 0, self._width, self._height)
+        left, top = (area.left, area.top) if area is not None else (0, 0)
+        if self._array is not None:
+            array = self._array[top:area.bottom, left:area.right] if area is not None else self._array
+            rows, columns = numpy.nonzero(numpy.isin(array, list(animated_gids)))
+            for y, x in zip(rows.tolist(), columns.tolist()):
+                animated_cells.setdefault(top + y, {})[left + x] = int(array[y, x])
+            return
+
+        rows = [row[left:area.right] for row in self._data[top:area.bottom]] if area is not None else self._data
+        for y, row in enumerate(rows, top):
+            if not animated_gids.isdisjoint(row):
+                animated_cells.setdefault(y, {}).update((x, gid) for x, gid in enumerate(row, left) if gid in tile_animations)
 
     def _sub_xml(self, stream, indent: int, close_tag: bool) -> bool:
         close_tag = self._close_tag(stream, close_tag)
+        if isinstance(self._payload, str):
+            return self._write_payload(stream, indent, close_tag)
+        self._ensure_decoded()
+
         # encoding = self.original_encoding
         encoding = "base64"
         compression = self.original_compression
@@ -540,17 +1127,83 @@ class TiledTileLayer(BaseTiledLayer):
 
         stream.write(">\n")
         stream.write(" " * (indent + 1))
-        d = [self.map.gid_to_original_gid_and_tile_flags(gid) for gid in itertools.chain.from_iterable(self.data)]
+        if self.needs_encoding:
+            self._saved_data = self.encode_payload(self.map.compression_level)
+            self.dirty_data = False
+        if self._chunks is not None:
+            # one line per <chunk> tag and its content, indented by one more
+            stream.write(("\n" + " " * (indent + 1)).join(self._saved_data.split("\n")))
+        else:
+            stream.write(self._saved_data)
+
+        stream.write("\n")
+        stream.write(" " * indent)
+        stream.write("</data>\n")
+
+        return close_tag
 
-        data = struct.pack("<%dL" % len(d), *d)
+    @property
+    def needs_encoding(self) -> bool:
+        return not isinstance(self._payload, str) and (self.dirty_data or self._saved_data is None)
+
+    def encode_payload(self, compression_level: int = COMPRESSION_LEVEL_DEFAULT) -> str:
+        """Returns base64 content of <data> element compressed as layer was originally. Safe to call from other threads."""
+        if self._chunks is not None:
+            chunk_width = self._chunks.chunk_width
+            chunk_height = self._chunks.chunk_height
+            lines = []
+            for (chunk_x, chunk_y), chunk in self._chunks.sorted_chunks():
+                lines.append(f"<chunk x=\"{chunk_x * chunk_width}\" y=\"{chunk_y * chunk_height}\" width=\"{chunk_width}\" height=\"{chunk_height}\">")
+                lines.append(" " + self._compress(self._encode_cells(chunk, len(chunk)), compression_level))
+                lines.append("</chunk>")
+            return "\n".join(lines)
+
+        return self._compress(self._encode_data(), compression_level)
+
+    def _compress(self, data: Union[bytes, memoryview], compression_level: int) -> str:
+        compression = self.original_compression
         if compression == "gzip":
-            s = b64encode(gzip.compress(data))
+            s = b64encode(gzip.compress(data, compresslevel=compression_level))
         elif compression == "zlib":
-            s = b64encode(zlib.compress(data))
+            s = b64encode(zlib.compress(data, compression_level))
         else:
             s = b64encode(data)
-        stream.write(s.decode("ASCII"))
-
+        return s.decode("ASCII")
+
+    def _encode_data(self) -> Union[bytes, memoryview]:
+        """Returns original gids (with flip/rotate flags) of all cells as little-endian uint32 buffer"""
+        if self._array is not None:
+            return self._encode_cells(self._array, self._array.size)
+        return self._encode_cells(itertools.chain.from_iterable(self._data), sum(len(row) for row in self._data))
+
+    def _encode_cells(self, cells: Union[Iterable[int], 'numpy.ndarray'], count: int) -> Union[bytes, memoryview]:
+        table = self.map.original_gid_table()
+        if numpy is not None:
+            gids = cells if isinstance(cells, numpy.ndarray) else numpy.fromiter(cells, dtype=numpy.uint32, count=count)
+            if gids.size > 0 and int(gids.max()) >= len(table):
+                # gids that were never registered (shouldn't really happen) are written as they are
+                table = numpy.concatenate((table, numpy.arange(len(table), int(gids.max()) + 1, dtype=numpy.uint32)))
+            return memoryview(numpy.ascontiguousarray(table[gids], dtype="<u4")).cast("B")
+
+        size = len(table)
+        cells = list(cells)
+        try:
+            gids = array("I", map(table.__getitem__, cells))
+        except IndexError:
+            gids = array("I", (table[gid] if gid < size else gid for gid in cells))
+        if sys.byteorder != "little":
+            gids.byteswap()
+        return gids.tobytes()
+
+    def _write_payload(self, stream, indent: int, close_tag: bool) -> bool:
+        # Layer was never decoded so original <data> content is still valid
+        stream.write(" " * indent)
+        stream.write(f"<data encoding=\"{self.original_encoding}\"")
+        if self.original_compression is not None:
+            stream.write(f" compression=\"{self.original_compression}\"")
+        stream.write(">\n")
+        stream.write(" " * (indent + 1))
+        stream.write(self._payload)
         stream.write("\n")
         stream.write(" " * indent)
         stream.write("</data>\n")
@@ -566,7 +1219,15 @@ class TiledTileLayer(BaseTiledLayer):
             Iterable[Tuple[int, int, int]]: Iterator of X, Y, GID tuples for each tile in the layer.
 
         """
-        for y, row in enumerate(self.data):
+        self._ensure_decoded()
+        if self._chunks is not None:
+            chunk_width = self._chunks.chunk_width
+            for (chunk_x, chunk_y), chunk in self._chunks.sorted_chunks():
+                for i, gid in enumerate(chunk):
+                    yield chunk_x * chunk_width + i % chunk_width, chunk_y * self._chunks.chunk_height + i // chunk_width, gid
+            return
+
+        for y, row in enumerate(self._array.tolist() if self._array is not None else self._data):
             for x, gid in enumerate(row):
                 yield x, y, gid
 
@@ -577,69 +1238,295 @@ class TiledTileLayer(BaseTiledLayer):
             ???: Iterator of X, Y, Image tuples for each tile in the layer
 
         """
-        current_time = current_time if current_time is not None else time.time()
-        time_ms = int(current_time * 1000)
-
         images = self.map.images
 
+        self._ensure_decoded()
         if self.animate_layer:
+            frame_gids = self.map.animation_frame_gids(current_time if current_time is not None else time.time())
             for x, y, gid in [i for i in self.iter_data() if i[2]]:
-                if gid in self.map.tile_animations:
-                    gid = self.map.tile_animations[gid].get_gid(time_ms)
+                if gid in frame_gids:
+                    gid = frame_gids[gid]
                 yield x, y, images[gid]
         else:
             for x, y, gid in [i for i in self.iter_data() if i[2]]:
                 yield x, y, images[gid]
 
-    def draw(self, surface: Surface, viewport: Rect, xo: int, yo: int, current_time: Optional[float] = None) -> None:
-        current_time = current_time if current_time is not None else time.time()
-        time_ms = int(current_time * 1000)
+    def animated_cells(self, area: Rect) -> Iterable[tuple[int, int, int]]:
+        """Yields X, Y, GID tuples for each animated tile in area (in tiles)"""
+        self._ensure_decoded()
+        if not self.animate_layer:
+            return
+        animated_cells = self._animated_cells
+        for y in sorted(y for y in animated_cells if area.top <= y < area.bottom):
+            row = animated_cells[y]
+            for x in sorted(x for x in row if area.left <= x < area.right):
+                yield x, y, row[x]
 
-        if not self.map.prevent_drawing:
+    def draw(self, surface: Surface, viewport: Rect, xo: int, yo: int, current_time: Optional[float] = None) -> None:
+        if self.chunk_cache is not None:
+            self.chunk_cache.draw(surface, viewport, xo, yo, current_time)
+            return
+
+        if self.map.prevent_drawing:
+            return
+
+        # visible tiles are blitted in one call - what to blit is worked out again only when something it depends on changes
+        key = (viewport.x, viewport.y, viewport.width, viewport.height, xo, yo, self.data_version, self.map.images_version, self.animate_layer)
+        if key != self._blits_key:
+            self._blits, self._animated_blits = self._visible_blits(viewport, xo, yo)
+            self._blits_key = key
+
+        blits = self._blits
+        if len(self._animated_blits) > 0:
+            # all animated cells show the frame of the same moment
             images = self.map.images
-            width = self.map.width
-            height = self.map.height
-            tilewidth = self.map.tilewidth
-            tileheight = self.map.tileheight
-
-            dy = -(yo // tileheight) - 1  # -1 to ensure we always start one row above screen
-            oy = yo % tileheight if yo >= 0 else (yo % tileheight)
-            oy = oy - tileheight   # to ensure we always start one row above screen
-
-            start_dx = -(xo // tilewidth) - 1  # -1 to ensure we always start one row above screen
-            ox = xo % tilewidth if xo >= 0 else (xo % tilewidth)
-            ox = ox - tilewidth  # to ensure we always start one row above screen
-
-            if self.animate_layer:
-                for y in range(viewport.y + oy, viewport.bottom + tileheight, tileheight):
-                    if 0 <= dy < height:
-                        dx = start_dx
-                        for x in range(viewport.x + ox, viewport.right + tilewidth, tilewidth):
-                            if 0 <= dx < width:
-                                gid = self.data[dy][dx]
-                                if gid > 0:
-                                    if gid in self.map.tile_animations:
-                                        gid = self.map.tile_animations[gid].get_gid(time_ms)
-                                    surface.blit(images[gid], (x, y))
-                            dx += 1
-                    dy += 1
+            frame_gids = self.map.animation_frame_gids(current_time if current_time is not None else time.time())
+            for i, gid in self._animated_blits:
+                blits[i] = (images[frame_gids[gid]], blits[i][1])
+
+        fblits = getattr(surface, "fblits", None)
+        if fblits is not None:
+            fblits(blits)
+        else:
+            surface.blits(blits, doreturn=False)
+
+    def _visible_blits(self, viewport: Rect, xo: int, yo: int) -> tuple[list[tuple[Surface, tuple[int, int]]], list[tuple[int, int]]]:
+        # Returns image and position of each tile that intersects viewport and indices and gids of animated ones among them
+        self._ensure_decoded()
+        images = self.map.images
+        tilewidth = self.map.tilewidth
+        tileheight = self.map.tileheight
+        first_column = -xo // tilewidth
+        first_row = -yo // tileheight
+        area = Rect(first_column, first_row,
+                    (viewport.width - xo - 1) // tilewidth - first_column + 1,
+                    (viewport.height - yo - 1) // tileheight - first_row + 1)
+        xo += viewport.x
+        yo += viewport.y
+
+        # only cells in index of animated cells are looked at for animations
+        animated_cells = self._animated_cells if self.animate_layer else {}
+        blits = []
+        animated = []
+        if self._chunks is not None:
+            for column, row, gid in self._chunks_cells(area):
+                if row in animated_cells and column in animated_cells[row]:
+                    animated.append((len(blits), gid))
+                blits.append((images[gid], (xo + column * tilewidth, yo + row * tileheight)))
+        else:
+            area = area.clip(0, 0, self._width, self._height)
+            if self._array is not None:
+                rows = self._array[area.top:area.bottom, area.left:area.right].tolist()
             else:
-                for y in range(viewport.y + oy, viewport.bottom + tileheight, tileheight):
-                    if 0 <= dy < height:
-                        dx = start_dx
-                        for x in range(viewport.x + ox, viewport.right + tilewidth, tilewidth):
-                            if 0 <= dx < width:
-                                gid = self.data[dy][dx]
-                                if gid > 0:
-                                    surface.blit(images[gid], (x, y))
-                            dx += 1
-                    dy += 1
+                rows = [row[area.left:area.right] for row in self._data[area.top:area.bottom]]
+            x = xo + area.left * tilewidth
+            for y, row_animated, row in zip(range(yo + area.top * tileheight, yo + area.bottom * tileheight, tileheight),
+                                            (animated_cells.get(r) for r in range(area.top, area.bottom)), rows):
+                first = len(blits)
+                blits += [(images[gid], (x + i * tilewidth, y)) for i, gid in enumerate(row) if gid > 0]
+                if row_animated is not None:
+                    for column, gid in row_animated.items():
+                        i = column - area.left
+                        if 0 <= i < len(row):
+                            # index of cell among non-empty cells of the row
+                            animated.append((first + i - row[:i].count(0), gid))
+        return blits, animated
+
+    def _chunks_cells(self, area: Rect) -> Iterable[tuple[int, int, int]]:
+        # Only allocated chunks that intersect area are visited
+        chunks = self._chunks.chunks
+        chunk_width = self._chunks.chunk_width
+        chunk_height = self._chunks.chunk_height
+
+        for chunk_y in range(area.top // chunk_height, (area.bottom - 1) // chunk_height + 1):
+            chunk_top = chunk_y * chunk_height
+            rows = range(max(area.top, chunk_top), min(area.bottom, chunk_top + chunk_height))
+            for chunk_x in range(area.left // chunk_width, (area.right - 1) // chunk_width + 1):
+                chunk = chunks.get((chunk_x, chunk_y))
+                if chunk is None:
+                    continue
+                chunk_left = chunk_x * chunk_width
+                columns = range(max(area.left, chunk_left), min(area.right, chunk_left + chunk_width))
+                for row in rows:
+                    i = (row - chunk_top) * chunk_width - chunk_left
+                    for column in columns:
+                        gid = chunk[i + column]
+                        if gid > 0:
+                            yield column, row, gid
 
     NODE_TYPES = TiledElement.NODE_TYPES | {
         "data": NodeType(_parse_xml_data, None, None),
     }
 
 
+class TileChunkCache:
+    """Tile layers pre-rendered into chunk surfaces, so whole viewport takes a blit per chunk.
+
+    Chunks are rendered as they come into view and least recently drawn ones are dropped once there are
+    more of them than fit in max_memory. Changed tiles are rendered again in chunks they are in. Animated cells
+    (and tiles of later layers over them) are not rendered into chunks but drawn over them each frame.
+    """
+    def __init__(self, layers: list[TiledTileLayer], chunk_size: Union[int, tuple[int, int]] = CHUNK_CACHE_SIZE,
+                 max_memory: int = CHUNK_CACHE_MEMORY) -> None:
+        self.layers = layers
+        self.map = layers[0].map
+        # chunk_size is width and height of chunks (in pixels) or size of square chunks
+        self.chunk_width, self.chunk_height = (chunk_size, chunk_size) if isinstance(chunk_size, int) else chunk_size
+        self.max_chunks = max(1, max_memory // (self.chunk_width * self.chunk_height * 4))
+        # chunk position to surface (None when chunk has no static tiles) and animated cells (x, y in pixels and gid) in layers' order
+        self.chunks: OrderedDict[tuple[int, int], tuple[Optional[Surface], list[tuple[int, int, int]]]] = OrderedDict()
+        self.images_version = self.map.images_version
+        for layer in layers:
+            layer.tiles_changed_callbacks.append(self._tiles_changed)
+
+    def release(self) -> None:
+        for layer in self.layers:
+            layer.tiles_changed_callbacks.remove(self._tiles_changed)
+        self.chunks.clear()
+
+    def invalidate(self, area: Optional[Rect] = None) -> None:
+        """Drops chunks that intersect area (in pixels) or all chunks when area is None"""
+        if area is None:
+            self.chunks.clear()
+            return
+        width, height = self.chunk_width, self.chunk_height
+        first_x, last_x = area.left // width, (area.right - 1) // width
+        first_y, last_y = area.top // height, (area.bottom - 1) // height
+        for key in [key for key in self.chunks if first_x <= key[0] <= last_x and first_y <= key[1] <= last_y]:
+            del self.chunks[key]
+
+    def _tiles_changed(self, _layer: TiledTileLayer, area: Optional[Rect]) -> None:
+        if area is None:
+            self.invalidate()
+            return
+
+        # only changed tiles are rendered again in chunks that are already rendered
+        width, height = self.chunk_width, self.chunk_height
+        tilewidth = self.map.tilewidth
+        tileheight = self.map.tileheight
+        pixels = Rect(area.x * tilewidth, area.y * tileheight, area.width * tilewidth, area.height * tileheight)
+        for chunk_y in range(pixels.top // height, (pixels.bottom - 1) // height + 1):
+            for chunk_x in range(pixels.left // width, (pixels.right - 1) // width + 1):
+                key = (chunk_x, chunk_y)
+                if key in self.chunks:
+                    self.chunks[key] = self._render_tiles(chunk_x, chunk_y, area, self.chunks[key])
+
+    def _chunk_tiles(self, chunk_x: int, chunk_y: int) -> Rect:
+        # Returns area (in tiles) of all tiles that are at least partly in chunk
+        left = chunk_x * self.chunk_width
+        top = chunk_y * self.chunk_height
+        first_column = left // self.map.tilewidth
+        first_row = top // self.map.tileheight
+        return Rect(first_column, first_row,
+                    (left + self.chunk_width - 1) // self.map.tilewidth - first_column + 1,
+                    (top + self.chunk_height - 1) // self.map.tileheight - first_row + 1)
+
+    def _cells(self, area: Rect, left: int, top: int) -> tuple[list[tuple[Surface, tuple[int, int]]], list[tuple[int, int, int]]]:
+        # Returns blits of static cells in area relative to left, top and animated cells in it
+        images = self.map.images
+        tilewidth = self.map.tilewidth
+        tileheight = self.map.tileheight
+
+        blits = []
+        animated = []
+        # cells with animated tile in one of layers so far - tiles over it are drawn after it
+        animated_cells = set()
+        for layer in self.layers:
+            animated_cells.update((column, row) for column, row, _ in layer.animated_cells(area))
+            for column, row, gid in layer.cells(area):
+                if (column, row) in animated_cells:
+                    animated.append((column * tilewidth, row * tileheight, gid))
+                else:
+                    blits.append((images[gid], (column * tilewidth - left, row * tileheight - top)))
+        return blits, animated
+
+    def _render_chunk(self, chunk_x: int, chunk_y: int) -> tuple[Optional[Surface], list[tuple[int, int, int]]]:
+        blits, animated = self._cells(self._chunk_tiles(chunk_x, chunk_y), chunk_x * self.chunk_width, chunk_y * self.chunk_height)
+        if len(blits) == 0:
+            return None, animated
+
+        surface = Surface((self.chunk_width, self.chunk_height), pygame.SRCALPHA, 32)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        surface.blits(blits, doreturn=False)
+        return surface, animated
+
+    def _render_tiles(self, chunk_x: int, chunk_y: int, area: Rect,
+                      chunk: tuple[Optional[Surface], list[tuple[int, int, int]]]) -> tuple[Optional[Surface], list[tuple[int, int, int]]]:
+        # Renders area (in tiles) again on already rendered chunk
+        chunk_surface, animated = chunk
+        if chunk_surface is None:
+            return self._render_chunk(chunk_x, chunk_y)
+
+        tilewidth = self.map.tilewidth
+        tileheight = self.map.tileheight
+        left = chunk_x * self.chunk_width
+        top = chunk_y * self.chunk_height
+        area = area.clip(self._chunk_tiles(chunk_x, chunk_y))
+        pixels = Rect(area.x * tilewidth, area.y * tileheight, area.width * tilewidth, area.height * tileheight)
+
+        blits, area_animated = self._cells(area, left, top)
+        animated = [cell for cell in animated if not pixels.collidepoint(cell[0], cell[1])] + area_animated
+
+        previous_clip = chunk_surface.get_clip()
+        chunk_surface.set_clip(pixels.move(-left, -top))
+        chunk_surface.fill((0, 0, 0, 0))
+        chunk_surface.blits(blits, doreturn=False)
+        chunk_surface.set_clip(previous_clip)
+        return chunk_surface, animated
+
+    def draw(self, surface: Surface, viewport: Rect, xo: int, yo: int, current_time: Optional[float] = None) -> None:
+        if self.map.prevent_drawing:
+            return
+        if self.images_version != self.map.images_version:
+            self.chunks.clear()
+            self.images_version = self.map.images_version
+
+        width, height = self.chunk_width, self.chunk_height
+        chunks = self.chunks
+        # map pixels seen in viewport
+        left = -xo
+        top = -yo
+        right = left + viewport.width
+        bottom = top + viewport.height
+
+        blits = []
+        animated = []
+        for chunk_y in range(top // height, (bottom - 1) // height + 1):
+            y = viewport.y + yo + chunk_y * height
+            for chunk_x in range(left // width, (right - 1) // width + 1):
+                key = (chunk_x, chunk_y)
+                chunk = chunks.get(key)
+                if chunk is None:
+                    chunk = chunks[key] = self._render_chunk(chunk_x, chunk_y)
+                else:
+                    chunks.move_to_end(key)
+                chunk_surface, chunk_animated = chunk
+                if chunk_surface is not None:
+                    x = viewport.x + xo + chunk_x * width
+                    dest = Rect(x, y, width, height).clip(viewport)
+                    blits.append((chunk_surface, dest, dest.move(-x, -y)))
+                if len(chunk_animated) > 0:
+                    animated.append(chunk_animated)
+
+        while len(chunks) > self.max_chunks:
+            chunks.popitem(last=False)
+
+        if len(animated) > 0:
+            images = self.map.images
+            frame_gids = self.map.animation_frame_gids(current_time if current_time is not None else time.time())
+            left -= self.map.tilewidth
+            top -= self.map.tileheight
+            xo += viewport.x
+            yo += viewport.y
+            for cells in animated:
+                for x, y, gid in cells:
+                    if left < x < right and top < y < bottom:
+                        blits.append((images[frame_gids.get(gid, gid)], (x + xo, y + yo)))
+
+        surface.blits(blits, doreturn=False)
+
+
 class TiledGroupLayer(BaseTiledLayer):
     # TODO Implement this  loading, etc...
     def __init__(self, tiled_map: 'TiledMap') -> None:
@@ -653,7 +1540,72 @@ class TiledGroupLayer(BaseTiledLayer):
         raise NotImplemented("TiledGroupLayer.draw")
 
 
-class TiledObject(TiledSubElement):
+class ObjectRect(Rect):
+    """Rect of TiledObject - changes through it are seen by its object (and so by object's layer and saving).
+    Rects made from it (copies, moved or clipped rects) do not belong to any object."""
+    __slots__ = ("obj", )
+
+    def __init__(self, obj: Optional['TiledObject'], *rect: Any) -> None:
+        super().__init__(*rect)
+        Rect.__setattr__(self, "obj", obj)
+
+    def __reduce__(self) -> tuple:
+        return ObjectRect, (self.obj, self.x, self.y, self.width, self.height)
+
+    def _changed(self) -> None:
+        obj = getattr(self, "obj", None)
+        if obj is not None:
+            obj._rect_changed()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        Rect.__setattr__(self, name, value)
+        self._changed()
+
+    def __setitem__(self, key: Union[int, slice], value: Any) -> None:
+        Rect.__setitem__(self, key, value)
+        self._changed()
+
+    def update(self, *args: Any) -> None:
+        Rect.update(self, *args)
+        self._changed()
+
+    def move_ip(self, *args: Any) -> None:
+        Rect.move_ip(self, *args)
+        self._changed()
+
+    def inflate_ip(self, *args: Any) -> None:
+        Rect.inflate_ip(self, *args)
+        self._changed()
+
+    def scale_by_ip(self, *args: Any, **kwargs: Any) -> None:
+        Rect.scale_by_ip(self, *args, **kwargs)
+        self._changed()
+
+    def clamp_ip(self, *args: Any) -> None:
+        Rect.clamp_ip(self, *args)
+        self._changed()
+
+    def union_ip(self, *args: Any) -> None:
+        Rect.union_ip(self, *args)
+        self._changed()
+
+    def unionall_ip(self, *args: Any) -> None:
+        Rect.unionall_ip(self, *args)
+        self._changed()
+
+    def normalize(self) -> None:
+        Rect.normalize(self)
+        self._changed()
+
+
+class TiledObject(TiledSubElement, LazyPropertiesElement):
+    # Maps can have tens of thousands of objects - keep them compact
+    __slots__ = (
+        "parent", "dirty_data", "map", "layer", "id", "_name", "_type", "_gid", "visible", "solid", "pushable",
+        "_rect", "_next_rect", "_collisions", "collision_result", "vx", "vy", "speed",
+        "_image", "_animated", "_saved_xml"
+    )
+
     NODE_TYPES = TiledElement.NODE_TYPES | {
         "ellipse": NodeType(None, None, None),
     }
@@ -671,18 +1623,18 @@ class TiledObject(TiledSubElement):
         super().__init__(parent)
         self.layer = cast(TiledObjectGroup, parent)
         self.id: int = 0
-        self.name: str = ""
-        self.type: str = ""
+        self._name: str = ""
+        self._type: str = ""
 
-        self.properties: dict[str, Any] = NestedDict()
         self._gid: int = 0
         self.visible: bool = True
         self.solid: bool = False
         self.pushable: bool = False
 
-        self.rect = Rect(0, 0, 0, 0)
-        self.next_rect = Rect(0, 0, 0, 0)
-        self.collisions = set()
+        self._rect = ObjectRect(self, 0, 0, 0, 0)
+        # next_rect and collisions are only needed for objects that move or get collided with
+        self._next_rect: Optional[Rect] = None
+        self._collisions: Optional[set['TiledObject']] = None
         self.collision_result: Optional[CollisionResult] = None
 
         self.vx = 0.0
@@ -691,31 +1643,102 @@ class TiledObject(TiledSubElement):
 
         self._image: Optional[Surface] = None
         self._animated: bool = False
+        # indent, own properties and XML of this object as last saved - written again while object is not dirty_data
+        # and its properties are the same (they can be changed in place)
+        self._saved_xml: Optional[tuple[int, Optional[tuple], str]] = None
+
+    def __getstate__(self) -> tuple[Optional[dict], dict]:
+        state = self._slots_state()
+        state["_image"] = None
+        state["_animated"] = False
+        state["_saved_xml"] = None
+        # subclasses (like Player) can still have their own __dict__
+        return getattr(self, "__dict__", None), state
+
+    def _new_properties(self) -> dict[str, Any]:
+        return NestedDict()
+
+    @property
+    def name(self) -> str: return self._name
+
+    @name.setter
+    def name(self, name: str) -> None:
+        old_name = self._name
+        self._name = name
+        if self.layer is not None and old_name != name:
+            self.layer.reindex_object(self, old_name, self._type)
+
+    @property
+    def type(self) -> str: return self._type
+
+    @type.setter
+    def type(self, type_: str) -> None:
+        old_type = self._type
+        self._type = type_
+        if self.layer is not None and old_type != type_:
+            self.layer.reindex_object(self, self._name, old_type)
+
+    @property
+    def rect(self) -> Rect:
+        """Area of the object - it can be changed in place"""
+        return self._rect
+
+    @rect.setter
+    def rect(self, rect: Rect) -> None:
+        # rect of another object (like tiled object's of Player) is shared, any other becomes this object's own
+        if not isinstance(rect, ObjectRect) or getattr(rect, "obj", None) is None:
+            rect = ObjectRect(self, rect)
+        self._rect = rect
+        self._rect_changed()
+
+    def _rect_changed(self) -> None:
+        self.dirty_data = True
+        if self.layer is not None:
+            self.layer.object_moved(self)
+
+    @property
+    def next_rect(self) -> Rect:
+        if self._next_rect is None:
+            self._next_rect = Rect(0, 0, 0, 0)
+        return self._next_rect
 
     @property
-    def x(self) -> float: return self.rect.x
+    def collisions(self) -> set['TiledObject']:
+        if self._collisions is None:
+            self._collisions = set()
+        return self._collisions
+
+    @property
+    def x(self) -> float: return self._rect.x
 
     @x.setter
     def x(self, v: float) -> None:
-        self.rect.x = int(v)
+        # rect tells this object it was changed
+        self._rect.x = int(v)
 
     @property
-    def y(self) -> float: return self.rect.y
+    def y(self) -> float: return self._rect.y
 
     @y.setter
-    def y(self, v: float) -> None: self.rect.y = int(v)
+    def y(self, v: float) -> None:
+        # rect tells this object it was changed
+        self._rect.y = int(v)
 
     @property
-    def width(self) -> float: return self.rect.width
+    def width(self) -> float: return self._rect.width
 
     @width.setter
-    def width(self, v: float) -> None: self.rect.width = int(v)
+    def width(self, v: float) -> None:
+        # rect tells this object it was changed
+        self._rect.width = int(v)
 
     @property
-    def height(self) -> float: return self.rect.height
+    def height(self) -> float: return self._rect.height
 
     @height.setter
-    def height(self, v: float) -> None: self.rect.height = int(v)
+    def height(self, v: float) -> None:
+        # rect tells this object it was changed
+        self._rect.height = int(v)
 
     @property
     def gid(self) -> int:
@@ -734,22 +1757,28 @@ class TiledObject(TiledSubElement):
         if gid > 0:
             gid = self.map.register_raw_gid(gid)
         self._gid = gid
+        self.dirty_data = True
         self._image = None
         _ = self.image  # update image
+        if self.layer is not None:
+            self.layer.object_moved(self)
 
     def set_gid(self, gid: int) -> None:
         if gid > 0:
             gid = self.map.register_raw_gid(gid)
 
             if gid in self.map.tiles:
-                properties = self.map.tiles[gid].properties
-                if properties is not None:
-                    self.properties.over = properties
-                else:
+                tile = self.map.tiles[gid]
+                if tile.has_properties():
+                    self.properties.over = tile.properties
+                elif self._properties is not None:
                     self.properties.over = {}
         self._gid = gid
+        self.dirty_data = True
         self._image = None
         _ = self.image  # update image
+        if self.layer is not None:
+            self.layer.object_moved(self)
 
     def _parse_xml(self, node: Element) -> None:
         super()._parse_xml(node)
@@ -759,6 +1788,19 @@ class TiledObject(TiledSubElement):
 
     def _tag_name(self) -> str: return "object"
 
+    def _saved_properties(self) -> Optional[tuple]:
+        # properties this object saves - ones it has through its tile are not saved
+        return tuple(dict.items(self._properties)) if self._properties is not None else None
+
+    def _save(self, stream, indent: int) -> None:
+        saved_xml = self._saved_xml
+        if self.dirty_data or saved_xml is None or saved_xml[0] != indent or saved_xml[1] != self._saved_properties():
+            buffer = io.StringIO()
+            super()._save(buffer, indent)
+            saved_xml = self._saved_xml = indent, self._saved_properties(), buffer.getvalue()
+            self.dirty_data = False
+        stream.write(saved_xml[2])
+
     @property
     def image(self) -> Optional[Surface]:
         if self._image is None:
@@ -766,15 +1808,11 @@ class TiledObject(TiledSubElement):
             if not gid:
                 return None
             if gid in self.map.tile_animations:
-                time_ms = int(time.time() * 1000)
-                gid = self.map.tile_animations[gid].get_gid(time_ms)
+                gid = self.map.animation_frame_gids()[gid]
                 self._animated = True
             self._image = self.map.images[gid]
         elif self._animated:
-            time_ms = int(time.time() * 1000)
-            gid = self._gid
-            gid = self.map.tile_animations[gid].get_gid(time_ms)
-            self._image = self.map.images[gid]
+            self._image = self.map.images[self.map.animation_frame_gids()[self._gid]]
         return self._image
 
     def create_image(self, data: list[list[int]]) -> None:
@@ -803,8 +1841,8 @@ class TiledObject(TiledSubElement):
         obj.pushable = self.pushable
 
         obj.rect = self.rect.copy()
-        obj.next_rect = self.next_rect.copy()
-        obj.collisions = self.collisions.copy()
+        obj._next_rect = self._next_rect.copy() if self._next_rect is not None else None
+        obj._collisions = self._collisions.copy() if self._collisions is not None else None
 
         self.collision_result = None
         return obj
@@ -842,6 +1880,30 @@ class TiledObjectGroup(BaseTiledLayer, Mapping[str, TiledObject]):
         self.name: str = ""
         self.parent_tile_id: Optional[int] = None
         self.objects_id_map: dict[int, TiledObject] = {}
+        # only used by tile's object groups - ids of objects on map layers come from the map
+        self.nextobjectid: int = 1
+        # names (and types) are not unique - objects in order they were indexed; first one is 'the' object of that name
+        self.objects_name_map: dict[str, list[TiledObject]] = {}
+        self.objects_type_map: dict[str, list[TiledObject]] = {}
+        # spatial index, built when objects in an area are first asked for: grid cell to objects in it,
+        # area (in pixels) each object was indexed with and order objects were added in
+        self._grid: Optional[dict[tuple[int, int], dict[TiledObject, None]]] = None
+        self._grid_areas: dict[TiledObject, Rect] = {}
+        self._object_order: dict[TiledObject, int] = {}
+        self._next_order = 0
+        # objects of cells last asked for, in draw order, and what they depend on
+        self._area_objects_key: Optional[tuple] = None
+        self._area_objects: list[TiledObject] = []
+        self._grid_version = 0
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_grid"] = None
+        state["_grid_areas"] = {}
+        state["_object_order"] = {}
+        state["_area_objects_key"] = None
+        state["_area_objects"] = []
+        return state
 
     @property
     def objects(self) -> Iterable[TiledObject]:
@@ -851,11 +1913,14 @@ class TiledObjectGroup(BaseTiledLayer, Mapping[str, TiledObject]):
     def object_by_name(self) -> Mapping[str, TiledObject]:
         return self
 
+    def objects_of_type(self, type_: str) -> list[TiledObject]:
+        return self.objects_type_map.get(type_, [])
+
     def __getitem__(self, name: str) -> TiledObject:
-        for o in self.objects_id_map.values():
-            if o.name == name:
-                return o
-        raise KeyError(f"No object with name {name}")
+        objects = self.objects_name_map.get(name)
+        if not objects:
+            raise KeyError(f"No object with name {name}")
+        return objects[0]
 
     def __setitem__(self, key: str, _obj: Any) -> TiledObject:
         raise NotImplemented()
@@ -864,15 +1929,128 @@ class TiledObjectGroup(BaseTiledLayer, Mapping[str, TiledObject]):
         raise NotImplemented()
 
     def __iter__(self) -> Iterable[str]:
-        return [o.name for o in self.objects_id_map.values()]
+        return iter(self.objects_name_map)
 
     def __len__(self) -> int:
         return len(self.objects_id_map)
 
     def add_object(self, obj: TiledObject):
+        ids_owner = self if self.parent_tile_id is not None or self.map is None else self.map
         if obj.id == 0:
-            obj.id = (max(obj.id for obj in self.objects_id_map.values()) + 1) if len(self.objects_id_map) > 0 else 1
+            obj.id = max(ids_owner.nextobjectid, 1)
+        ids_owner.nextobjectid = max(ids_owner.nextobjectid, obj.id + 1)
         self.objects_id_map[obj.id] = obj
+        self._index(self.objects_name_map, obj.name, obj)
+        self._index(self.objects_type_map, obj.type, obj)
+        if self._grid is not None:
+            self._object_order[obj] = self._next_order
+            self._next_order += 1
+            self._grid_add(obj)
+
+    def remove_object(self, obj: TiledObject) -> None:
+        del self.objects_id_map[obj.id]
+        self._unindex(self.objects_name_map, obj.name, obj)
+        self._unindex(self.objects_type_map, obj.type, obj)
+        if self._grid is not None:
+            self._grid_remove(obj)
+            del self._object_order[obj]
+
+    def object_moved(self, obj: TiledObject) -> None:
+        """Called when object's rect or image changed - objects call it themselves, through their ObjectRect"""
+        if self._grid is not None and obj in self._grid_areas:
+            self._grid_remove(obj)
+            self._grid_add(obj)
+
+    def reindex_object(self, obj: TiledObject, old_name: str, old_type: str) -> None:
+        if self.objects_id_map.get(obj.id) is not obj:
+            return  # not (yet) in this layer
+        if old_name != obj.name:
+            self._unindex(self.objects_name_map, old_name, obj)
+            self._index(self.objects_name_map, obj.name, obj)
+        if old_type != obj.type:
+            self._unindex(self.objects_type_map, old_type, obj)
+            self._index(self.objects_type_map, obj.type, obj)
+
+    @staticmethod
+    def _index(index: dict[str, list[TiledObject]], key: str, obj: TiledObject) -> None:
+        if key in index:
+            index[key].append(obj)
+        else:
+            index[key] = [obj]
+
+    @staticmethod
+    def _unindex(index: dict[str, list[TiledObject]], key: str, obj: TiledObject) -> None:
+        objects = index[key]
+        objects.remove(obj)
+        if len(objects) == 0:
+            del index[key]
+
+    @staticmethod
+    def _object_area(obj: TiledObject) -> Rect:
+        # Area (in pixels) object covers - its rect or its image, whichever is bigger
+        image = obj.image
+        if image is None:
+            return obj.rect.copy()
+        return obj.rect.union(Rect(obj.rect.topleft, image.get_size()))
+
+    def _grid_add(self, obj: TiledObject) -> None:
+        area = self._object_area(obj)
+        self._grid_areas[obj] = area
+        size = OBJECTS_GRID_SIZE
+        for cell_y in range(area.top // size, (area.bottom - 1) // size + 1):
+            for cell_x in range(area.left // size, (area.right - 1) // size + 1):
+                self._grid.setdefault((cell_x, cell_y), {})[obj] = None
+        self._grid_version += 1
+
+    def _grid_remove(self, obj: TiledObject) -> None:
+        area = self._grid_areas.pop(obj)
+        size = OBJECTS_GRID_SIZE
+        for cell_y in range(area.top // size, (area.bottom - 1) // size + 1):
+            for cell_x in range(area.left // size, (area.right - 1) // size + 1):
+                cell = self._grid[(cell_x, cell_y)]
+                del cell[obj]
+                if len(cell) == 0:
+                    del self._grid[(cell_x, cell_y)]
+        self._grid_version += 1
+
+    def _draw_order_key(self) -> Callable[[TiledObject], Any]:
+        object_order = self._object_order
+        if self.draworder == "topdown":
+            # as Tiled does - by y, which is bottom of tile objects
+            return lambda obj: (obj.rect.bottom if obj.gid > 0 else obj.rect.y, object_order[obj])
+        return object_order.__getitem__
+
+    def objects_in(self, area: Rect) -> list[TiledObject]:
+        """Objects that can be in area (in pixels), in draw order - only grid cells area touches are visited"""
+        if self._grid is None:
+            self._grid = {}
+            self._object_order = {obj: i for i, obj in enumerate(self.objects)}
+            self._next_order = len(self._object_order)
+            for obj in self.objects:
+                self._grid_add(obj)
+
+        size = OBJECTS_GRID_SIZE
+        cells = (area.left // size, area.top // size, (area.right - 1) // size + 1, (area.bottom - 1) // size + 1)
+        key = cells, self._grid_version, self.draworder
+        if key != self._area_objects_key:
+            grid = self._grid
+            objects: dict[TiledObject, None] = {}
+            for cell_y in range(cells[1], cells[3]):
+                for cell_x in range(cells[0], cells[2]):
+                    cell = grid.get((cell_x, cell_y))
+                    if cell is not None:
+                        objects.update(cell)
+            if self._area_objects_key is not None and self._area_objects_key[0] == cells:
+                # same cells - previous order is mostly still right, sorting it again is close to linear
+                area_objects = [obj for obj in self._area_objects if obj in objects]
+                kept = set(area_objects)
+                area_objects += [obj for obj in objects if obj not in kept]
+            else:
+                area_objects = list(objects)
+            area_objects.sort(key=self._draw_order_key())
+            self._area_objects = area_objects
+            self._area_objects_key = key
+        return self._area_objects
 
     def _tag_name(self) -> str: return "objectgroup"
 
@@ -884,9 +2062,18 @@ class TiledObjectGroup(BaseTiledLayer, Mapping[str, TiledObject]):
         return close_tag
 
     def draw(self, surface: Surface, viewport: Rect, xo: int, yo: int, current_time: Optional[float] = None) -> None:
-        for obj in self.objects:
-            if obj.image and obj.visible:
-                surface.blit(obj.image, (obj.x + xo, obj.y + yo))
+        # animated objects' images are of this moment
+        self.map.animation_frame_gids(current_time if current_time is not None else time.time())
+        area = Rect(-xo, -yo, viewport.width, viewport.height)
+        xo += viewport.x
+        yo += viewport.y
+        blits = []
+        for obj in self.objects_in(area):
+            if obj.visible:
+                image = obj.image
+                if image is not None and area.colliderect(obj.x, obj.y, image.get_width(), image.get_height()):
+                    blits.append((image, (obj.x + xo, obj.y + yo)))
+        surface.blits(blits, doreturn=False)
 
     NODE_TYPES = TiledElement.NODE_TYPES | {
         "object": NodeType(None, TiledObject, "add_object"),
@@ -993,22 +2180,23 @@ class TiledWangSets(TiledElement):
 class TiledTileAnimations:
     def __init__(self) -> None:
         self.frames: list[TiledTileAnimation] = []
+        # time within animation at which each frame ends
+        self.frame_ends: list[int] = []
         self.total_animation_len = 0
 
     def add_frame(self, frame: TiledTileAnimation) -> None:
         self.frames.append(frame)
         self.total_animation_len += frame.duration
+        self.frame_ends.append(self.total_animation_len)
 
     def get_gid(self, time_ms: int) -> int:
-        r = time_ms % self.total_animation_len
-        for frame in self.frames:
-            r -= frame.duration
-            if r <= 0:
-                return frame.tileid
-        return self.frames[-1].tileid
+        return self.frames[bisect_left(self.frame_ends, time_ms % self.total_animation_len)].tileid
+
 
+class Tile(LazyPropertiesElement):
+    # Tilesets create one of these for each tile, whether it has anything of its own or not
+    __slots__ = ("parent", "dirty_data", "id", "tiledset", "type", "probability", "objectgroup", "terrain", "animations")
 
-class Tile(TiledElement):
     ATTRIBUTES = TiledElement.ATTRIBUTES | {
         "id": F(convert_to_int, False),
         "type": F(str, True),
@@ -1025,6 +2213,22 @@ class Tile(TiledElement):
         self.terrain: str = ""
         self.animations: Optional[TiledTileAnimations] = None
 
+    def _copy(self, tiledset: 'TiledTileset', memo: dict[int, Any]) -> 'Tile':
+        # Copy of tile for tiledset with its own properties dictionary and animations.
+        # Objects (collision shapes) in properties and objectgroup are not copied - they are shared
+        tile = Tile.__new__(Tile)
+        tile.parent = None if self.parent is None else tiledset
+        tile.dirty_data = self.dirty_data
+        tile.id = self.id
+        tile.tiledset = tiledset
+        tile.type = self.type
+        tile.probability = self.probability
+        tile.terrain = self.terrain
+        tile.objectgroup = self.objectgroup
+        tile._properties = None if self._properties is None else dict(self._properties)
+        tile.animations = None if self.animations is None else deepcopy(self.animations, memo)
+        return tile
+
     def _tag_name(self) -> str: return "tile"
 
 
@@ -1044,6 +2248,14 @@ class TiledTileset(TiledElement):
 
     XML_ATTRIBUTES_SHORT = {"firstgid": F(convert_to_int, False), "source": F(str, False)}
 
+    # attributes that are not taken over from shared tileset - everything else is loaded from TSX file
+    PER_MAP_ATTRIBUTES = frozenset({
+        "parent", "map", "firstgid", "_parent_dir", "_source_filename", "tile_animations",
+        "shared", "_tile_images", "dirty_image", "dirty_data"
+    })
+    # attributes taken over from shared tileset as they are - everything else is copied for each map
+    SHARED_ATTRIBUTES = frozenset({"_image_surface", "_image_future"})
+
     def __init__(self, parent: TiledElement) -> None:
         super().__init__(parent)
         self.map = cast(TiledMap, parent)
@@ -1052,7 +2264,11 @@ class TiledTileset(TiledElement):
         self.dirty_image = False
         self._source_filename: str = ""
         self._source_image_filename: str = ""
-        self.image_surface: Optional[Surface] = None
+        self._image_surface: Optional[Surface] = None
+        self._image_future: Optional[Future] = None
+        self._tile_images: Optional[list[Surface]] = None
+        # tileset from registry this one takes TSX data, image and tile images from
+        self.shared: Optional[TiledTileset] = None
         self.tiles: dict[int, Tile] = {}
         self.tile_terrain: dict[int, str] = {}
         self.tiles_by_name: dict[str, int] = {}
@@ -1080,6 +2296,45 @@ class TiledTileset(TiledElement):
         self._width: int = 0
         self._height: int = 0
 
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_image_surface"] = None
+        state["_image_future"] = None
+        state["_tile_images"] = None
+        state["shared"] = None
+        return state
+
+    @property
+    def image_surface(self) -> Optional[Surface]:
+        if self._image_future is not None:
+            self._image_surface = self._image_future.result()
+            self._image_future = None
+        return self._image_surface
+
+    @image_surface.setter
+    def image_surface(self, image_surface: Optional[Surface]) -> None:
+        self._image_future = None
+        self._image_surface = image_surface
+        self._tile_images = None
+        self.shared = None
+
+    def reload_image(self) -> None:
+        shared = self._registered_tileset(self._full_filename(self._source_filename)) if self.map is not None and self.map.shared_tilesets else None
+        if shared is not None:
+            # Tiles were restored with the rest of the map - only image is taken from the shared tileset
+            self.image_surface = shared.image_surface
+            self.shared = shared
+        else:
+            self.image_surface = pygame.image.load(self._image_full_filename(self._source_image_filename))
+
+    def tile_images(self) -> list[Surface]:
+        """Images of all tiles, indexed by tile id"""
+        if self.shared is not None:
+            return self.shared.tile_images()
+        if self._tile_images is None:
+            self._tile_images = [self.get_image(i + self.firstgid) for i in range(self._tilecount)]
+        return self._tile_images
+
     def update_shape(self, tilewidth: int, tileheight: int, columns: int, spacing: int, marign: int) -> None:
         self._tilewidth = tilewidth
         self._tileheight = tileheight
@@ -1298,9 +2553,55 @@ class TiledTileset(TiledElement):
         self._source_filename = filename
 
         full_filename = self._full_filename(filename)
+        if self.map is not None and self.map.shared_tilesets:
+            self._share(self._registered_tileset(full_filename))
+            return
+
         self._parse_xml(ElementTree.parse(full_filename).getroot())
         self._fill_in_tiles()
 
+    def _registered_tileset(self, full_filename: str) -> 'TiledTileset':
+        shared = tileset_registry.get(full_filename)
+        if shared is None:
+            shared = TiledTileset(self.map)
+            shared.firstgid = self.firstgid
+            shared.update_source_filename(os.path.abspath(full_filename), None)
+            shared._parse_xml(ElementTree.parse(full_filename).getroot())
+            shared._detach()
+            tileset_registry.add(full_filename, shared)
+        return shared
+
+    def _detach(self) -> None:
+        # Shared tileset must not keep the map it was loaded for (and everything in it) alive
+        self.parent = None
+        self.map = None
+        for tile in self.tiles.values():
+            if tile.objectgroup is not None:
+                tile.objectgroup.map = None
+                for obj in tile.objectgroup.objects:
+                    obj.map = None
+
+    def _share(self, shared: 'TiledTileset') -> None:
+        # Image, tile images and tiles' collision shapes are shared - tiles, their properties and animations are this map's own
+        memo = {id(shared): self}
+        for k, v in shared.__dict__.items():
+            if k in TiledTileset.SHARED_ATTRIBUTES:
+                self.__dict__[k] = v
+            elif k != "tiles" and k not in TiledTileset.PER_MAP_ATTRIBUTES:
+                self.__dict__[k] = deepcopy(v, memo)
+        self.tiles = {id_: tile._copy(self, memo) for id_, tile in shared.tiles.items()}
+        self.tile_animations = deepcopy(shared.tile_animations, memo)
+        self.shared = shared
+        self.dirty_image = False
+        self.dirty_data = False
+
+        delta = self.firstgid - shared.firstgid
+        if delta != 0:
+            # Frames of animations are gids - tiles have the same animations objects, so each is moved only once
+            for animations in {id(animations): animations for animations in self.tile_animations.values()}.values():
+                animations.frames = [TiledTileAnimation(frame.tileid + delta, frame.duration) for frame in animations.frames]
+            self.tile_animations = {gid + delta: animations for gid, animations in self.tile_animations.items()}
+
     def _fill_in_tiles(self) -> None:
         # Fill in all tiles for all ids and order them from one to more
         tiles = {k: v for k, v in self.tiles.items()}
@@ -1361,21 +2662,29 @@ class TiledTileset(TiledElement):
 
     def _load_image(self, image_element: Element) -> None:
         self._source_image_filename = image_element.get("source")
-        _width = int(image_element.get("width"))
-        _height = int(image_element.get("width"))
+        width = image_element.get("width")
+        height = image_element.get("height")
         if self._parent_dir is not None:
             full_filename = os.path.join(os.path.join(self._parent_dir, os.path.dirname(self._source_filename)), self._source_image_filename)
         else:
             full_filename = os.path.join(os.path.dirname(self._source_filename), self._source_image_filename)
-        self.image_surface = pygame.image.load(full_filename)
-        self._update_width_and_height()
+
+        image_loader = self.map.image_loader if self.map is not None else None
+        if image_loader is not None and width is not None and height is not None:
+            # Size from the element is enough to work out tiles - pixels are needed only when map fills in images
+            self._image_future = image_loader.submit(pygame.image.load, full_filename)
+            self._update_width_and_height(Rect(0, 0, int(width), int(height)))
+        else:
+            self.image_surface = pygame.image.load(full_filename)
+            self._update_width_and_height()
 
     def _update_image(self, image_surface: Surface) -> None:
         self.image_surface = image_surface
         self._update_width_and_height()
 
-    def _update_width_and_height(self) -> None:
-        self.image_rect = self.image_surface.get_rect()
+    def _update_width_and_height(self, image_rect: Optional[Rect] = None) -> None:
+        self._tile_images = None
+        self.image_rect = image_rect if image_rect is not None else self.image_surface.get_rect()
         # width = self.image_rect.width
         height = self.image_rect.height
         self._width = self._columns
@@ -1420,7 +2729,7 @@ class TiledTileset(TiledElement):
 
         for tile_id in self.tiles:
             tile = self.tiles[tile_id]
-            if float(tile.probability) != 1.0 or tile.type != "" or len(tile.properties) > 0 or tile_id in self.tile_terrain:
+            if float(tile.probability) != 1.0 or tile.type != "" or tile.has_properties() or tile_id in self.tile_terrain:
                 stream.write(" " * indent)
                 stream.write(f"<tile id=\"{tile_id}\"")
                 if tile.type != "":
@@ -1480,7 +2789,7 @@ class TiledTileset(TiledElement):
             objectgroup = TiledObjectGroup(self, draworder="index")
             objectgroup.parent_tile_id = id_
             objectgroup._parse_xml(obj_group_node)
-            properties["colliders"] = objectgroup.objects
+            properties["colliders"] = list(objectgroup.objects)
             tile.objectgroup = objectgroup
         if len(properties) > 0:
             if "name" in properties:
@@ -1495,7 +2804,8 @@ class TiledTileset(TiledElement):
                 animations.add_frame(TiledTileAnimation(frame_tileid, duration))
 
             # TODO remove try to change it to use tile.animations
-            self.tile_animations[id_] = animations
+            # keyed by gid, like animations made from "animated_id" properties - that is how layers look them up
+            self.tile_animations[id_ + self.firstgid] = animations
 
     def _tileoffset(self, tileoffset_element: Element) -> None:
         self.offset = (int(tileoffset_element.get("x")), int(tileoffset_element.get("y")))
@@ -1534,6 +2844,49 @@ class TiledTileset(TiledElement):
     }
 
 
+class TilesetRegistry:
+    """
+    Process wide registry of tilesets loaded from TSX files. Maps created with shared_tilesets=True take
+    image and tile images from here and copies of tile data, so each TSX file (and its image) is loaded only once for
+    all levels of a game. Registered tilesets must not be changed - editor should not use shared tilesets.
+    """
+    def __init__(self) -> None:
+        # absolute TSX filename -> (modification times of TSX and image files, tileset)
+        self._tilesets: dict[str, tuple[tuple[int, int], TiledTileset]] = {}
+
+    def __len__(self) -> int:
+        return len(self._tilesets)
+
+    @staticmethod
+    def _modification_times(filename: str, tileset: TiledTileset) -> tuple[int, int]:
+        return os.stat(filename).st_mtime_ns, os.stat(tileset._image_full_filename(tileset.image)).st_mtime_ns
+
+    def get(self, filename: str) -> Optional[TiledTileset]:
+        filename = os.path.abspath(filename)
+        if filename not in self._tilesets:
+            return None
+
+        modification_times, tileset = self._tilesets[filename]
+        try:
+            if (self._modification_times(filename, tileset) == modification_times
+                    and (tileset._image_future is None or not tileset._image_future.cancelled())):
+                return tileset
+        except OSError:
+            pass
+        del self._tilesets[filename]
+        return None
+
+    def add(self, filename: str, tileset: TiledTileset) -> None:
+        filename = os.path.abspath(filename)
+        self._tilesets[filename] = (self._modification_times(filename, tileset), tileset)
+
+    def clear(self) -> None:
+        self._tilesets.clear()
+
+
+tileset_registry = TilesetRegistry()
+
+
 class TiledMap(TiledElement):
     NODE_TYPES = TiledElement.NODE_TYPES | {
         "tileset": NodeType(None, TiledTileset, "add_tileset"),
@@ -1555,17 +2908,26 @@ class TiledMap(TiledElement):
         "python_file": F(Path, True)
     }
 
-    def __init__(self, invert_y: bool = True) -> None:
+    def __init__(self, invert_y: bool = True, compact_layers: bool = False, lazy_layers: bool = False, shared_tilesets: bool = False) -> None:
         super().__init__()
         self._filename: Optional[str] = None
 
         self.invert_y = invert_y
+        if compact_layers and numpy is None:
+            raise ImportError("Compact layers need numpy installed")
+        self.compact_layers = compact_layers
+        self.lazy_layers = lazy_layers
+        # tilesets from TSX files are taken from tileset_registry
+        self.shared_tilesets = shared_tilesets
 
         self.layer_id_map: dict[int, BaseTiledLayer] = {}
         self.tilesets: list[TiledTileset] = []
+        # firstgids of tilesets, in the same (ascending) order - to find tileset of a gid by bisecting
+        self.tilesets_firstgids: list[int] = []
+        # tilesets' lookups flattened for the whole map - first tileset wins where names or gids clash
         self.tiles: dict[int, Tile] = {}
-        self.tiles_by_name: ChainMap[str, int] = ChainMap()
-        self.tile_animations: ChainMap[int, TiledTileAnimations] = ChainMap()
+        self.tiles_by_name: dict[str, int] = {}
+        self.tile_animations: dict[int, TiledTileAnimations] = {}
 
         self.object_by_name: ChainMap[str, TiledObject] = ChainMap()
 
@@ -1589,8 +2951,38 @@ class TiledMap(TiledElement):
         self.infinite: bool = False
         self.images: list[Surface] = []
         self.prevent_drawing = False
+        # incremented whenever existing tile images are replaced
+        self.images_version = 0
         self.new_gids: dict[int, tuple[int, TileFlags]] = {}
+        # reverse of new_gids - each distinct flipped/rotated variant of a tile gets only one gid
+        self.transformed_gids: dict[tuple[int, TileFlags], int] = {}
+        self._original_gid_table: Optional[tuple[tuple[int, int], Any]] = None
+        # time (ms) and animated gid to gid of the frame showing at that time
+        self._animation_frames: Optional[tuple[int, dict[int, int]]] = None
         self._map_rect: Optional[Rect] = None
+        self._map_rect_chunks: int = 0
+        self.compression_level: int = COMPRESSION_LEVEL_DEFAULT
+
+        # while set, tileset images are decoded in the background and images are filled in at the end of load
+        self.image_loader: Optional[Executor] = None
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["images"] = [None] * len(self.images)
+        state["image_loader"] = None
+        state["_original_gid_table"] = None
+        state["_animation_frames"] = None
+        return state
+
+    def rebuild_images(self) -> None:
+        """Recreates all tile images (including flipped/rotated ones) from tilesets' image surfaces"""
+        images = self.images
+        for ts in self.tilesets:
+            images[ts.firstgid:ts.firstgid + ts.tilecount] = ts.tile_images()
+        for new_gid in sorted(self.new_gids):
+            existing_gid, tile_flags = self.new_gids[new_gid]
+            images[new_gid] = self._transformed_image(images[existing_gid], tile_flags)
+        self.images_version += 1
 
     def _update_shape(self, w: int, h: int) -> None:
         for layer in self.layers:
@@ -1638,8 +3030,20 @@ class TiledMap(TiledElement):
 
     @property
     def rect(self) -> Rect:
+        if self.infinite:
+            # painted area changes only when chunks get allocated or layer's data is replaced (which forgets it)
+            chunks = sum(len(layer.data.chunks) for layer in self.layers if isinstance(layer, TiledTileLayer) and layer.chunked)
+            if chunks != self._map_rect_chunks:
+                self._map_rect = None
+                self._map_rect_chunks = chunks
         if self._map_rect is None:
-            self._map_rect = Rect(0, 0, self.pixel_width, self.pixel_height)
+            if self.infinite:
+                # Painted area of all layers - it can start left of or above 0, 0
+                bounds = [b for b in (layer.bounds for layer in self.layers if isinstance(layer, TiledTileLayer)) if b.width > 0 and b.height > 0]
+                area = bounds[0].unionall(bounds[1:]) if len(bounds) > 0 else Rect(0, 0, self.width, self.height)
+                self._map_rect = Rect(area.x * self.tilewidth, area.y * self.tileheight, area.width * self.tilewidth, area.height * self.tileheight)
+            else:
+                self._map_rect = Rect(0, 0, self.pixel_width, self.pixel_height)
         return self._map_rect
 
     @property
@@ -1671,33 +3075,41 @@ class TiledMap(TiledElement):
         return None
 
     def add_layer(self, layer: BaseTiledLayer) -> None:
+        if not layer.id:
+            layer.id = max(self.nextlayerid, 1)
         self.layer_id_map[layer.id] = layer
+        self.nextlayerid = max(self.nextlayerid, layer.id + 1)
+        if self.infinite:
+            self._map_rect = None
         if isinstance(layer, TiledObjectGroup):
-            self.object_by_name = ChainMap(*[layer.object_by_name for layer in self.layers if isinstance(layer, TiledObjectGroup)])
-            self.nextobjectid = max(self.nextobjectid, max(map(lambda o: o.id, layer.objects_id_map.values())) + 1 if len(layer.objects_id_map) > 0 else 0)
-        self.nextlayerid = max(self.nextlayerid, max(map(lambda o: o.id, self.layer_id_map.values())) if len(self.layer_id_map) > 0 else 0)
+            # objects added to the layer have already moved nextobjectid on
+            object_layers = self.object_by_name.maps
+            if len(object_layers) == 1 and not isinstance(object_layers[0], TiledObjectGroup):
+                object_layers[0] = layer.object_by_name  # replace ChainMap's initial, empty dict
+            else:
+                object_layers.append(layer.object_by_name)
 
     def _update_tileset_change(self, tileset: TiledTileset) -> None:
         tilesets_maxgid = tileset.firstgid + tileset.tilecount - 1
+        self.images_version += 1
         self.maxgid = max(self.maxgid, tilesets_maxgid)
         if len(self.images) < self.maxgid + 1:
             self.images += [None] * (self.maxgid + 1 - len(self.images))
-            for i in range(tileset.tilecount):
-                self.images[tileset.firstgid + i] = tileset.get_image(i + tileset.firstgid)
+            if self.image_loader is None:
+                self.images[tileset.firstgid:tileset.firstgid + tileset.tilecount] = tileset.tile_images()
         elif len(self.images) > self.maxgid + 1:
             del self.images[self.maxgid + 1:]
-            for ts in self.tilesets:
-                for i in range(ts.tilecount):
-                    self.images[ts.firstgid + i] = ts.get_image(i + ts.firstgid)
+            if self.image_loader is None:
+                for ts in self.tilesets:
+                    self.images[ts.firstgid:ts.firstgid + ts.tilecount] = ts.tile_images()
 
     def add_tileset(self, tileset: TiledTileset) -> None:
         if len(self.tilesets) == 0:
             self.maxgid = 0
         tileset.firstgid = self.maxgid + 1
         self.tilesets.append(tileset)
-        self._update_tiles_property()
-        self.tiles_by_name = ChainMap(*[ts.tiles_by_name for ts in self.tilesets])
-        self.tile_animations = ChainMap(*[ts.tile_animations for ts in self.tilesets])
+        self.tilesets_firstgids.append(tileset.firstgid)
+        self._add_tileset_lookups(tileset)
         self._update_tileset_change(tileset)
 
     def remove_tileset(self, tileset: TiledTileset) -> None:
@@ -1713,18 +3125,23 @@ class TiledMap(TiledElement):
                 self.maxgid = ts.firstgid + ts.tilecount
 
         self.tilesets.remove(tileset)
-        self._update_tiles_property()
-        self.tiles_by_name = ChainMap(*[ts.tiles_by_name for ts in self.tilesets])
-        self.tile_animations = ChainMap(*[ts.tile_animations for ts in self.tilesets])
+        self.tilesets_firstgids = [ts.firstgid for ts in self.tilesets]
+        self._remove_tileset_lookups(tileset)
+        self._saved_gids_changed()
 
         for ts in tilesets_to_update_change:
             self._update_tileset_change(ts)
 
-    def update_tileset(self, tileset: TiledTileset) -> None:
-        self._update_tiles_property()
-        self.tiles_by_name = ChainMap(*[ts.tiles_by_name for ts in self.tilesets])
-        self.tile_animations = ChainMap(*[ts.tile_animations for ts in self.tilesets])
+    def _saved_gids_changed(self) -> None:
+        # Layer data and object XML kept from last save have gids as tilesets' firstgids were then
+        for layer in self.layers:
+            if isinstance(layer, TiledTileLayer):
+                layer._saved_data = None
+            elif isinstance(layer, TiledObjectGroup):
+                for obj in layer.objects:
+                    obj._saved_xml = None
 
+    def update_tileset(self, tileset: TiledTileset) -> None:
         del self.images[:]
         self.prevent_drawing = True
         try:
@@ -1733,6 +3150,15 @@ class TiledMap(TiledElement):
                 ts.firstgid = self.maxgid + 1
                 self.maxgid = ts.firstgid + tileset.tilecount
 
+            # tileset's tile count (and so firstgids of all following tilesets) might have changed
+            self.tilesets_firstgids = [ts.firstgid for ts in self.tilesets]
+            self._saved_gids_changed()
+            self.tiles.clear()
+            self.tiles_by_name.clear()
+            self.tile_animations.clear()
+            for ts in self.tilesets:
+                self._add_tileset_lookups(ts)
+
             before = True
             for ts in self.tilesets:
                 if ts == tileset:
@@ -1742,13 +3168,53 @@ class TiledMap(TiledElement):
         finally:
             self.prevent_drawing = False
 
-    def load(self, filename: str) -> None:
+    def load(self, filename: str, streaming: bool = True, parallel_images: bool = True) -> None:
         self.filename = filename
-        self._parse_xml(ElementTree.parse(filename).getroot())
-
-    def save(self, filename: str) -> None:
+        image_loader = ThreadPoolExecutor(max_workers=IMAGE_LOADER_THREADS) if parallel_images else None
+        self.image_loader = image_loader
+        try:
+            if streaming:
+                self._parse_xml_streaming(filename)
+            else:
+                self._parse_xml(ElementTree.parse(filename).getroot())
+            self.image_loader = None
+            if image_loader is not None:
+                # waits for all tilesets' images
+                self.rebuild_images()
+        finally:
+            self.image_loader = None
+            if image_loader is not None:
+                image_loader.shutdown(cancel_futures=True)
+
+    def _parse_xml_streaming(self, filename: str) -> None:
+        # Builds tilesets and layers as their end tags arrive and drops their elements straight after,
+        # so the whole DOM never exists at once
+        depth = 0
+        root: Optional[Element] = None
+        for event, element in ElementTree.iterparse(filename, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if depth == 1:
+                    root = element
+                    self._parse_xml_attributes(element)
+            else:
+                depth -= 1
+                if depth == 1:
+                    self._parse_xml_child(element)
+                    element.clear()
+                    root.remove(element)
+
+    def save(self, filename: str, compression_level: Optional[int] = None) -> None:
+        """Saves map (and tilesets with changed data) to filename.
+
+        Args:
+            filename: TMX file to write
+            compression_level: zlib/gzip level for tile layers that changed (COMPRESSION_LEVEL_FAST for autosave,
+                COMPRESSION_LEVEL_BEST for release); defaults to map's compression_level
+        """
         self.filename = filename
         backup_file(filename)
+        self.encode_layers(compression_level if compression_level is not None else self.compression_level)
         with open(filename, "w", buffering=128 * 1024) as f:
             f.write("<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n")
             self._save(f, 0)
@@ -1757,6 +3223,27 @@ class TiledMap(TiledElement):
             if tileset.dirty_data:
                 tileset.save()
 
+    def encode_layers(self, compression_level: int) -> None:
+        """Encodes and compresses data of all changed tile layers, concurrently, ready to be written in layer order"""
+        layers = [layer for layer in self.layers if isinstance(layer, TiledTileLayer) and layer.needs_encoding]
+        if len(layers) == 0:
+            return
+
+        # Built once up front so threads only read it
+        self.original_gid_table()
+        for layer in layers:
+            layer._ensure_decoded()
+        if len(layers) == 1 or LAYER_COMPRESSION_THREADS == 1:
+            payloads = [layer.encode_payload(compression_level) for layer in layers]
+        else:
+            # zlib releases GIL while compressing
+            with ThreadPoolExecutor(max_workers=min(LAYER_COMPRESSION_THREADS, len(layers))) as executor:
+                payloads = list(executor.map(lambda l: l.encode_payload(compression_level), layers))
+
+        for layer, payload in zip(layers, payloads):
+            layer._saved_data = payload
+            layer.dirty_data = False
+
     def _tag_name(self) -> str: return "map"
 
     def _sub_xml(self, stream, indent: int, close_tag: bool) -> bool:
@@ -1771,7 +3258,7 @@ class TiledMap(TiledElement):
         return close_tag
 
     def register_raw_gid(self, gid: int) -> int:
-        if gid < self.maxgid:
+        if gid <= self.maxgid:
             return gid
 
         g = gid & ~GID_MASK
@@ -1783,34 +3270,94 @@ class TiledMap(TiledElement):
         ))
 
     def register_gid(self, existing_gid, tile_flags: TileFlags) -> int:
-        new_gid = self.maxgid
+        key = existing_gid, tile_flags
+        new_gid = self.transformed_gids.get(key)
+        if new_gid is not None:
+            return new_gid
+
         self.maxgid += 1
-        self.images += [None]
-        self.new_gids[new_gid] = existing_gid, tile_flags
+        new_gid = self.maxgid
+        self.images.append(None)
+        self.new_gids[new_gid] = key
+        self.transformed_gids[key] = new_gid
 
-        gid_image = self.images[existing_gid]
+        if self.image_loader is None:
+            self.images[new_gid] = self._transformed_image(self.images[existing_gid], tile_flags)
+        return new_gid
 
+    @staticmethod
+    def _transformed_image(gid_image: Surface, tile_flags: TileFlags) -> Surface:
         if tile_flags.flipped_diagonally:
             gid_image = flip(rotate(gid_image, 270), True, False)
         if tile_flags.flipped_horizontally or tile_flags.flipped_vertically:
             gid_image = flip(gid_image, tile_flags.flipped_horizontally, tile_flags.flipped_vertically)
-
-        self.images[new_gid] = gid_image
-        return new_gid
+        return gid_image
+
+    def original_gid_table(self) -> Union[list[int], 'numpy.ndarray']:
+        """Lookup table of gids as written to TMX file (original gid with flip/rotate flags) indexed by gid"""
+        key = self.maxgid, len(self.new_gids)
+        if self._original_gid_table is None or self._original_gid_table[0] != key:
+            table = list(range(max(self.maxgid, max(self.new_gids, default=0)) + 1))
+            for new_gid, (existing_gid, tile_flags) in self.new_gids.items():
+                table[new_gid] = tile_flags.to_gid(existing_gid)
+            self._original_gid_table = key, numpy.array(table, dtype=numpy.uint32) if numpy is not None else table
+        return self._original_gid_table[1]
 
     def gid_to_original_gid_and_tile_flags(self, gid: int) -> int:
         old_gid, tile_flags = self.new_gids.get(gid, (gid, NO_TRANSFORM_TILE_FLAGS))
         return tile_flags.to_gid(old_gid)
 
-    def _update_tiles_property(self) -> None:
-        self.tiles.clear()
+    def animation_frame_gids(self, current_time: Optional[float] = None) -> dict[int, int]:
+        """Animated gid to gid of its frame at given time, worked out once for all layers and objects drawn for that time.
+        Without time, the table of the last time asked for is returned"""
+        animation_frames = self._animation_frames
+        if current_time is None:
+            if animation_frames is not None:
+                return animation_frames[1]
+            current_time = time.time()
+        time_ms = int(current_time * 1000)
+        if animation_frames is None or animation_frames[0] != time_ms:
+            animation_frames = time_ms, {gid: animations.get_gid(time_ms) for gid, animations in self.tile_animations.items()}
+            self._animation_frames = animation_frames
+        return animation_frames[1]
+
+    def tileset_for_gid(self, gid: int) -> Optional[tuple[TiledTileset, int]]:
+        """Tileset gid (without flip/rotate flags) belongs to and tile id within that tileset"""
+        i = bisect_right(self.tilesets_firstgids, gid) - 1
+        if i >= 0:
+            tileset = self.tilesets[i]
+            tile_id = gid - tileset.firstgid
+            if tile_id < tileset.tilecount:
+                return tileset, tile_id
+        return None
+
+    def _add_tileset_lookups(self, tileset: TiledTileset) -> None:
+        tiles = self.tiles
+        firstgid = tileset.firstgid
+        for tile_id, tile in tileset.tiles.items():
+            if tile_id < tileset.tilecount:
+                tiles.setdefault(firstgid + tile_id, tile)
+        self._add_tileset_names_and_animations(tileset)
+
+    def _add_tileset_names_and_animations(self, tileset: TiledTileset) -> None:
+        self._animation_frames = None
+        for name, tile_id in tileset.tiles_by_name.items():
+            self.tiles_by_name.setdefault(name, tile_id)
+        for gid, animations in tileset.tile_animations.items():
+            self.tile_animations.setdefault(gid, animations)
+
+    def _remove_tileset_lookups(self, tileset: TiledTileset) -> None:
+        tiles = self.tiles
+        firstgid = tileset.firstgid
+        for tile_id, tile in tileset.tiles.items():
+            if tiles.get(firstgid + tile_id) is tile:
+                del tiles[firstgid + tile_id]
+        # names and animations of removed tileset might have hidden ones of other tilesets - these are few
+        self.tiles_by_name.clear()
+        self.tile_animations.clear()
+        self._animation_frames = None
         for ts in self.tilesets:
-            for i in range(ts.tilecount):
-                gid = ts.firstgid + i
-                try:
-                    self.tiles[gid] = ts.tiles[i]
-                except KeyError as e:
-                    print(f"{e}")
+            self._add_tileset_names_and_animations(ts)
 
 
 if __name__ == '__main__':
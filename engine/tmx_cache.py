@@ -0,0 +1,195 @@
+import gc
+import hashlib
+import json
+import logging
+import mmap
+import os
+import pickle
+import struct
+import sys
+from typing import Optional
+
+from engine.tmx import TiledMap, TiledTileLayer
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+logger = logging.getLogger(__name__)
+
+# Compiled map cache (.tmxc) written next to .tmx file:
+#
+#   preamble    - MAGIC, version, header length, metadata length
+#   header      - json with mtime and hash of TMX and all TSX files it references and table of layers
+#   metadata    - pickled TiledMap without images and tile data - layers that were not decoded keep their raw payload
+#   tile data   - raw little-endian uint32 arrays of decoded tile layers, each aligned to ARRAY_ALIGNMENT
+#
+# Tile data section is memory mapped - compact layers use it in place (copy on write) and lazy layers
+# are built from it only when first accessed.
+#
+# Metadata is a pickle, which can run any code when loaded - caches must be trusted as much as the game's code itself.
+# Only read caches this engine wrote, never ones that came with maps from elsewhere.
+
+CACHE_SUFFIX = ".tmxc"
+MAGIC = b"TMXC"
+VERSION = 12
+PREAMBLE = struct.Struct("<4sIQQ")
+ARRAY_ALIGNMENT = 64
+
+
+def cache_filename(filename: str) -> str:
+    return os.path.splitext(filename)[0] + CACHE_SUFFIX
+
+
+def _file_key(filename: str) -> list:
+    with open(filename, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return [os.stat(filename).st_mtime_ns, digest]
+
+
+def _current_file_key(filename: str, key: list) -> Optional[list]:
+    """Returns key of file if it did not change since key was taken (with new mtime if it was only touched), None otherwise"""
+    try:
+        if os.stat(filename).st_mtime_ns == key[0]:
+            return key
+        # Touched but maybe not changed (checkout, copy, etc...)
+        current_key = _file_key(filename)
+        return current_key if current_key[1] == key[1] else None
+    except OSError:
+        return None
+
+
+def _referenced_files(tiled_map: TiledMap) -> list[str]:
+    """Returns TMX file and all TSX files it references, relative to TMX file's directory"""
+    return [os.path.basename(tiled_map.filename)] + [ts.source.replace("\\", "/") for ts in tiled_map.tilesets if ts.source]
+
+
+def load_map(filename: str, compact_layers: bool = False, lazy_layers: bool = False, shared_tilesets: bool = False) -> TiledMap:
+    """Loads map from compiled cache if it is up-to-date, otherwise from XML (writing new cache for next time)"""
+    tiled_map = read_cache(filename, compact_layers=compact_layers, lazy_layers=lazy_layers, shared_tilesets=shared_tilesets)
+    if tiled_map is not None:
+        return tiled_map
+
+    tiled_map = TiledMap(compact_layers=compact_layers, lazy_layers=lazy_layers, shared_tilesets=shared_tilesets)
+    tiled_map.load(filename)
+    try:
+        write_cache(tiled_map)
+    except Exception as e:
+        logger.warning(f"Cannot write map cache for {filename}; {e!r}", exc_info=True)
+    return tiled_map
+
+
+def write_cache(tiled_map: TiledMap, filename: Optional[str] = None) -> None:
+    filename = filename if filename is not None else cache_filename(tiled_map.filename)
+    tmx_dir = os.path.dirname(tiled_map.filename)
+
+    # Raw payloads of layers that were not decoded are pickled as they are and decoded (registering their transformed gids)
+    # only when layer is first accessed after cache is read. Sparse chunks of infinite layers are small enough to be
+    # pickled with the rest of the map.
+    layers = [layer for layer in tiled_map.layers if isinstance(layer, TiledTileLayer) and not layer.chunked and not isinstance(layer._payload, str)]
+    arrays = []
+    for layer in layers:
+        data = layer.data
+        if isinstance(data, list):
+            arrays.append(struct.pack("<%dL" % (layer.width * layer.height), *(gid for row in data for gid in row)))
+        else:
+            arrays.append(data.array.astype("<u4").tobytes())
+
+    metadata = pickle.dumps(tiled_map, protocol=pickle.HIGHEST_PROTOCOL)
+
+    header = {
+        "files": {f: _file_key(os.path.join(tmx_dir, f)) for f in _referenced_files(tiled_map)},
+        "layers": []
+    }
+    offset = 0
+    for layer, array in zip(layers, arrays):
+        header["layers"].append([layer.id, layer.height, layer.width, offset])
+        offset += (len(array) + ARRAY_ALIGNMENT - 1) // ARRAY_ALIGNMENT * ARRAY_ALIGNMENT
+
+    _write_cache_file(filename, header, metadata, arrays)
+
+
+def _write_cache_file(filename: str, header: dict, metadata: bytes, arrays: list[bytes]) -> None:
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, len(header_bytes), len(metadata)))
+        f.write(header_bytes)
+        f.write(metadata)
+        f.write(b"\0" * (-f.tell() % ARRAY_ALIGNMENT))
+        for array in arrays:
+            f.write(array)
+            f.write(b"\0" * (-len(array) % ARRAY_ALIGNMENT))
+    os.replace(tmp_filename, filename)
+
+
+def read_cache(filename: str, compact_layers: bool = False, lazy_layers: bool = False, shared_tilesets: bool = False) -> Optional[TiledMap]:
+    """Returns map from compiled cache or None if there is no cache or it is stale. Cache must be trusted - it is unpickled."""
+    if sys.byteorder != "little" or (compact_layers and numpy is None):
+        return None
+
+    cache_file = cache_filename(filename)
+    tmx_dir = os.path.dirname(filename)
+    try:
+        with open(cache_file, "rb") as f:
+            magic, version, header_len, metadata_len = PREAMBLE.unpack(f.read(PREAMBLE.size))
+            if magic != MAGIC or version != VERSION:
+                return None
+            header = json.loads(f.read(header_len).decode("utf-8"))
+            file_keys = {f: _current_file_key(os.path.join(tmx_dir, f), key) for f, key in header["files"].items()}
+            if any(key is None for key in file_keys.values()):
+                logger.info(f"Map cache {cache_file} is stale")
+                return None
+
+            metadata = f.read(metadata_len)
+            # Lots of small objects are created at once - collector passes would only slow it down
+            gc.disable()
+            try:
+                tiled_map: TiledMap = pickle.loads(metadata)
+            finally:
+                gc.enable()
+            arrays_offset = PREAMBLE.size + header_len + metadata_len
+            arrays_offset += -arrays_offset % ARRAY_ALIGNMENT
+            tile_data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY) if len(header["layers"]) > 0 else None
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Cannot read map cache {cache_file}; {e!r}", exc_info=True)
+        return None
+
+    if file_keys != header["files"]:
+        # Files were only touched - their new mtimes are stored so they are not hashed again on each load
+        header["files"] = file_keys
+        try:
+            _write_cache_file(cache_file, header, metadata, [tile_data[arrays_offset:]] if tile_data is not None else [])
+        except OSError as e:
+            logger.warning(f"Cannot update map cache {cache_file}; {e}")
+
+    tiled_map._filename = filename
+    tiled_map.compact_layers = compact_layers
+    tiled_map.lazy_layers = lazy_layers
+    tiled_map.shared_tilesets = shared_tilesets
+    for ts in tiled_map.tilesets:
+        ts.update_source_filename(ts.source, tmx_dir)
+        ts.reload_image()
+    tiled_map.rebuild_images()
+
+    tile_layers = [layer for layer in tiled_map.layers if isinstance(layer, TiledTileLayer)]
+    for layer in tile_layers:
+        layer.compact = compact_layers
+        layer.lazy = lazy_layers
+    for layer_id, height, width, offset in header["layers"]:
+        start = arrays_offset + offset
+        tiled_map.layer_id_map[layer_id].load_registered_gids(memoryview(tile_data)[start:start + width * height * 4])
+    if not lazy_layers:
+        # Layers that were not decoded when cache was written
+        for layer in tile_layers:
+            layer._ensure_decoded()
+
+    if tile_data is not None and not compact_layers and not lazy_layers:
+        tile_data.close()
+
+    return tiled_map
@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import Optional
 
-from pygame import Surface
+from pygame import Surface, Rect
 
 from engine.level import Level
 
@@ -10,6 +10,15 @@ class LevelTransition(ABC):
     def __init__(self, level: Level) -> None:
         self.level = level
         self.remove = False
+        # screen areas changed by last draw - None when they could be anywhere in level's viewport
+        self.dirty_rects: Optional[list[Rect]] = None
+
+    def expose(self, rects: list[Rect]) -> None:
+        """Screen areas level must be shown in again on next draw, as something was drawn over them.
+
+        Without it level is shown in its whole viewport.
+        """
+        pass
 
     @abstractmethod
     def draw(self, surface: Surface) -> Optional['LevelTransition']:
@@ -46,9 +46,8 @@ class MoveViewport(LevelTransition):
 
         with clip(surface, self.level.viewport):
             if self.level.always or self.level.invalidated:
-                self.level.invalidated = False
-                self.level.offscreen_surface.fill(self.level.background_colour)
-                self.level.render_to(self.level.offscreen_surface, -self.level.x_offset, -self.level.y_offset)
+                # viewport changes size - offscreen surface is rendered whole
+                self.level.render_offscreen(full=True)
 
             surface.blit(self.level.offscreen_surface, self.level.viewport.topleft)
 
@@ -1,21 +1,35 @@
 from typing import Optional
 
-from pygame import Surface
+from pygame import Surface, Rect
 
 from engine.level import Level
 from engine.transitions.level_transition import LevelTransition
-from engine.utils import clip
+from engine.utils import clip, merge_rects
 
 
 class RenderDirect(LevelTransition):
     def __init__(self, level: Level) -> None:
         super().__init__(level)
+        # None - whole viewport is to be shown, as on first draw
+        self.exposed_rects: Optional[list[Rect]] = None
+
+    def expose(self, rects: list[Rect]) -> None:
+        if self.dirty_rects is not None:
+            self.exposed_rects = rects
 
     def draw(self, surface: Surface) -> Optional[LevelTransition]:
-        with clip(surface, self.level.viewport):
-            if self.level.always or self.level.invalidated:
-                self.level.invalidated = False
-                self.level.offscreen_surface.fill(self.level.background_colour)
-                self.level.render_to(self.level.offscreen_surface, -self.level.x_offset, -self.level.y_offset)
-            surface.blit(self.level.offscreen_surface, self.level.viewport.topleft)
+        viewport = self.level.viewport
+        with clip(surface, viewport):
+            rendered = self.level.render_offscreen()
+            if self.exposed_rects is None:
+                surface.blit(self.level.offscreen_surface, viewport.topleft)
+                self.dirty_rects = [viewport.copy()]
+            else:
+                # only what was rendered again or drawn over is shown
+                x, y = viewport.topleft
+                rects = [rect.move(x, y).clip(viewport) for rect in rendered] + [rect.clip(viewport) for rect in self.exposed_rects]
+                self.dirty_rects = merge_rects([rect for rect in rects if rect.width > 0 and rect.height > 0])
+                for rect in self.dirty_rects:
+                    surface.blit(self.level.offscreen_surface, rect, rect.move(-x, -y))
+            self.exposed_rects = None
         return None
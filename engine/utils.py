@@ -18,6 +18,23 @@ def clip(surface: Surface, rect: Rect) -> Generator[None, Rect, None]:
     surface.set_clip(existing_clip)
 
 
+def merge_rects(rects: list[Rect]) -> list[Rect]:
+    """Replaces rects with their union wherever it is not larger than they are together"""
+    merged: list[Rect] = []
+    for rect in rects:
+        i = 0
+        while i < len(merged):
+            union = rect.union(merged[i])
+            if union.width * union.height <= rect.width * rect.height + merged[i].width * merged[i].height:
+                rect = union
+                del merged[i]
+                i = 0
+            else:
+                i += 1
+        merged.append(rect)
+    return merged
+
+
 def is_close(x1: Union[int, float], x2: Union[int, float], y1: Union[int, float], y2: Union[int, float]) -> bool:
     return -1 <= (x1 - x2) <= 1 and -1 <= (y1 - y2) <= 1
 
@@ -26,10 +43,16 @@ def int_tuple(t: tuple[Union[int, float], Union[int, float]]) -> tuple[int, int]
     return int(t[0]), int(t[1])
 
 
+# Never written to - NestedDict only writes through to keys 'over' already has
+_NOTHING_OVER: dict = {}
+
+
 class NestedDict(dict):
+    __slots__ = ("over", )
+
     def __init__(self) -> None:
         super().__init__()
-        self.over: dict = {}
+        self.over: dict = _NOTHING_OVER
 
     def __getitem__(self, key: str) -> Any:
         if key in self.over:
@@ -59,3 +82,13 @@ class NestedDict(dict):
 
     def has_original_keys(self) -> bool:
         return super().__len__() > 0
+
+    def __reduce__(self) -> tuple:
+        # Own items must not go through __setitem__ before 'over' is restored
+        return _restore_nested_dict, (dict(dict.items(self)), ), (None, {"over": self.over})
+
+
+def _restore_nested_dict(items: dict) -> NestedDict:
+    nested_dict = NestedDict()
+    dict.update(nested_dict, items)
+    return nested_dict
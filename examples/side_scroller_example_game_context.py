@@ -1,6 +1,6 @@
-from pygame import Surface
+from pygame import Surface, Rect
 from pygame.font import Font
-from typing import Union
+from typing import Union, Optional
 
 from pygame.key import ScancodeWrapper
 
@@ -17,11 +17,11 @@ class SideScrollerExampleGameContext(TextGameContext):
     def process_keys(self, previous_keys: ScancodeWrapper, current_keys: ScancodeWrapper) -> None:
         super().process_keys(previous_keys, current_keys)
 
-    def draw_before_map(self, screen: Surface) -> None:
-        super().draw_before_map(screen)
+    def draw_before_map(self, screen: Surface) -> Optional[list[Rect]]:
+        return super().draw_before_map(screen)
 
-    def draw_after_map(self, screen: Surface) -> None:
-        super().draw_after_map(screen)
+    def draw_after_map(self, screen: Surface) -> Optional[list[Rect]]:
+        return super().draw_after_map(screen)
 
     # @property
     # def screen_size(self) -> Optional[Size]:
@@ -1,4 +1,4 @@
-from typing import Union
+from typing import Union, Optional
 
 from pygame.font import Font
 
@@ -64,24 +64,25 @@ class TopDownExampleGameContext(TextGameContext):
 
     @in_context
     def give_object(self, obj_name: str) -> None:
-        for o in self.level.objects:
-            if o.name == obj_name:
-                self.remove_object(o)
-                self.add_object_to_inventory(o)
-                return
+        try:
+            o = self.level.objects_by_name[obj_name]
+        except KeyError:
+            return
+        self.remove_object(o)
+        self.add_object_to_inventory(o)
 
     @in_context
     def set_inventory_visibility(self, visible: bool) -> None:
         self.inventory_visible = visible
 
-    def draw_before_map(self, screen: Surface) -> None:
-        super().draw_before_map(screen)
+    def draw_before_map(self, screen: Surface) -> Optional[list[Rect]]:
+        return super().draw_before_map(screen)
 
-    def draw_after_map(self, screen: Surface) -> None:
-        super().draw_after_map(screen)
+    def draw_after_map(self, screen: Surface) -> Optional[list[Rect]]:
+        rects = super().draw_after_map(screen)
         box_size = self._inventory.image_size
         rect = Rect(screen.get_rect().right - box_size[0] - 2, 50, box_size[0], box_size[1] * 10)
-        self._inventory.draw(screen, rect)
+        return rects + self._inventory.draw(screen, rect) if rects is not None else None
 
     # @property
     # def screen_size(self) -> Optional[Size]:
@@ -8,7 +8,7 @@ if not os.path.exists("engine"):
 
 sys.path.append(os.getcwd())
 
-from engine.game import Game
+from engine.game import Game, open_display
 from engine.level import Level
 from examples.top_down_example_game_context import TopDownExampleGameContext
 
@@ -20,7 +20,8 @@ pygame.font.init()
 small_font = pygame.font.SysFont("apple casual", 16)
 font = pygame.font.SysFont("apple casual", 24)
 
-screen = pygame.display.set_mode(screen_size)
+# scale > 1 draws game to smaller screen scaled up to window; vsync=True lets display do the scaling
+screen, window = open_display(screen_size, scale=1)
 
 # Load all levels here
 levels = Level.load_levels(
@@ -30,14 +31,16 @@ levels = Level.load_levels(
 game_context = TopDownExampleGameContext(levels, font, small_font)
 # Starting/first level
 game_context.set_level(levels["test-level"])
-game_context.screen_size = screen_size
+game_context.screen_size = screen.get_size()
 
-game = Game(screen, game_context, framerate=60, debug=True)
+game = Game(screen, game_context, framerate=60, debug=True, dirty_rects=True, window=window)
 
-# Method to be called before the map is drawn on screen with signature def xxx(surface: Surface)
+# Method to be called before the map is drawn on screen with signature def xxx(surface: Surface) -> Optional[list[Rect]]
+# returning screen areas it drew to (None when they could be anywhere)
 game.draw_before_map = game_context.draw_before_map
 
-# Method to be called after the map is drawn on screen with signature def xxx(surface: Surface)
+# Method to be called after the map is drawn on screen with signature def xxx(surface: Surface) -> Optional[list[Rect]]
+# returning screen areas it drew to (None when they could be anywhere)
 game.draw_after_map = game_context.draw_after_map
 
 # Main game loop - see context for key processing
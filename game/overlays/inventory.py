@@ -120,11 +120,10 @@ class Inventory(Mapping[str, InventoryObject], Sized):
     def __iter__(self) -> Iterator[str]:
         return iter(self.dict)
 
-    def draw(self, screen: Surface, place: Rect) -> None:
-        if len(self) == 0:
-            return
-
+    def draw(self, screen: Surface, place: Rect) -> list[Rect]:
+        rects = []
         rect = place.copy()
         for key in self:
-            screen.blit(self.entry_images[key], rect)
+            rects.append(screen.blit(self.entry_images[key], rect))
             rect.y += self.image_size.height
+        return rects
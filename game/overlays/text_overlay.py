@@ -339,7 +339,8 @@ class TextOverlay:
 
             t.rect.x, t.rect.y = x, y
 
-    def draw(self, screen: Surface) -> None:
+    def draw(self, screen: Surface) -> list[Rect]:
+        rects = []
         for layout_position in list(self.texts):
             texts = self.texts[layout_position]
             for i in range(len(texts) - 1, -1, -1):
@@ -350,7 +351,8 @@ class TextOverlay:
                 del self.texts[layout_position]
             else:
                 for t in texts:
-                    screen.blit(t.surface, t.rect)
+                    rects.append(screen.blit(t.surface, t.rect))
+        return rects
 
 
 class TextArea:
@@ -394,17 +396,19 @@ class TextArea:
     def line_height(self) -> int:
         return self.font_height + self.line_spacing
 
-    def draw(self, screen: Surface, place: Optional[Rect] = None) -> None:
+    def draw(self, screen: Surface, place: Optional[Rect] = None) -> list[Rect]:
+        rects = []
         place = place if place is not None else self._rect
         y = place.y
         for say_thing in self.say_things:
             if say_thing.surface is None:
                 say_thing.draw_outline(self.font, colour=self.font_colour if say_thing.colour is None else say_thing.colour, width=place.width, outline_size=2, outline_colour=self.outline_color)
-            screen.blit(say_thing.surface, (10, y))
+            rects.append(screen.blit(say_thing.surface, (10, y)))
             y += self.line_height
         for i in range(len(self.say_things) - 1, -1, -1):
             if self.say_things[i].is_expired():
                 del self.say_things[i]
+        return rects
 
     def _trim(self) -> None:
         while len(self.say_things) > self.number_of_lines:
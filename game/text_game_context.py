@@ -44,14 +44,16 @@ class TextGameContext(GameContext):
         if self.text_overlay is not None:
             self.text_overlay.set_size(size)
 
-    def draw_before_map(self, screen: Surface) -> None:
-        pass
+    def draw_before_map(self, screen: Surface) -> Optional[list[Rect]]:
+        return []
 
-    def draw_after_map(self, screen: Surface) -> None:
+    def draw_after_map(self, screen: Surface) -> Optional[list[Rect]]:
+        rects = []
         if self.text_area is not None:
-            self.text_area.draw(screen)
+            rects += self.text_area.draw(screen)
         if self.text_overlay is not None:
-            self.text_overlay.draw(screen)
+            rects += self.text_overlay.draw(screen)
+        return rects
 
     @in_context
     def say(self, text: str, colour: Optional[Color] = None, expires_in: float = 0.0) -> None:
@@ -0,0 +1,88 @@
+import random
+import struct
+import zlib
+from base64 import b64encode
+from pathlib import Path
+from typing import Optional
+
+from engine.tmx import GID_TRANS_FLIP_HORIZONTALLY
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+TILES_TILESET = PROJECT_ROOT / "assets" / "side_scroller" / "tilemap" / "tileset-tiles.tsx"
+CHARACTERS_TILESET = PROJECT_ROOT / "assets" / "side_scroller" / "tilemap" / "tileset-characters.tsx"
+
+
+def layer_payload(width: int, height: int, density: float = 0.5, flipped: float = 0.0, seed: int = 1) -> str:
+    rnd = random.Random(seed)
+    gids = []
+    for _ in range(width * height):
+        gid = rnd.randint(1, 180) if rnd.random() < density else 0
+        if gid and rnd.random() < flipped:
+            gid |= GID_TRANS_FLIP_HORIZONTALLY
+        gids.append(gid)
+    return b64encode(zlib.compress(struct.pack("<%dL" % len(gids), *gids))).decode("ASCII")
+
+
+def write_synthetic_map(
+        filename: str,
+        width: int, height: int,
+        layers: int = 1,
+        density: float = 0.5,
+        flipped: float = 0.0,
+        objects: int = 0,
+        layer_names: Optional[list[str]] = None) -> None:
+    """Writes TMX file that uses the side scroller tilesets (referenced by absolute path)"""
+
+    layer_names = layer_names if layer_names is not None else [f"layer_{i}" for i in range(layers)]
+    with open(filename, "w") as f:
+        f.write("<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n")
+        f.write(f"<map version=\"1.11\" tiledversion=\"1.11.0\" orientation=\"orthogonal\" renderorder=\"right-down\""
+                f" width=\"{width}\" height=\"{height}\" tilewidth=\"18\" tileheight=\"18\" infinite=\"0\""
+                f" nextlayerid=\"{len(layer_names) + 2}\" nextobjectid=\"{objects + 1}\">\n")
+        f.write(f" <tileset firstgid=\"1\" source=\"{TILES_TILESET}\"/>\n")
+        f.write(f" <tileset firstgid=\"181\" source=\"{CHARACTERS_TILESET}\"/>\n")
+        for i, name in enumerate(layer_names):
+            f.write(f" <layer id=\"{i + 1}\" name=\"{name}\" width=\"{width}\" height=\"{height}\">\n")
+            f.write("  <data encoding=\"base64\" compression=\"zlib\">\n")
+            f.write("   " + layer_payload(width, height, density, flipped, seed=i) + "\n")
+            f.write("  </data>\n")
+            f.write(" </layer>\n")
+        f.write(f" <objectgroup id=\"{len(layer_names) + 1}\" name=\"objects\">\n")
+        for i in range(objects):
+            f.write(f"  <object id=\"{i + 1}\" name=\"object_{i}\" type=\"coin\" gid=\"152\""
+                    f" x=\"{(i * 18) % (width * 18)}\" y=\"{18 + (i // width) * 18 % (height * 18)}\" width=\"18\" height=\"18\">\n")
+            f.write("   <properties>\n")
+            f.write("    <property name=\"on_collision\" value=\"remove_collided_object()\"/>\n")
+            f.write("    <property name=\"value\" type=\"int\" value=\"1\"/>\n")
+            f.write("   </properties>\n")
+            f.write("  </object>\n")
+        f.write(" </objectgroup>\n")
+        f.write("</map>\n")
+
+
+def write_synthetic_infinite_map(
+        filename: str,
+        width: int, height: int,
+        painted_chunks: list[tuple[int, int]],
+        chunk_size: int = 16,
+        density: float = 0.5,
+        flipped: float = 0.0) -> None:
+    """Writes infinite TMX file with one layer that has <chunk> elements only at painted_chunks (chunk coordinates)"""
+
+    with open(filename, "w") as f:
+        f.write("<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n")
+        f.write(f"<map version=\"1.11\" tiledversion=\"1.11.0\" orientation=\"orthogonal\" renderorder=\"right-down\""
+                f" width=\"{width}\" height=\"{height}\" tilewidth=\"18\" tileheight=\"18\" infinite=\"1\""
+                f" nextlayerid=\"3\" nextobjectid=\"1\">\n")
+        f.write(f" <tileset firstgid=\"1\" source=\"{TILES_TILESET}\"/>\n")
+        f.write(f" <tileset firstgid=\"181\" source=\"{CHARACTERS_TILESET}\"/>\n")
+        f.write(f" <layer id=\"1\" name=\"main\" width=\"{width}\" height=\"{height}\">\n")
+        f.write("  <data encoding=\"base64\" compression=\"zlib\">\n")
+        for i, (chunk_x, chunk_y) in enumerate(painted_chunks):
+            f.write(f"   <chunk x=\"{chunk_x * chunk_size}\" y=\"{chunk_y * chunk_size}\" width=\"{chunk_size}\" height=\"{chunk_size}\">\n")
+            f.write("    " + layer_payload(chunk_size, chunk_size, density, flipped, seed=i) + "\n")
+            f.write("   </chunk>\n")
+        f.write("  </data>\n")
+        f.write(" </layer>\n")
+        f.write(" <objectgroup id=\"2\" name=\"objects\"/>\n")
+        f.write("</map>\n")
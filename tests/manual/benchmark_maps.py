@@ -0,0 +1,594 @@
+"""Benchmarks of loading, saving and looking up map data.
+
+Run from project root: python tests/manual/benchmark_maps.py [benchmark ...]
+Runs given benchmarks, all of them by default.
+"""
+import gc
+import io
+import itertools
+import os
+import random
+import resource
+import struct
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import ChainMap
+from tempfile import TemporaryDirectory
+from typing import Callable
+from unittest.mock import patch
+from xml.etree.ElementTree import Element
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(PROJECT_ROOT)
+
+import pygame
+
+from engine import tmx
+from engine.tmx import TiledMap, TiledTileLayer, IMAGE_LOADER_THREADS, TiledObjectGroup, COMPRESSION_LEVEL_FAST, COMPRESSION_LEVEL_DEFAULT, \
+    COMPRESSION_LEVEL_BEST, TiledElement, TYPES, convert_to_bool, logger, TiledObject, BaseTiledLayer, TiledTileset
+from tests.fixtures import write_synthetic_map, write_synthetic_infinite_map, TILES_TILESET
+
+# 20 level game made of example levels - each of them uses tilesets of its own example
+LEVELS = (["assets/side_scroller/level1.tmx", "assets/side_scroller/level2.tmx", "assets/top_down/test-level.tmx"] * 7)[:20]
+
+BENCHMARKS: dict[str, Callable[[str], None]] = {}
+
+
+def benchmark(f: Callable[[str], None]) -> Callable[[str], None]:
+    BENCHMARKS[f.__name__] = f
+    return f
+
+
+IN_FRESH_PROCESS: dict[str, Callable[..., None]] = {}
+
+
+def in_fresh_process(f: Callable[..., None]) -> Callable[..., None]:
+    IN_FRESH_PROCESS[f.__name__] = f
+    return f
+
+
+def run_in_fresh_process(f: Callable[..., None], *args: str) -> list[str]:
+    # Each run is in a fresh process so peak RSS is not shared between measurements
+    output = subprocess.check_output(
+        [sys.executable, __file__, "--in-fresh-process", f.__name__, *args],
+        cwd=PROJECT_ROOT, env=os.environ | {"PYGAME_HIDE_SUPPORT_PROMPT": "1"}, stderr=subprocess.DEVNULL)
+    return output.decode("utf-8").strip().split("\n")[-1].split(" ")
+
+
+def best_of(f: Callable[[], object], repeat: int = 3) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def timed(f: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    f()
+    return time.perf_counter() - start
+
+
+def measure_tile_storage(filename: str, compact_layers: bool) -> tuple[float, int, float]:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    tiled_map = TiledMap(compact_layers=compact_layers)
+    tiled_map.load(filename)
+    load_time = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for layer in tiled_map.layers:
+        if isinstance(layer, TiledTileLayer):
+            layer.check_if_animated_gids()
+            for _ in layer.iter_data():
+                pass
+    scan_time = time.perf_counter() - start
+    return load_time, memory, scan_time
+
+
+@benchmark
+def tile_storage(t: str) -> None:
+    """List backed and compact tile layers - load time, memory and scanning all tiles"""
+    for size in [256, 1000]:
+        filename = os.path.join(t, f"map_{size}.tmx")
+        write_synthetic_map(filename, size, size, layers=2)
+        for compact_layers in [False, True]:
+            load_time, memory, scan_time = measure_tile_storage(filename, compact_layers)
+            print(f"{size}x{size} x2 layers {'compact' if compact_layers else 'list   '}:"
+                  f" load {load_time * 1000:8.1f}ms, memory {memory / 1024 / 1024:7.1f}MiB, scan {scan_time * 1000:8.1f}ms")
+
+
+@in_fresh_process
+def load_map(filename: str, streaming: str) -> None:
+    start = time.perf_counter()
+    tiled_map = TiledMap()
+    tiled_map.load(filename, streaming=streaming == "True")
+    elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{elapsed} {peak_rss}")
+
+
+@benchmark
+def map_loading(t: str) -> None:
+    """Loading through DOM and through iterparse - load time and peak RSS"""
+    for size, layers, objects in [(256, 4, 1000), (512, 8, 10000)]:
+        filename = os.path.join(t, f"map_{size}.tmx")
+        write_synthetic_map(filename, size, size, layers=layers, objects=objects)
+        for streaming in [False, True]:
+            elapsed, peak_rss = run_in_fresh_process(load_map, filename, str(streaming))
+            print(f"{size}x{size}, {layers} layers, {objects} objects, {'iterparse' if streaming else 'DOM      '}:"
+                  f" {float(elapsed) * 1000:8.1f}ms, peak RSS {int(peak_rss) / 1024:7.1f}MiB")
+
+
+def load_part(filename: str, lazy_layers: bool, part_no: int) -> tuple[float, float]:
+    start = time.perf_counter()
+    tiled_map = TiledMap(lazy_layers=lazy_layers)
+    tiled_map.load(filename)
+    load_time = time.perf_counter() - start
+
+    # What a Level for one part touches
+    for layer in tiled_map.layers:
+        if isinstance(layer, TiledTileLayer) and layer.name.endswith(f"_{part_no}"):
+            _ = layer.data
+    return load_time, time.perf_counter() - start
+
+
+@benchmark
+def lazy_layers(t: str) -> None:
+    """Eager and lazy decoding of layers of a map made of many parts"""
+    parts = 8
+    # Same layout as level_1and2_combined.tmx - each part has its own background_N, main_N, foreground_N and over_N layers
+    layer_names = [f"{name}_{part}" for part in range(1, parts + 1) for name in ["background", "main", "foreground", "over"]]
+    for size in [64, 256]:
+        filename = os.path.join(t, f"map_{size}.tmx")
+        write_synthetic_map(filename, size, size, layer_names=layer_names, flipped=0.01)
+        for lazy in [False, True]:
+            load_time, total_time = load_part(filename, lazy, 1)
+            print(f"{size}x{size}, {parts} parts, {len(layer_names)} layers, {'lazy ' if lazy else 'eager'}:"
+                  f" load {load_time * 1000:8.1f}ms, load + one part decoded {total_time * 1000:8.1f}ms")
+
+
+@benchmark
+def image_loading(t: str) -> None:
+    """Loading tileset images on the main thread and on a thread pool"""
+    print(f"Image loader threads: {IMAGE_LOADER_THREADS}")
+    for filename in ["assets/top_down/test-level.tmx", "assets/side_scroller/level1.tmx"]:
+        for parallel_images in [False, True]:
+            elapsed = best_of(lambda: TiledMap().load(os.path.join(PROJECT_ROOT, filename), parallel_images=parallel_images), 5)
+            print(f"{filename:40} {'thread pool' if parallel_images else 'main thread'}: {elapsed * 1000:8.1f}ms")
+
+
+@in_fresh_process
+def load_levels(shared_tilesets: str) -> None:
+    start = time.perf_counter()
+    maps = []
+    for filename in LEVELS:
+        tiled_map = TiledMap(shared_tilesets=shared_tilesets == "True")
+        tiled_map.load(filename)
+        maps.append(tiled_map)
+    elapsed = time.perf_counter() - start
+
+    surfaces = {id(ts.image_surface): ts.image_surface for tiled_map in maps for ts in tiled_map.tilesets}
+    pixel_bytes = sum(s.get_width() * s.get_height() * s.get_bytesize() for s in surfaces.values())
+    tile_images = len({id(image) for tiled_map in maps for image in tiled_map.images if image is not None})
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{elapsed} {peak_rss} {pixel_bytes} {len(surfaces)} {tile_images}")
+
+
+@benchmark
+def shared_tilesets(t: str) -> None:
+    """Loading levels with tilesets of their own and with tilesets shared between them"""
+    print(f"Loading {len(LEVELS)} levels")
+    for shared in [False, True]:
+        elapsed, peak_rss, pixel_bytes, surfaces, tile_images = run_in_fresh_process(load_levels, str(shared))
+        print(f"{'shared' if shared else 'per map'} tilesets: {float(elapsed) * 1000:8.1f}ms, peak RSS {int(peak_rss) / 1024:7.1f}MiB,"
+              f" {int(surfaces):3} tileset images with {int(pixel_bytes) / 1024 / 1024:6.1f}MiB of pixels, {int(tile_images):6} tile images")
+
+
+@in_fresh_process
+def load_mirrored_map(filename: str) -> None:
+    start = time.perf_counter()
+    tiled_map = TiledMap()
+    tiled_map.load(filename)
+    elapsed = time.perf_counter() - start
+    transformed_images = [tiled_map.images[gid] for gid in tiled_map.new_gids]
+    pixel_bytes = sum(image.get_width() * image.get_height() * image.get_bytesize() for image in transformed_images)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{elapsed} {peak_rss} {len(tiled_map.new_gids)} {pixel_bytes}")
+
+
+@benchmark
+def transformed_gids(t: str) -> None:
+    """Loading maps with many flipped tiles - load time, peak RSS and transformed tile images"""
+    for size in [64, 256, 512]:
+        filename = os.path.join(t, f"mirrored_{size}.tmx")
+        # Half of the cells are tiles and half of those are flipped horizontally
+        write_synthetic_map(filename, size, size, layers=2, density=0.5, flipped=0.5)
+        elapsed, peak_rss, transformed, pixel_bytes = run_in_fresh_process(load_mirrored_map, filename)
+        print(f"{size}x{size}, 2 layers, mirrored: {float(elapsed) * 1000:8.1f}ms, peak RSS {int(peak_rss) / 1024:7.1f}MiB,"
+              f" {int(transformed):7} transformed gids with {int(pixel_bytes) / 1024 / 1024:7.2f}MiB of pixels")
+
+
+def encode_per_cell(layer: TiledTileLayer) -> bytes:
+    # What _sub_xml used to do before the gid lookup table
+    d = [layer.map.gid_to_original_gid_and_tile_flags(gid) for gid in itertools.chain.from_iterable(layer.data)]
+    return struct.pack("<%dL" % len(d), *d)
+
+
+@benchmark
+def layer_saving(t: str) -> None:
+    """Encoding tile layer data cell by cell and vectorized"""
+    for width, height in [(64, 16), (256, 256), (1024, 1024), (2048, 2048)]:
+        filename = os.path.join(t, f"map_{width}x{height}.tmx")
+        write_synthetic_map(filename, width, height, density=0.5, flipped=0.1)
+        for compact_layers in [False, True]:
+            tiled_map = TiledMap(compact_layers=compact_layers)
+            tiled_map.load(filename)
+            layer = next(iter(tiled_map.layers))
+            per_cell = best_of(lambda: encode_per_cell(layer))
+            vectorized = best_of(lambda: layer._encode_data())
+            save = best_of(lambda: tiled_map._save(io.StringIO(), 0))
+            print(f"{width}x{height} {'compact' if compact_layers else 'list   '}:"
+                  f" encode per cell {per_cell * 1000:9.1f}ms, vectorized {vectorized * 1000:8.1f}ms,"
+                  f" whole save {save * 1000:9.1f}ms")
+
+
+def mark_all_dirty(tiled_map: TiledMap) -> None:
+    # What every save cost before dirty tracking
+    for layer in tiled_map.layers:
+        layer.dirty_data = True
+        if isinstance(layer, TiledObjectGroup):
+            for obj in layer.objects:
+                obj.dirty_data = True
+
+
+@benchmark
+def incremental_save(t: str) -> None:
+    """Saving whole map and saving only what changed since the last save"""
+    for size, objects in [(256, 1000), (1024, 5000), (2048, 20000)]:
+        filename = os.path.join(t, f"map_{size}.tmx")
+        write_synthetic_map(filename, size, size, layers=4, flipped=0.01, objects=objects)
+        tiled_map = TiledMap()
+        tiled_map.load(filename)
+        tile_layer = next(layer for layer in tiled_map.layers if isinstance(layer, TiledTileLayer))
+        obj = next(iter(next(layer for layer in tiled_map.layers if isinstance(layer, TiledObjectGroup)).objects))
+
+        def save() -> None:
+            tiled_map._save(io.StringIO(), 0)
+
+        first_save = timed(save)
+        mark_all_dirty(tiled_map)
+        full_save = timed(save)
+
+        obj.x += 18
+        object_moved = timed(save)
+
+        tile_layer.data[10][10] = 5
+        tile_layer.dirty_data = True
+        tile_plotted = timed(save)
+
+        print(f"{size}x{size}, 4 layers, {objects:6} objects: first save {first_save * 1000:8.1f}ms,"
+              f" everything dirty {full_save * 1000:8.1f}ms, one object moved {object_moved * 1000:7.1f}ms,"
+              f" one tile plotted {tile_plotted * 1000:7.1f}ms")
+
+
+def save_all_layers(tiled_map: TiledMap, filename: str, compression_level: int, threads: int) -> tuple[float, int]:
+    for layer in tiled_map.layers:
+        layer.dirty_data = True
+    with patch.object(tmx, "LAYER_COMPRESSION_THREADS", threads):
+        start = time.perf_counter()
+        tiled_map.save(filename, compression_level=compression_level)
+        elapsed = time.perf_counter() - start
+    return elapsed, os.path.getsize(filename)
+
+
+@benchmark
+def parallel_save(t: str) -> None:
+    """Compressing layers on one and on many threads at each compression level"""
+    print(f"{os.cpu_count()} CPUs")
+    for size, layers in [(256, 16), (1024, 8)]:
+        filename = os.path.join(t, f"map_{size}.tmx")
+        write_synthetic_map(filename, size, size, layers=layers, flipped=0.01)
+        tiled_map = TiledMap()
+        tiled_map.load(filename)
+        for name, compression_level in [("fast", COMPRESSION_LEVEL_FAST), ("default", COMPRESSION_LEVEL_DEFAULT), ("best", COMPRESSION_LEVEL_BEST)]:
+            for threads in [1, max(4, tmx.LAYER_COMPRESSION_THREADS)]:
+                elapsed, file_size = save_all_layers(tiled_map, os.path.join(t, "saved.tmx"), compression_level, threads)
+                print(f"{size}x{size}, {layers} layers, {name:7}, {threads} threads: save {elapsed * 1000:8.1f}ms, {file_size / 1024:8.1f}KiB")
+
+
+def load_infinite_map(filename: str) -> tuple[float, int, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    tiled_map = TiledMap()
+    tiled_map.load(filename)
+    elapsed = time.perf_counter() - start
+    layer = next(layer for layer in tiled_map.layers if isinstance(layer, TiledTileLayer))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, current, len(layer.data.chunks)
+
+
+@benchmark
+def infinite_maps(t: str) -> None:
+    """Loading sparsely painted infinite worlds - load time and memory held"""
+    world_size = 10000
+    chunks_across = world_size // 16
+    rnd = random.Random(1)
+    for painted in [10, 100, 1000, 10000]:
+        filename = os.path.join(t, f"world_{painted}.tmx")
+        painted_chunks = list({(rnd.randrange(chunks_across), rnd.randrange(chunks_across)) for _ in range(painted)})
+        write_synthetic_infinite_map(filename, world_size, world_size, painted_chunks)
+        elapsed, memory, chunks = load_infinite_map(filename)
+        print(f"{world_size}x{world_size} world, {chunks:6} painted 16x16 chunks: load {elapsed * 1000:8.1f}ms,"
+              f" {memory / 1024 / 1024:8.2f}MiB held after load")
+    # Flat storage of the same world would need world_size * world_size cells
+    print(f"Flat list storage of {world_size}x{world_size}: at least {world_size * world_size * 8 / 1024 / 1024:8.1f}MiB of list slots alone")
+
+
+def parse_xml_attributes_per_attribute(self: TiledElement, node: Element) -> None:
+    # What _parse_xml_attributes used to do before attribute binders
+    for key, value in node.items():
+        try:
+            if key in self.ATTRIBUTES:
+                typ = self.ATTRIBUTES[key].type
+                if typ is bool:
+                    typ = convert_to_bool
+                casted_value = typ(value)
+            else:
+                casted_value = TYPES[key](value)
+        except ValueError as e:
+            raise ValueError(f"Failed to convert {key}", e)
+        if hasattr(self, key) and not isinstance(getattr(self, key), Callable):
+            try:
+                setattr(self, key, casted_value)
+            except AttributeError:
+                setattr(self, "_" + key, casted_value)
+        else:
+            logger.debug(f"Object {self} does not have attr {key}")
+
+
+@benchmark
+def object_loading(t: str) -> None:
+    """Loading objects with per attribute lookups and with attribute binders"""
+    for objects in [1000, 10000, 50000]:
+        filename = os.path.join(t, f"objects_{objects}.tmx")
+        write_synthetic_map(filename, 64, 64, objects=objects)
+        with patch.object(TiledElement, "_parse_xml_attributes", parse_xml_attributes_per_attribute):
+            per_attribute = best_of(lambda: TiledMap().load(filename))
+        binders = best_of(lambda: TiledMap().load(filename))
+        print(f"64x64, {objects:6} objects: load with per attribute lookups {per_attribute * 1000:8.1f}ms,"
+              f" with attribute binders {binders * 1000:8.1f}ms")
+
+
+def retained_memory(filename: str) -> tuple[int, float]:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    tiled_map = TiledMap()
+    tiled_map.load(filename)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tiled_map
+    return size, elapsed
+
+
+@benchmark
+def object_memory(t: str) -> None:
+    """Memory retained per loaded object"""
+    empty_filename = os.path.join(t, "objects_0.tmx")
+    write_synthetic_map(empty_filename, 64, 64, objects=0)
+    empty_size, _ = retained_memory(empty_filename)
+    for objects in [10000, 50000]:
+        filename = os.path.join(t, f"objects_{objects}.tmx")
+        write_synthetic_map(filename, 64, 64, objects=objects)
+        size, elapsed = retained_memory(filename)
+        print(f"64x64, {objects:6} objects: retained {size / 1024 / 1024:7.2f}MiB,"
+              f" {(size - empty_size) / objects:6.0f} bytes per object, loaded in {elapsed * 1000:8.1f}ms (traced)")
+
+
+def find_by_scanning(layer: TiledObjectGroup, name: str) -> TiledObject:
+    # What TiledObjectGroup.__getitem__ used to do before the name index
+    for o in layer.objects_id_map.values():
+        if o.name == name:
+            return o
+    raise KeyError(f"No object with name {name}")
+
+
+@benchmark
+def object_lookup(t: str) -> None:
+    """Finding objects by name and by type by scanning and through indexes"""
+    objects = 10000
+    filename = os.path.join(t, f"objects_{objects}.tmx")
+    write_synthetic_map(filename, 64, 64, objects=objects)
+    tiled_map = TiledMap()
+    tiled_map.load(filename)
+    layer = next(layer for layer in tiled_map.layers if isinstance(layer, TiledObjectGroup))
+
+    rnd = random.Random(1)
+    names = [f"object_{rnd.randrange(objects)}" for _ in range(1000)]
+
+    scanning = timed(lambda: [find_by_scanning(layer, name) for name in names])
+    indexed = timed(lambda: [layer[name] for name in names])
+    chained = timed(lambda: [tiled_map.object_by_name[name] for name in names])
+    print(f"{objects} objects, {len(names)} lookups by name: scanning {scanning * 1000:8.2f}ms,"
+          f" name index {indexed * 1000:6.2f}ms, through map's object_by_name {chained * 1000:6.2f}ms")
+
+    scanning = timed(lambda: [[o for o in layer.objects if o.type == "coin"] for _ in range(1000)])
+    indexed = timed(lambda: [layer.objects_of_type("coin") for _ in range(1000)])
+    print(f"{objects} objects, 1000 lookups by type: scanning {scanning * 1000:8.2f}ms, type index {indexed * 1000:6.2f}ms")
+
+
+def add_object_with_max_id(self: TiledObjectGroup, obj: TiledObject) -> None:
+    # What TiledObjectGroup.add_object used to do before running id counters
+    if obj.id == 0:
+        obj.id = (max(obj.id for obj in self.objects_id_map.values()) + 1) if len(self.objects_id_map) > 0 else 1
+    self.objects_id_map[obj.id] = obj
+    self._index(self.objects_name_map, obj.name, obj)
+    self._index(self.objects_type_map, obj.type, obj)
+
+
+def add_layer_rebuilding(self: TiledMap, layer: BaseTiledLayer) -> None:
+    # What TiledMap.add_layer used to do before running id counters
+    self.layer_id_map[layer.id] = layer
+    if isinstance(layer, TiledObjectGroup):
+        self.object_by_name = ChainMap(*[layer.object_by_name for layer in self.layers if isinstance(layer, TiledObjectGroup)])
+        self.nextobjectid = max(self.nextobjectid, max(map(lambda o: o.id, layer.objects_id_map.values())) + 1 if len(layer.objects_id_map) > 0 else 0)
+    self.nextlayerid = max(self.nextlayerid, max(map(lambda o: o.id, self.layer_id_map.values())) if len(self.layer_id_map) > 0 else 0)
+
+
+def paste_objects(filename: str, count: int) -> float:
+    tiled_map = TiledMap()
+    tiled_map.load(filename)
+    layer = next(layer for layer in tiled_map.layers if isinstance(layer, TiledObjectGroup))
+
+    start = time.perf_counter()
+    for i in range(count):
+        obj = TiledObject(layer)
+        obj.name = f"pasted_{i}"
+        layer.add_object(obj)
+    return time.perf_counter() - start
+
+
+def add_layers(filename: str, count: int) -> float:
+    tiled_map = TiledMap()
+    tiled_map.load(filename)
+
+    start = time.perf_counter()
+    for i in range(count):
+        layer = TiledObjectGroup(tiled_map)
+        layer.id = tiled_map.nextlayerid + 1
+        tiled_map.add_layer(layer)
+    return time.perf_counter() - start
+
+
+@benchmark
+def object_adding(t: str) -> None:
+    """Adding objects and object layers with ids worked out from all of them and with running counters"""
+    filename = os.path.join(t, "objects.tmx")
+    write_synthetic_map(filename, 64, 64, objects=100)
+
+    for count in [5000, 10000, 20000]:
+        with patch.object(TiledObjectGroup, "add_object", add_object_with_max_id):
+            with_max = paste_objects(filename, count)
+        with_counter = paste_objects(filename, count)
+        print(f"adding {count:5} objects: with max id over layer {with_max * 1000:9.1f}ms,"
+              f" with running counter {with_counter * 1000:7.1f}ms")
+
+    for count in [500, 1000, 2000]:
+        with patch.object(TiledMap, "add_layer", add_layer_rebuilding):
+            rebuilding = add_layers(filename, count)
+        incremental = add_layers(filename, count)
+        print(f"adding {count:5} object layers: rebuilding name chain {rebuilding * 1000:9.1f}ms,"
+              f" incremental {incremental * 1000:7.1f}ms")
+
+
+def update_tiles_property(self: TiledMap) -> None:
+    # What TiledMap did on every add_tileset before incrementally updated lookups
+    self.tiles.clear()
+    for ts in self.tilesets:
+        for i in range(ts.tilecount):
+            gid = ts.firstgid + i
+            try:
+                self.tiles[gid] = ts.tiles[i]
+            except KeyError as e:
+                print(f"{e}")
+
+
+def add_tileset_rebuilding(self: TiledMap, tileset: TiledTileset) -> None:
+    if len(self.tilesets) == 0:
+        self.maxgid = 0
+    tileset.firstgid = self.maxgid + 1
+    self.tilesets.append(tileset)
+    self.tilesets_firstgids.append(tileset.firstgid)
+    update_tiles_property(self)
+    self.tiles_by_name = ChainMap(*[ts.tiles_by_name for ts in self.tilesets])
+    self.tile_animations = ChainMap(*[ts.tile_animations for ts in self.tilesets])
+    self._update_tileset_change(tileset)
+
+
+def write_map_with_tilesets(filename: str, tilesets: int) -> None:
+    with open(filename, "w") as f:
+        f.write("<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n")
+        f.write("<map version=\"1.11\" tiledversion=\"1.11.0\" orientation=\"orthogonal\" renderorder=\"right-down\""
+                " width=\"4\" height=\"4\" tilewidth=\"18\" tileheight=\"18\" infinite=\"0\" nextlayerid=\"2\" nextobjectid=\"1\">\n")
+        for i in range(tilesets):
+            f.write(f" <tileset firstgid=\"{1 + i * 180}\" source=\"{TILES_TILESET}\"/>\n")
+        f.write(" <layer id=\"1\" name=\"main\" width=\"4\" height=\"4\">\n")
+        f.write("  <data encoding=\"csv\">\n" + ",\n".join(["0,0,0,0"] * 4) + "\n  </data>\n")
+        f.write(" </layer>\n")
+        f.write("</map>\n")
+
+
+def time_adding_tilesets(filename: str, count: int) -> float:
+    tiled_map = TiledMap(shared_tilesets=True)
+    tiled_map.load(filename)
+    start = time.perf_counter()
+    for _ in range(count):
+        tileset = TiledTileset(tiled_map)
+        tileset.load(str(TILES_TILESET))
+        tiled_map.add_tileset(tileset)
+    return (time.perf_counter() - start) / count
+
+
+def time_animation_lookups(tiled_map: TiledMap, tile_animations, repeat: int = 200) -> float:
+    gids = list(range(1, tiled_map.maxgid + 1))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for gid in gids:
+            if gid in tile_animations:
+                _ = tile_animations[gid]
+    return time.perf_counter() - start
+
+
+@benchmark
+def tileset_lookups(t: str) -> None:
+    """Adding tilesets with lookups rebuilt and updated, and animation lookups through ChainMap and flattened dict"""
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+    for tilesets in [10, 50]:
+        filename = os.path.join(t, f"tilesets_{tilesets}.tmx")
+        write_map_with_tilesets(filename, tilesets)
+
+        with patch.object(TiledMap, "add_tileset", add_tileset_rebuilding):
+            rebuilding = time_adding_tilesets(filename, 5)
+        incremental = time_adding_tilesets(filename, 5)
+        print(f"adding tileset to map with {tilesets} tilesets: rebuilding lookups {rebuilding * 1000:7.2f}ms,"
+              f" incremental {incremental * 1000:7.2f}ms (both including tile images)")
+
+        tiled_map = TiledMap(shared_tilesets=True)
+        tiled_map.load(filename)
+        chain = ChainMap(*[ts.tile_animations for ts in tiled_map.tilesets])
+        print(f"{tiled_map.maxgid * 200} 'is animated' lookups over {tilesets} tilesets:"
+              f" ChainMap {time_animation_lookups(tiled_map, chain) * 1000:7.1f}ms,"
+              f" flattened dict {time_animation_lookups(tiled_map, tiled_map.tile_animations) * 1000:7.1f}ms")
+
+
+def main(names: list[str]) -> None:
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmarks: {', '.join(unknown)}")
+        for name, f in BENCHMARKS.items():
+            print(f"  {name:20} {f.__doc__}")
+        sys.exit(1)
+
+    for name in names or BENCHMARKS:
+        print(f"{name}: {BENCHMARKS[name].__doc__}")
+        with TemporaryDirectory() as t:
+            BENCHMARKS[name](t)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == "--in-fresh-process":
+        IN_FRESH_PROCESS[sys.argv[2]](*sys.argv[3:])
+    else:
+        main(sys.argv[1:])
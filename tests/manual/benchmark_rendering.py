@@ -0,0 +1,393 @@
+"""Benchmarks of drawing layers and rendering levels.
+
+Run from project root: python tests/manual/benchmark_rendering.py [benchmark ...]
+Runs given benchmarks, all of them by default.
+"""
+import os
+import sys
+import time
+from tempfile import TemporaryDirectory
+from typing import Callable
+from unittest.mock import patch
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(PROJECT_ROOT)
+
+import pygame
+from pygame import Rect, Surface
+
+import engine.level
+from engine.game import Game, open_display
+from engine.game_context import GameContext
+from engine.level import Level
+from engine.tmx import TiledMap, TiledTileLayer, TiledTileAnimations, TiledTileAnimation, TileChunkCache, TiledObjectGroup
+from tests.fixtures import write_synthetic_map
+
+ANIMATED_GID = 35
+STATIC_GID = 1
+
+BENCHMARKS: dict[str, Callable[[str], None]] = {}
+
+
+def benchmark(f: Callable[[str], None]) -> Callable[[str], None]:
+    BENCHMARKS[f.__name__] = f
+    return f
+
+
+def time_draw(draw: Callable[[Surface, Rect, int, int, float], None], surface: Surface, scroll: int, frames: int = 200) -> float:
+    viewport = surface.get_rect()
+    start = time.perf_counter()
+    for i in range(frames):
+        draw(surface, viewport, -i * scroll, 0, i * 0.016)
+    return (time.perf_counter() - start) / frames
+
+
+def load_level_map(filename: str) -> TiledMap:
+    tiled_map = TiledMap()
+    tiled_map.load(filename)
+    tiled_map.object_by_name["object_0"].name = "player"
+    return tiled_map
+
+
+def time_level_rendering(tiled_map: TiledMap, screen_rect: Rect, speed: int, full: bool, frames: int = 200) -> float:
+    level = Level(screen_rect, tiled_map)
+    level.x_offset = 0
+    level.y_offset = 0
+    level.render_offscreen(full=True)
+
+    start = time.perf_counter()
+    for i in range(frames):
+        level.x_offset = (level.x_offset + speed) % (level.width - screen_rect.width)
+        level.render_offscreen(full=full)
+    return (time.perf_counter() - start) / frames
+
+
+def load_animated_layer(filename: str, gid: int, frames: int) -> TiledTileLayer:
+    tiled_map = TiledMap()
+    tiled_map.load(filename)
+    # water-like animation that goes through many tiles
+    animations = TiledTileAnimations()
+    for i in range(frames):
+        animations.add_frame(TiledTileAnimation(ANIMATED_GID + i % 4, 100))
+    tiled_map.tile_animations[ANIMATED_GID] = animations
+
+    layer = next(layer for layer in tiled_map.layers if isinstance(layer, TiledTileLayer))
+    for row in layer.data:
+        row[:] = [gid] * len(row)
+    layer.tiles_changed()
+    layer.check_if_animated_gids()
+    layer.animate_layer = True
+    return layer
+
+
+@benchmark
+def animated_layers(t: str) -> None:
+    """Drawing layers of static tiles and of animated tiles"""
+    surface = Surface((1280, 720))
+    filename = os.path.join(t, "map.tmx")
+    write_synthetic_map(filename, 128, 128)
+
+    for frames in [2, 16]:
+        static = time_draw(load_animated_layer(filename, STATIC_GID, frames).draw, surface, 1, 50)
+        animated = time_draw(load_animated_layer(filename, ANIMATED_GID, frames).draw, surface, 1, 50)
+        print(f"1280x720 viewport, 18px tiles, {frames:2} frame animation: static tiles {static * 1000:6.2f}ms,"
+              f" animated tiles {animated * 1000:6.2f}ms per frame")
+
+
+def frames_per_second(layers: list[TiledTileLayer], surface: Surface, frames: int = 200) -> float:
+    viewport = surface.get_rect()
+    start = time.perf_counter()
+    for i in range(frames):
+        # scrolling right and down by 3 pixels a frame
+        surface.fill((0, 0, 0))
+        for layer in layers:
+            layer.draw(surface, viewport, -3 * i, -i, current_time=i * 0.016)
+    return frames / (time.perf_counter() - start)
+
+
+@benchmark
+def chunk_cache(t: str) -> None:
+    """Drawing layers tile by tile and from chunk cache"""
+    filename = os.path.join(t, "map.tmx")
+    write_synthetic_map(filename, 256, 128, layers=3, density=0.7)
+    tiled_map = TiledMap()
+    tiled_map.load(filename)
+    layers = [layer for layer in tiled_map.layers if isinstance(layer, TiledTileLayer)]
+
+    for width, height in [(1024, 640), (1920, 1080), (2560, 1440)]:
+        surface = Surface((width, height)).convert()
+        for layer in layers:
+            layer.chunk_cache = None
+        direct = frames_per_second(layers, surface)
+        for layer in layers:
+            layer.chunk_cache = TileChunkCache([layer])
+        cached = frames_per_second(layers, surface)
+        print(f"{width}x{height} viewport, 3 layers of 18px tiles: direct {direct:6.1f}fps, chunk cache {cached:6.1f}fps"
+              f" ({sum(len(layer.chunk_cache.chunks) for layer in layers)} chunks)")
+
+
+@benchmark
+def scroll_rendering(t: str) -> None:
+    """Rendering whole level every frame and scrolling what was already rendered"""
+    filename = os.path.join(t, "map.tmx")
+    write_synthetic_map(filename, 1000, 60, density=0.6, objects=200, layer_names=["background", "main", "foreground"])
+
+    for width, height in [(1024, 640), (1920, 1080)]:
+        for speed in [2, 4]:
+            with patch.object(engine.level, "scroll_rendering", False):
+                full = time_level_rendering(load_level_map(filename), Rect(0, 0, width, height), speed, False, 300)
+            scrolled = time_level_rendering(load_level_map(filename), Rect(0, 0, width, height), speed, False, 300)
+            print(f"{width}x{height} viewport scrolling {speed}px a frame, 3 layers and 200 objects:"
+                  f" full render {full * 1000:6.2f}ms, scroll rendering {scrolled * 1000:6.2f}ms per frame")
+
+
+def time_game_frames(filename: str, screen: pygame.Surface, dirty_rects: bool, scroll: int, frames: int = 300) -> float:
+    level = Level(screen.get_rect(), load_level_map(filename))
+    game_context = GameContext({"level": level})
+    game_context.set_level(level)
+    game = Game(screen, game_context, 60, dirty_rects=dirty_rects)
+
+    def draw_frame() -> None:
+        # what Game.main_loop does to draw a frame
+        if game.dirty_rects:
+            game.draw_dirty_rects()
+        else:
+            screen.fill((0, 0, 0))
+            game_context.draw(screen)
+            pygame.display.flip()
+
+    level.x_offset = 0
+    draw_frame()
+    start = time.perf_counter()
+    for _ in range(frames):
+        level.x_offset += scroll
+        draw_frame()
+    return (time.perf_counter() - start) / frames
+
+
+@benchmark
+def dirty_rects(t: str) -> None:
+    """Presenting whole frame and presenting only changed areas"""
+    filename = os.path.join(t, "map.tmx")
+    write_synthetic_map(filename, 1000, 60, density=0.6, objects=200, layer_names=["background", "main", "foreground"])
+
+    for width, height in [(1024, 640), (1920, 1080)]:
+        screen = pygame.display.set_mode((width, height))
+        for scroll, scene in [(0, "idle"), (2, "scrolling 2px a frame")]:
+            full = time_game_frames(filename, screen, False, scroll)
+            dirty = time_game_frames(filename, screen, True, scroll)
+            print(f"{width}x{height} {scene:22}: whole frame {full * 1000:6.2f}ms, dirty rects {dirty * 1000:6.2f}ms per frame")
+
+
+def draw_tile_by_tile(layer: TiledTileLayer) -> Callable[[Surface, Rect, int, int, float], None]:
+    def draw(surface: Surface, viewport: Rect, xo: int, yo: int, current_time: float) -> None:
+        # what TiledTileLayer.draw used to do - one blit call per tile
+        tiled_map = layer.map
+        images = tiled_map.images
+        data = layer.data
+        tilewidth = tiled_map.tilewidth
+        tileheight = tiled_map.tileheight
+        frame_gids = tiled_map.animation_frame_gids(current_time) if layer.animate_layer else {}
+
+        dy = -(yo // tileheight) - 1
+        oy = yo % tileheight - tileheight
+        start_dx = -(xo // tilewidth) - 1
+        ox = xo % tilewidth - tilewidth
+        for y in range(viewport.y + oy, viewport.bottom + tileheight, tileheight):
+            if 0 <= dy < tiled_map.height:
+                dx = start_dx
+                for x in range(viewport.x + ox, viewport.right + tilewidth, tilewidth):
+                    if 0 <= dx < tiled_map.width:
+                        gid = data[dy][dx]
+                        if gid > 0:
+                            surface.blit(images[frame_gids.get(gid, gid)], (x, y))
+                    dx += 1
+            dy += 1
+    return draw
+
+
+def load_blits_layer(filename: str, animated: bool) -> TiledTileLayer:
+    tiled_map = TiledMap()
+    tiled_map.load(filename)
+    layer = next(layer for layer in tiled_map.layers if isinstance(layer, TiledTileLayer))
+    if animated:
+        animations = TiledTileAnimations()
+        for i in range(4):
+            animations.add_frame(TiledTileAnimation(ANIMATED_GID + i, 100))
+        tiled_map.tile_animations[ANIMATED_GID] = animations
+        # every tenth tile is animated
+        for row in layer.data:
+            row[::10] = [ANIMATED_GID] * len(row[::10])
+        layer.tiles_changed()
+        layer.check_if_animated_gids()
+    return layer
+
+
+@benchmark
+def layer_blits(t: str) -> None:
+    """Drawing layers with one blit call per tile and with one batched call"""
+    filename = os.path.join(t, "map.tmx")
+    write_synthetic_map(filename, 1000, 128, density=0.8)
+
+    for width, height in [(1024, 640), (1920, 1080)]:
+        surface = Surface((width, height))
+        for scroll, animated, scene in [(0, False, "static camera"), (2, False, "scrolling camera"), (0, True, "animated tiles")]:
+            layer = load_blits_layer(filename, animated)
+            old = time_draw(draw_tile_by_tile(layer), surface, scroll)
+            new = time_draw(layer.draw, surface, scroll)
+            print(f"{width}x{height} {scene:16}: tile by tile {old * 1000:6.2f}ms, batched {new * 1000:6.2f}ms per frame")
+
+
+@benchmark
+def composite_layers(t: str) -> None:
+    """Rendering level layers one by one and composited into one surface"""
+    for width, height in [(100, 60), (1000, 60)]:
+        filename = os.path.join(t, f"map_{width}.tmx")
+        write_synthetic_map(filename, width, height, density=0.6, objects=200, layer_names=["background", "main", "foreground", "over"])
+
+        for screen_width, screen_height in [(1024, 640), (1920, 1080)]:
+            screen_rect = Rect(0, 0, screen_width, screen_height)
+            for full, scene in [(True, "full render"), (False, "scroll rendering")]:
+                with patch.object(engine.level, "composite_layers", False):
+                    separate = time_level_rendering(load_level_map(filename), screen_rect, 2, full)
+                composited = time_level_rendering(load_level_map(filename), screen_rect, 2, full)
+                print(f"{width}x{height} map, {screen_width}x{screen_height} viewport, {scene:16}:"
+                      f" separate layers {separate * 1000:6.2f}ms, composited {composited * 1000:6.2f}ms per frame")
+
+
+def load_partly_animated_map(filename: str, animated_share: float) -> TiledMap:
+    tiled_map = load_level_map(filename)
+    # synthetic maps use all tiles of the tileset - only given share of cells keeps animated tiles
+    animated_gid = next(iter(tiled_map.tile_animations))
+    for layer in tiled_map.layers:
+        if isinstance(layer, TiledTileLayer):
+            every = int(1 / animated_share) if animated_share > 0 else 0
+            for y, row in enumerate(layer.data):
+                row[:] = [1 if gid in tiled_map.tile_animations else gid for gid in row]
+                if every > 0:
+                    row[y % every::every] = [animated_gid] * len(row[y % every::every])
+            layer.tiles_changed()
+    return tiled_map
+
+
+@benchmark
+def animated_cells(t: str) -> None:
+    """Drawing layers and rendering level with no, few and many animated cells"""
+    filename = os.path.join(t, "map.tmx")
+    write_synthetic_map(filename, 1000, 60, density=0.6, objects=200, layer_names=["background", "main", "foreground"])
+
+    for width, height in [(1024, 640), (1920, 1080)]:
+        surface = Surface((width, height))
+        for animated_share, scene in [(0, "static"), (1 / 2000, "few animated"), (1 / 20, "5% animated")]:
+            tiled_map = load_partly_animated_map(filename, animated_share)
+            layer = next(layer for layer in tiled_map.layers if isinstance(layer, TiledTileLayer))
+            layer_draw = time_draw(layer.draw, surface, 2)
+            level_rendering = time_level_rendering(load_partly_animated_map(filename, animated_share), Rect(0, 0, width, height), 2, False)
+            print(f"{width}x{height} scrolling 2px a frame, {scene:12}: layer draw {layer_draw * 1000:6.2f}ms,"
+                  f" level rendering {level_rendering * 1000:6.2f}ms per frame")
+
+
+def draw_every_object(layer: TiledObjectGroup) -> Callable[[Surface, Rect, int, int, float], None]:
+    def draw(surface: Surface, viewport: Rect, xo: int, yo: int, current_time: float) -> None:
+        # what TiledObjectGroup.draw used to do - all objects, every frame
+        layer.map.animation_frame_gids(current_time)
+        xo += viewport.x
+        yo += viewport.y
+        for obj in layer.objects:
+            if obj.image and obj.visible:
+                surface.blit(obj.image, (obj.x + xo, obj.y + yo))
+    return draw
+
+
+def moving_objects(layer: TiledObjectGroup, draw: Callable[[Surface, Rect, int, int, float], None], moving: int) -> Callable[[Surface, Rect, int, int, float], None]:
+    objects = list(layer.objects)[:moving]
+
+    def draw_moved(surface: Surface, viewport: Rect, xo: int, yo: int, current_time: float) -> None:
+        for obj in objects:
+            obj.x += 1
+        draw(surface, viewport, xo, yo, current_time)
+    return draw_moved
+
+
+@benchmark
+def object_drawing(t: str) -> None:
+    """Drawing every object and only objects found through spatial index"""
+    surface = Surface((1024, 640))
+    for objects in [200, 2000, 20000]:
+        filename = os.path.join(t, f"map_{objects}.tmx")
+        write_synthetic_map(filename, 1000, 400, density=0.0, objects=objects)
+        tiled_map = TiledMap()
+        tiled_map.load(filename)
+        layer = next(layer for layer in tiled_map.layers if isinstance(layer, TiledObjectGroup))
+        for draworder in ["index", "topdown"]:
+            layer.draworder = draworder
+            for moving in [0, 20]:
+                old = time_draw(moving_objects(layer, draw_every_object(layer), moving), surface, 2)
+                new = time_draw(moving_objects(layer, layer.draw, moving), surface, 2)
+                print(f"{objects:5} objects, {draworder:7}, {moving:2} moving, 1024x640 viewport scrolling:"
+                      f" every object {old * 1000:6.2f}ms, spatial index {new * 1000:6.2f}ms per frame")
+
+
+def time_scaled_frames(filename: str, window_size: tuple[int, int], scale: int, frames: int = 200) -> tuple[float, int]:
+    screen, window = open_display(window_size, scale)
+    level = Level(screen.get_rect(), load_level_map(filename))
+    # tiles are blitted one by one, not from pre-rendered chunks, so they can be counted
+    for layer in level.layers:
+        if isinstance(layer, TiledTileLayer):
+            layer.chunk_cache = None
+    game_context = GameContext({"level": level})
+    game_context.set_level(level)
+    game = Game(screen, game_context, 60, window=window)
+
+    tile_blits = 0
+    original_draw = TiledTileLayer.draw
+
+    def counting_draw(layer: TiledTileLayer, *args, **kwargs) -> None:
+        nonlocal tile_blits
+        original_draw(layer, *args, **kwargs)
+        tile_blits += len(layer._blits)
+
+    level.x_offset = 0
+    with patch.object(TiledTileLayer, "draw", counting_draw):
+        start = time.perf_counter()
+        for _ in range(frames):
+            level.x_offset += 2
+            # what Game.main_loop does to draw a frame
+            screen.fill((0, 0, 0))
+            game_context.draw(screen)
+            game.present()
+        return (time.perf_counter() - start) / frames, tile_blits // frames
+
+
+@benchmark
+def scaled_screen(t: str) -> None:
+    """Rendering whole frame to windows of different sizes and scales"""
+    filename = os.path.join(t, "map.tmx")
+    write_synthetic_map(filename, 1000, 60, density=0.6, objects=200, layer_names=["background", "main", "foreground"])
+
+    # whole frame is rendered each frame
+    with patch.object(engine.level, "scroll_rendering", False), patch.object(engine.level, "composite_layers", False):
+        for window_size in [(1024, 640), (1920, 1080)]:
+            for scale in [1, 2, 4]:
+                per_frame, tile_blits = time_scaled_frames(filename, window_size, scale)
+                print(f"{window_size[0]}x{window_size[1]} window, scale {scale}: {per_frame * 1000:6.2f}ms and {tile_blits:5} tile blits per frame")
+
+
+def main(names: list[str]) -> None:
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmarks: {', '.join(unknown)}")
+        for name, f in BENCHMARKS.items():
+            print(f"  {name:20} {f.__doc__}")
+        sys.exit(1)
+
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+    for name in names or BENCHMARKS:
+        print(f"{name}: {BENCHMARKS[name].__doc__}")
+        with TemporaryDirectory() as t:
+            BENCHMARKS[name](t)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,7 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# compact layers need numpy - without it tests run with list backed layers only
+COMPACT_LAYERS_OPTIONS = [False, True] if numpy is not None else [False]
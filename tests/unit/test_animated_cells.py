@@ -0,0 +1,80 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from pygame import Rect
+
+from engine.tmx import TiledMap, TiledTileLayer, TiledTileAnimations, TiledTileAnimation
+from tests.fixtures import write_synthetic_map, write_synthetic_infinite_map
+from tests.unit import COMPACT_LAYERS_OPTIONS
+
+ANIMATED_GID = 35
+
+
+class TestAnimatedCells(TestCase):
+    @staticmethod
+    def _load(filename: str, compact_layers: bool = False) -> TiledTileLayer:
+        tiled_map = TiledMap(compact_layers=compact_layers)
+        tiled_map.load(filename)
+        tiled_map.tile_animations.clear()
+        layer = next(layer for layer in tiled_map.layers if isinstance(layer, TiledTileLayer))
+        layer.check_if_animated_gids()
+        return layer
+
+    def assert_index_is_same_as_cells(self, layer: TiledTileLayer) -> None:
+        tile_animations = layer.map.tile_animations
+        area = layer.bounds.inflate(4, 4)
+        self.assertEqual([(x, y, gid) for x, y, gid in layer.cells(area) if gid in tile_animations], list(layer.animated_cells(area)))
+        self.assertEqual(len(tile_animations) > 0 and any(gid in tile_animations for _, _, gid in layer.cells(area)), layer.animate_layer)
+
+    def assert_index_is_kept_up_to_date(self, layer: TiledTileLayer) -> None:
+        self.assertFalse(layer.animate_layer)
+        self.assertEqual([], list(layer.animated_cells(layer.bounds)))
+
+        animations = TiledTileAnimations()
+        for i in range(4):
+            animations.add_frame(TiledTileAnimation(ANIMATED_GID + i, 100))
+        layer.map.tile_animations[ANIMATED_GID] = animations
+        layer.check_if_animated_gids()
+        self.assert_index_is_same_as_cells(layer)
+
+        layer.set_gid_at(3, 2, ANIMATED_GID)
+        layer.set_gid_at(7, 2, ANIMATED_GID)
+        self.assertEqual([(3, 2, ANIMATED_GID), (7, 2, ANIMATED_GID)], list(layer.animated_cells(Rect(0, 2, 10, 1))))
+        self.assert_index_is_same_as_cells(layer)
+
+        layer.set_gid_at(3, 2, 1)
+        self.assertEqual([(7, 2, ANIMATED_GID)], list(layer.animated_cells(Rect(0, 2, 10, 1))))
+        self.assert_index_is_same_as_cells(layer)
+
+        for x, y, gid in list(layer.animated_cells(layer.bounds)):
+            layer.set_gid_at(x, y, 0)
+        self.assert_index_is_same_as_cells(layer)
+
+    def test_index_is_kept_up_to_date(self) -> None:
+        with TemporaryDirectory() as t:
+            filename = os.path.join(t, "map.tmx")
+            write_synthetic_map(filename, 40, 30)
+            for compact_layers in COMPACT_LAYERS_OPTIONS:
+                self.assert_index_is_kept_up_to_date(self._load(filename, compact_layers))
+
+            filename = os.path.join(t, "infinite.tmx")
+            write_synthetic_infinite_map(filename, 40, 30, [(0, 0), (-1, -1), (1, 1)])
+            self.assert_index_is_kept_up_to_date(self._load(filename))
+
+    def test_index_follows_data_and_shape(self) -> None:
+        with TemporaryDirectory() as t:
+            filename = os.path.join(t, "map.tmx")
+            write_synthetic_map(filename, 40, 30)
+            tiled_map = TiledMap()
+            tiled_map.load(filename)
+            layer = next(layer for layer in tiled_map.layers if isinstance(layer, TiledTileLayer))
+            self.assertTrue(layer.animate_layer)
+            self.assert_index_is_same_as_cells(layer)
+
+            layer.width = 20
+            self.assert_index_is_same_as_cells(layer)
+
+            layer.data = [[1] * 20 for _ in range(30)]
+            self.assertFalse(layer.animate_layer)
+            self.assert_index_is_same_as_cells(layer)
@@ -0,0 +1,46 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from engine.tmx import TiledMap, TiledTileAnimations, TiledTileAnimation, TiledObjectGroup
+from tests.fixtures import write_synthetic_map
+
+
+class TestAnimations(TestCase):
+    def test_frame_is_found_at_each_time(self) -> None:
+        animations = TiledTileAnimations()
+        for tileid, duration in [(10, 100), (11, 50), (12, 250), (13, 100)]:
+            animations.add_frame(TiledTileAnimation(tileid, duration))
+
+        def linear_get_gid(time_ms: int) -> int:
+            r = time_ms % animations.total_animation_len
+            for frame in animations.frames:
+                r -= frame.duration
+                if r <= 0:
+                    return frame.tileid
+            return animations.frames[-1].tileid
+
+        for time_ms in range(0, 1200, 7):
+            self.assertEqual(linear_get_gid(time_ms), animations.get_gid(time_ms), f"at {time_ms}ms")
+
+    def test_frame_table_is_worked_out_once_per_time(self) -> None:
+        with TemporaryDirectory() as t:
+            filename = os.path.join(t, "map.tmx")
+            write_synthetic_map(filename, 16, 16, objects=1)
+            tiled_map = TiledMap()
+            tiled_map.load(filename)
+
+            frame_gids = tiled_map.animation_frame_gids(1.0)
+            self.assertEqual(set(tiled_map.tile_animations), set(frame_gids))
+            for gid, animations in tiled_map.tile_animations.items():
+                self.assertEqual(animations.get_gid(1000), frame_gids[gid])
+            self.assertIs(frame_gids, tiled_map.animation_frame_gids(1.0))
+            self.assertIs(frame_gids, tiled_map.animation_frame_gids())
+
+            # objects' images are of the moment their layer was drawn at
+            layer = next(layer for layer in tiled_map.layers if isinstance(layer, TiledObjectGroup))
+            obj = next(iter(layer.objects))
+            self.assertIn(obj.gid, tiled_map.tile_animations)
+            for current_time in [0.1, 0.4]:
+                layer.draw(tiled_map.images[1].copy(), tiled_map.images[1].get_rect(), 0, 0, current_time)
+                self.assertIs(tiled_map.images[tiled_map.tile_animations[obj.gid].get_gid(int(current_time * 1000))], obj.image)
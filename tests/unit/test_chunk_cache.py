@@ -0,0 +1,114 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import pygame
+from pygame import Rect, Surface
+
+from engine.level import Level
+from engine.tmx import TiledMap, TiledTileLayer, TiledTileAnimations, TiledTileAnimation, TileChunkCache, CHUNK_CACHE_SIZE, CHUNK_CACHE_MEMORY
+from tests.fixtures import write_synthetic_map
+
+ANIMATED_GID = 35
+
+
+class TestChunkCache(TestCase):
+    @staticmethod
+    def _load(directory: str) -> tuple[TiledMap, TiledTileLayer]:
+        filename = os.path.join(directory, "map.tmx")
+        write_synthetic_map(filename, 40, 30)
+        tiled_map = TiledMap()
+        tiled_map.load(filename)
+        animations = TiledTileAnimations()
+        for i in range(4):
+            animations.add_frame(TiledTileAnimation(ANIMATED_GID + i, 100))
+        tiled_map.tile_animations[ANIMATED_GID] = animations
+
+        layer = next(layer for layer in tiled_map.layers if isinstance(layer, TiledTileLayer))
+        layer.data[3][4] = ANIMATED_GID
+        layer.data[20][25] = ANIMATED_GID
+        layer.check_if_animated_gids()
+        return tiled_map, layer
+
+    @staticmethod
+    def _draw(layer: TiledTileLayer, viewport: Rect, xo: int, yo: int, current_time: float) -> bytes:
+        surface = Surface((400, 300))
+        surface.fill((10, 20, 30))
+        layer.draw(surface, viewport, xo, yo, current_time)
+        return pygame.image.tobytes(surface, "RGB")
+
+    def assert_same_as_direct_draw(self, layer: TiledTileLayer, cache: TileChunkCache, viewport: Rect, xo: int, yo: int, current_time: float) -> None:
+        layer.chunk_cache = None
+        direct = self._draw(layer, viewport, xo, yo, current_time)
+        layer.chunk_cache = cache
+        cached = self._draw(layer, viewport, xo, yo, current_time)
+
+        # direct drawing spills over viewport edges - compare what is inside of it
+        for y in range(viewport.top, viewport.bottom):
+            start = (y * 400 + viewport.left) * 3
+            end = (y * 400 + viewport.right) * 3
+            self.assertEqual(direct[start:end], cached[start:end], f"row {y} at {xo}, {yo}")
+
+    def test_cached_draw_is_same_as_direct_draw(self) -> None:
+        with TemporaryDirectory() as t:
+            tiled_map, layer = self._load(t)
+            cache = TileChunkCache([layer], chunk_size=64)
+            viewport = Rect(10, 20, 330, 250)
+
+            for xo, yo, current_time in [(0, 0, 0.0), (-37, -55, 0.15), (-400, -290, 0.25), (-53, -7, 0.35)]:
+                self.assert_same_as_direct_draw(layer, cache, viewport, xo, yo, current_time)
+            self.assertIn(ANIMATED_GID, [gid for _, animated in cache.chunks.values() for _, _, gid in animated])
+
+    def test_changed_tile_is_rendered_again_only_in_its_chunk(self) -> None:
+        with TemporaryDirectory() as t:
+            tiled_map, layer = self._load(t)
+            cache = TileChunkCache([layer], chunk_size=64)
+            viewport = Rect(0, 0, 400, 300)
+            self.assert_same_as_direct_draw(layer, cache, viewport, 0, 0, 0.0)
+            rendered = dict(cache.chunks)
+            chunk_pixels = {key: pygame.image.tobytes(chunk[0], "RGBA") for key, chunk in rendered.items() if chunk[0] is not None}
+
+            # tile 5, 5 is in pixels 90-107, 90-107 - chunk 1, 1 of 64 pixel chunks
+            layer.set_gid_at(5, 5, 0 if layer.gid_at(5, 5) else 1)
+            self.assertEqual(rendered, cache.chunks)
+            self.assertEqual({(1, 1)}, {key for key, pixels in chunk_pixels.items() if pygame.image.tobytes(cache.chunks[key][0], "RGBA") != pixels})
+            self.assertTrue(layer.dirty_data)
+            self.assert_same_as_direct_draw(layer, cache, viewport, 0, 0, 0.0)
+
+            # animated tile, 4, 3 is in chunk 1, 0
+            layer.set_gid_at(4, 3, 1)
+            layer.set_gid_at(6, 2, ANIMATED_GID)
+            self.assertEqual([(108, 36, ANIMATED_GID)], cache.chunks[(1, 0)][1])
+            self.assert_same_as_direct_draw(layer, cache, viewport, 0, 0, 0.0)
+
+            layer.data[0][0] = 2
+            layer.tiles_changed()
+            self.assertEqual(0, len(cache.chunks))
+
+            cache.release()
+            self.assertEqual([], layer.tiles_changed_callbacks)
+
+    def test_least_recently_drawn_chunks_are_dropped(self) -> None:
+        with TemporaryDirectory() as t:
+            tiled_map, layer = self._load(t)
+            cache = TileChunkCache([layer], chunk_size=64, max_memory=6 * 64 * 64 * 4)
+            surface = Surface((128, 128))
+
+            cache.draw(surface, surface.get_rect(), 0, 0, 0.0)
+            cache.draw(surface, surface.get_rect(), -128, 0, 0.0)
+            self.assertEqual([(0, 1), (1, 1), (2, 0), (3, 0), (2, 1), (3, 1)], list(cache.chunks))
+
+    def test_caches_of_level_share_memory(self) -> None:
+        pygame.display.init()
+        pygame.display.set_mode((1, 1))
+        with TemporaryDirectory() as t:
+            filename = os.path.join(t, "map.tmx")
+            write_synthetic_map(filename, 60, 40, objects=1, layer_names=["background", "main", "foreground"])
+            tiled_map = TiledMap()
+            tiled_map.load(filename)
+            tiled_map.object_by_name["object_0"].name = "player"
+            level = Level(Rect(0, 0, 320, 200), tiled_map)
+
+            caches = [layer.chunk_cache for layer in level.layers if isinstance(layer, TiledTileLayer) and layer.chunk_cache is not None]
+            self.assertLess(0, len(caches))
+            self.assertLessEqual(sum(cache.max_chunks * CHUNK_CACHE_SIZE * CHUNK_CACHE_SIZE * 4 for cache in caches), CHUNK_CACHE_MEMORY)
@@ -0,0 +1,60 @@
+import io
+from pathlib import Path
+from unittest import TestCase, skipUnless
+
+from engine.tmx import TiledMap, TiledTileLayer
+from tests.unit import numpy
+
+
+@skipUnless(numpy is not None, "compact layers need numpy")
+class TestCompactLayers(TestCase):
+    def setUp(self) -> None:
+        self.project_root = Path(__file__).parent.parent.parent.absolute()
+
+    def _load(self, path: str, compact_layers: bool) -> TiledMap:
+        tiled_map = TiledMap(compact_layers=compact_layers)
+        tiled_map.load(str(self.project_root / "assets" / path))
+        return tiled_map
+
+    @staticmethod
+    def _save_to_string(tiled_map: TiledMap) -> str:
+        stream = io.StringIO()
+        tiled_map._save(stream, 0)
+        return stream.getvalue()
+
+    def test_compact_layers_have_same_data(self) -> None:
+        for path in ["side_scroller/level1.tmx", "top_down/test-level.tmx"]:
+            list_map = self._load(path, False)
+            compact_map = self._load(path, True)
+
+            for list_layer, compact_layer in zip(list_map.layers, compact_map.layers):
+                if isinstance(list_layer, TiledTileLayer):
+                    self.assertTrue(compact_layer.compact)
+                    self.assertEqual(
+                        [[list_map.gid_to_original_gid_and_tile_flags(gid) for gid in row] for row in list_layer.data],
+                        [[compact_map.gid_to_original_gid_and_tile_flags(gid) for gid in row] for row in compact_layer.data]
+                    )
+                    self.assertEqual(list_layer.animate_layer, compact_layer.animate_layer)
+
+    def test_compact_layers_save_the_same(self) -> None:
+        list_map = self._load("side_scroller/level1.tmx", False)
+        compact_map = self._load("side_scroller/level1.tmx", True)
+
+        self.assertEqual(self._save_to_string(list_map), self._save_to_string(compact_map))
+
+    def test_compact_layer_view_reads_and_writes(self) -> None:
+        tiled_map = self._load("side_scroller/level1.tmx", True)
+        layer = next(layer for layer in tiled_map.layers if isinstance(layer, TiledTileLayer))
+
+        layer.data[2][3] = 5
+        self.assertEqual(5, layer.data[2][3])
+        self.assertIsInstance(layer.data[2][3], int)
+
+        before = [row.copy() for row in layer.data]
+        layer.data[2][3] = 7
+        layer.data[2][:] = before[2]
+        self.assertEqual(5, layer.data[2][3])
+
+        layer.width = layer.width + 2
+        self.assertEqual(5, layer.data[2][3])
+        self.assertEqual(0, layer.data[2][layer.width - 1])
@@ -0,0 +1,81 @@
+import os
+from tempfile import TemporaryDirectory
+from typing import Optional
+from unittest import TestCase
+from unittest.mock import patch
+
+import pygame
+from pygame import Rect, Surface
+
+from engine.game import Game
+from engine.game_context import GameContext
+from engine.level import Level
+from engine.tmx import TiledMap
+from tests.fixtures import write_synthetic_map
+
+
+class TestDirtyRects(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        pygame.display.init()
+
+    def test_only_changed_areas_are_presented(self) -> None:
+        screen = pygame.display.set_mode((400, 300))
+        with TemporaryDirectory() as t, patch("engine.level.time.time", return_value=1.0):
+            filename = os.path.join(t, "map.tmx")
+            write_synthetic_map(filename, 60, 40, density=0.3, objects=30, layer_names=["background", "main"])
+            tiled_map = TiledMap()
+            tiled_map.load(filename)
+            tiled_map.object_by_name["object_0"].name = "player"
+            level = Level(Rect(0, 0, 400, 300), tiled_map)
+            level.viewport = Rect(20, 10, 360, 280)
+            game_context = GameContext({"level": level})
+            game_context.set_level(level)
+            game = Game(screen, game_context, 60, dirty_rects=True)
+
+            label = Surface((50, 20))
+            label_position = [300, 0]
+
+            def draw_after_map(surface: Surface) -> Optional[list[Rect]]:
+                return [surface.blit(label, label_position)]
+            game.draw_after_map = draw_after_map
+
+            def draw_frame() -> Optional[list[Rect]]:
+                with patch("pygame.display.flip") as flip, patch("pygame.display.update") as update:
+                    game.draw_dirty_rects()
+                    return None if flip.called else update.call_args.args[0]
+
+            def assert_same_as_full_frame() -> None:
+                drawn = pygame.image.tobytes(screen, "RGB")
+                game._overlay_rects = None
+                self.assertIsNone(draw_frame())
+                self.assertEqual(pygame.image.tobytes(screen, "RGB"), drawn)
+
+            # everything is drawn on first frame, then only label again
+            self.assertIsNone(draw_frame())
+            self.assertEqual([Rect(300, 0, 50, 20)], draw_frame())
+
+            # moved object and label - label is moved from where level is shown again
+            obj = tiled_map.object_by_name["object_5"]
+            obj.x += 10
+            label_position[1] = 100
+            presented = draw_frame()
+            self.assertIn(Rect(300, 0, 50, 20), presented)
+            self.assertIn(Rect(300, 100, 50, 20), presented)
+            screen_x = int(obj.x) - level.x_offset + level.viewport.x
+            screen_y = int(obj.y) - level.y_offset + level.viewport.y
+            self.assertTrue(any(rect.contains(Rect(screen_x, screen_y, 18, 18)) for rect in presented))
+            assert_same_as_full_frame()
+
+            # scrolled level is shown in its whole viewport
+            level.x_offset += 4
+            self.assertIn(level.viewport, draw_frame())
+            assert_same_as_full_frame()
+
+            # overlay that cannot tell where it drew makes whole screen drawn on next frame, too
+            game.draw_after_map = lambda surface: None
+            self.assertIsNone(draw_frame())
+            game.draw_after_map = draw_after_map
+            self.assertIsNone(draw_frame())
+            self.assertEqual([Rect(300, 100, 50, 20)], draw_frame())
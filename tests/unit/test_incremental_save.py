@@ -0,0 +1,153 @@
+import io
+import os
+import zlib
+from base64 import b64decode
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from engine.tmx import TiledMap, TiledTileLayer, TiledObjectGroup, COMPRESSION_LEVEL_FAST
+from tests.unit import COMPACT_LAYERS_OPTIONS
+from tests.fixtures import write_synthetic_map, write_synthetic_infinite_map
+
+
+class TestIncrementalSave(TestCase):
+    @staticmethod
+    def _save_to_string(tiled_map: TiledMap) -> str:
+        stream = io.StringIO()
+        tiled_map._save(stream, 0)
+        return stream.getvalue()
+
+    @staticmethod
+    def _load(directory: str, compact_layers: bool = False) -> TiledMap:
+        filename = os.path.join(directory, "map.tmx")
+        write_synthetic_map(filename, 32, 16, layers=3, flipped=0.1, objects=5)
+        tiled_map = TiledMap(compact_layers=compact_layers)
+        tiled_map.load(filename)
+        return tiled_map
+
+    def test_only_changed_layers_are_encoded(self) -> None:
+        with TemporaryDirectory() as t:
+            for compact_layers in COMPACT_LAYERS_OPTIONS:
+                tiled_map = self._load(t, compact_layers)
+                layers = [layer for layer in tiled_map.layers if isinstance(layer, TiledTileLayer)]
+
+                with patch.object(TiledTileLayer, "_encode_data", autospec=True, side_effect=TiledTileLayer._encode_data) as encode:
+                    first = self._save_to_string(tiled_map)
+                    # Payloads that were loaded are written as they are
+                    self.assertEqual(0, encode.call_count)
+
+                    layers[1].data[3][4] = 7
+                    second = self._save_to_string(tiled_map)
+                    self.assertEqual([layers[1]], [call.args[0] for call in encode.call_args_list])
+
+                    third = self._save_to_string(tiled_map)
+                    self.assertEqual(1, encode.call_count)
+
+                self.assertNotEqual(first, second)
+                self.assertEqual(second, third)
+
+                reloaded_map = TiledMap(compact_layers=compact_layers)
+                filename = os.path.join(t, "saved.tmx")
+                tiled_map.save(filename)
+                reloaded_map.load(filename)
+                reloaded_layers = [layer for layer in reloaded_map.layers if isinstance(layer, TiledTileLayer)]
+                self.assertEqual(7, reloaded_layers[1].data[3][4])
+                for layer, reloaded_layer in zip(layers, reloaded_layers):
+                    self.assertEqual(layer.data.tolist() if compact_layers else layer.data, reloaded_layer.data.tolist() if compact_layers else reloaded_layer.data)
+
+    def test_writes_through_rows_are_saved(self) -> None:
+        with TemporaryDirectory() as t:
+            infinite_filename = os.path.join(t, "infinite.tmx")
+            write_synthetic_infinite_map(infinite_filename, 64, 64, [(0, 0), (1, 1)])
+            filename = os.path.join(t, "saved.tmx")
+            for compact_layers in COMPACT_LAYERS_OPTIONS + [None]:
+                if compact_layers is None:
+                    tiled_map = TiledMap()
+                    tiled_map.load(infinite_filename)
+                else:
+                    tiled_map = self._load(t, compact_layers)
+                layer = next(layer for layer in tiled_map.layers if isinstance(layer, TiledTileLayer))
+                tiled_map.save(filename)
+
+                layer.data[3][4] = 7
+                if not layer.chunked:
+                    layer.data[5][:] = [9] * layer.width
+                tiled_map.save(filename)
+
+                reloaded_map = TiledMap()
+                reloaded_map.load(filename)
+                reloaded_layer = next(layer for layer in reloaded_map.layers if isinstance(layer, TiledTileLayer))
+                self.assertEqual(7, reloaded_layer.gid_at(4, 3))
+                if not layer.chunked:
+                    self.assertEqual([9] * layer.width, list(reloaded_layer.data[5]))
+
+    def test_moved_object_is_saved(self) -> None:
+        with TemporaryDirectory() as t:
+            tiled_map = self._load(t)
+            objects = list(next(layer for layer in tiled_map.layers if isinstance(layer, TiledObjectGroup)).objects)
+            self._save_to_string(tiled_map)
+            saved_xml = [obj._saved_xml for obj in objects]
+
+            objects[2].x = 123
+            self.assertIn("x=\"123\"", self._save_to_string(tiled_map))
+            self.assertEqual([xml for i, xml in enumerate(saved_xml) if i != 2], [obj._saved_xml for i, obj in enumerate(objects) if i != 2])
+            # Cached XML is the same object - nothing was serialised again
+            for i, obj in enumerate(objects):
+                if i != 2:
+                    self.assertIs(saved_xml[i][2], obj._saved_xml[2])
+
+            # moved through its rect - y of tile objects is saved at their bottom
+            objects[3].rect.topleft = (321, 456)
+            self.assertIn("x=\"321\" y=\"474\"", self._save_to_string(tiled_map))
+
+    def test_properties_changed_in_place_are_saved(self) -> None:
+        with TemporaryDirectory() as t:
+            tiled_map = self._load(t)
+            obj = next(iter(next(layer for layer in tiled_map.layers if isinstance(layer, TiledObjectGroup)).objects))
+            self._save_to_string(tiled_map)
+
+            obj.properties["colour"] = "red"
+            self.assertIn("name=\"colour\" value=\"red\"", self._save_to_string(tiled_map))
+            obj.properties.update(colour="blue")
+            self.assertIn("name=\"colour\" value=\"blue\"", self._save_to_string(tiled_map))
+            del obj.properties["colour"]
+            self.assertNotIn("colour", self._save_to_string(tiled_map))
+
+    def test_saved_gids_are_dropped_when_firstgids_change(self) -> None:
+        with TemporaryDirectory() as t:
+            tiled_map = self._load(t)
+            self._save_to_string(tiled_map)
+            layers = [layer for layer in tiled_map.layers if isinstance(layer, TiledTileLayer)]
+            objects = list(next(layer for layer in tiled_map.layers if isinstance(layer, TiledObjectGroup)).objects)
+            self.assertFalse(any(layer._saved_data is None for layer in layers))
+
+            tiled_map.update_tileset(tiled_map.tilesets[0])
+            self.assertTrue(all(layer._saved_data is None for layer in layers))
+            self.assertTrue(all(obj._saved_xml is None for obj in objects))
+
+    def test_resized_map_is_encoded(self) -> None:
+        with TemporaryDirectory() as t:
+            tiled_map = self._load(t)
+            tiled_map.width = 40
+            self.assertIn("width=\"40\" height=\"16\"", self._save_to_string(tiled_map))
+            self.assertTrue(all(not layer.dirty_data for layer in tiled_map.layers if isinstance(layer, TiledTileLayer)))
+
+    def test_layers_are_compressed_in_parallel_with_given_level(self) -> None:
+        with TemporaryDirectory() as t:
+            tiled_map = self._load(t)
+            layers = [layer for layer in tiled_map.layers if isinstance(layer, TiledTileLayer)]
+            for layer in layers:
+                layer.dirty_data = True
+
+            with patch("engine.tmx.LAYER_COMPRESSION_THREADS", 4):
+                tiled_map.save(os.path.join(t, "fast.tmx"), compression_level=COMPRESSION_LEVEL_FAST)
+            self.assertTrue(all(not layer.needs_encoding for layer in layers))
+
+            reloaded_map = TiledMap()
+            reloaded_map.load(os.path.join(t, "fast.tmx"))
+            reloaded_layers = [layer for layer in reloaded_map.layers if isinstance(layer, TiledTileLayer)]
+            self.assertEqual([layer.name for layer in layers], [layer.name for layer in reloaded_layers])
+            for layer, reloaded_layer in zip(layers, reloaded_layers):
+                self.assertEqual(layer.data, reloaded_layer.data)
+                self.assertEqual(zlib.compress(layer._encode_data(), COMPRESSION_LEVEL_FAST), b64decode(layer._saved_data))
@@ -0,0 +1,156 @@
+import io
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from pygame import Rect, Surface
+
+from editor.actions_controller import ActionsController
+from engine.tmx import TiledMap, TiledTileLayer, ChunkedTileData
+from tests.fixtures import write_synthetic_infinite_map
+
+
+MAP_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.11" tiledversion="1.11.0" orientation="orthogonal" renderorder="right-down" width="30" height="20" tilewidth="18" tileheight="18" infinite="1" nextlayerid="2" nextobjectid="1">
+ <tileset firstgid="1" source="{tileset}"/>
+ <layer id="1" name="main" width="30" height="20">
+  <data encoding="csv">
+   <chunk x="-16" y="0" width="16" height="16">
+{first}
+</chunk>
+   <chunk x="0" y="16" width="16" height="16">
+{empty}
+</chunk>
+   <chunk x="32" y="-32" width="16" height="16">
+{second}
+</chunk>
+  </data>
+ </layer>
+</map>
+"""
+
+
+class TestInfiniteMaps(TestCase):
+    def setUp(self) -> None:
+        self.project_root = Path(__file__).parent.parent.parent.absolute()
+        self.tileset = self.project_root / "assets" / "side_scroller" / "tilemap" / "tileset-tiles.tsx"
+
+    def _load(self, directory: str) -> TiledMap:
+        first = [0] * 256
+        first[0] = 5
+        first[255] = 6
+        second = [0] * 256
+        second[17] = 7
+        filename = os.path.join(directory, "infinite.tmx")
+        with open(filename, "w") as f:
+            f.write(MAP_TEMPLATE.format(
+                tileset=self.tileset,
+                first=",".join(str(gid) for gid in first), empty=",".join("0" * 256), second=",".join(str(gid) for gid in second)))
+        tiled_map = TiledMap()
+        tiled_map.load(filename)
+        return tiled_map
+
+    def test_chunks_are_stored_sparsely(self) -> None:
+        with TemporaryDirectory() as t:
+            tiled_map = self._load(t)
+            layer: TiledTileLayer = next(iter(tiled_map.layers))
+
+            self.assertTrue(layer.chunked)
+            self.assertEqual({(-1, 0), (2, -2)}, set(layer.data.chunks.keys()))
+            self.assertEqual(5, layer.gid_at(-16, 0))
+            self.assertEqual(6, layer.gid_at(-1, 15))
+            self.assertEqual(7, layer.data[-31][33])
+            self.assertEqual(0, layer.gid_at(5000, -5000))
+            self.assertEqual(Rect(-16, -32, 64, 48), layer.bounds)
+            self.assertEqual(Rect(-16 * 18, -32 * 18, 64 * 18, 48 * 18), tiled_map.rect)
+
+            # Writing 0 outside of chunks allocates nothing, anything else allocates one chunk
+            layer.data[100][100] = 0
+            self.assertEqual(2, len(layer.data.chunks))
+            layer.data[100][100] = 8
+            self.assertEqual(3, len(layer.data.chunks))
+            self.assertEqual(8, layer.gid_at(100, 100))
+
+    def test_rect_follows_painted_area(self) -> None:
+        with TemporaryDirectory() as t:
+            tiled_map = self._load(t)
+            layer: TiledTileLayer = next(iter(tiled_map.layers))
+            self.assertIs(tiled_map.rect, tiled_map.rect)
+
+            layer.data[0][-40] = 9
+            self.assertEqual(Rect(-48 * 18, -32 * 18, 96 * 18, 48 * 18), tiled_map.rect)
+            layer.data[0][-40] = 0
+            layer.data = ChunkedTileData()
+            self.assertEqual(Rect(0, 0, 30 * 18, 20 * 18), tiled_map.rect)
+
+    def test_editor_undo_and_redo(self) -> None:
+        with TemporaryDirectory() as t:
+            tiled_map = self._load(t)
+            layer: TiledTileLayer = next(iter(tiled_map.layers))
+            before = {key: chunk.copy() for key, chunk in layer.data.chunks.items()}
+            actions_controller = ActionsController()
+            actions_controller.tiled_map = tiled_map
+            actions_controller.current_layer = layer
+
+            actions_controller.plot(-40, -40, 9)
+            actions_controller.plot(-16, 0, 0)
+            after = {key: chunk.copy() for key, chunk in layer.data.chunks.items()}
+
+            actions_controller.undo()
+            self.assertEqual(before, layer.data.chunks)
+            self.assertEqual(0, layer.gid_at(-40, -40))
+            self.assertEqual(5, layer.gid_at(-16, 0))
+            self.assertEqual(Rect(-16 * 18, -32 * 18, 64 * 18, 48 * 18), tiled_map.rect)
+
+            actions_controller.redo()
+            self.assertEqual(after, layer.data.chunks)
+            self.assertEqual(9, layer.gid_at(-40, -40))
+            self.assertEqual(0, layer.gid_at(-16, 0))
+
+            # layer was left with its own copy - undoing again restores the same tiles
+            layer.data[-40][-40] = 3
+            actions_controller.undo()
+            actions_controller.redo()
+            self.assertEqual(9, layer.gid_at(-40, -40))
+
+    def test_save_and_reload(self) -> None:
+        with TemporaryDirectory() as t:
+            tiled_map = self._load(t)
+            layer: TiledTileLayer = next(iter(tiled_map.layers))
+            layer.data[-40][-40] = 9
+            layer.dirty_data = True
+
+            filename = os.path.join(t, "saved.tmx")
+            tiled_map.save(filename)
+            with open(filename) as f:
+                self.assertEqual(3, f.read().count("<chunk "))
+
+            reloaded_map = TiledMap()
+            reloaded_map.load(filename)
+            reloaded_layer: TiledTileLayer = next(iter(reloaded_map.layers))
+            self.assertEqual(layer.data.chunks, reloaded_layer.data.chunks)
+
+    def test_draw_resolves_cells_through_chunks(self) -> None:
+        with TemporaryDirectory() as t:
+            tiled_map = self._load(t)
+            layer: TiledTileLayer = next(iter(tiled_map.layers))
+            surface = Surface((100, 100))
+            surface.fill((1, 2, 3))
+
+            # tile at -16, 0 at the top left corner of the surface
+            layer.draw(surface, Rect(0, 0, 100, 100), 16 * 18, 0)
+            self.assertNotEqual(surface.get_at((5, 5)), (1, 2, 3))
+
+    def test_large_mostly_empty_world(self) -> None:
+        with TemporaryDirectory() as t:
+            filename = os.path.join(t, "world.tmx")
+            write_synthetic_infinite_map(filename, 10000, 10000, [(0, 0), (300, 200), (-50, 600)])
+            tiled_map = TiledMap()
+            tiled_map.load(filename)
+            layer: TiledTileLayer = next(l for l in tiled_map.layers if isinstance(l, TiledTileLayer))
+            self.assertIsInstance(layer.data, ChunkedTileData)
+            self.assertEqual(3, len(layer.data.chunks))
+            stream = io.StringIO()
+            tiled_map._save(stream, 0)
+            self.assertEqual(3, stream.getvalue().count("<chunk "))
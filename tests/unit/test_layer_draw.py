@@ -0,0 +1,92 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import pygame
+from pygame import Rect, Surface
+
+from engine.tmx import TiledMap, TiledTileLayer, TiledTileAnimations, TiledTileAnimation
+from tests.fixtures import write_synthetic_map, write_synthetic_infinite_map
+from tests.unit import COMPACT_LAYERS_OPTIONS
+
+ANIMATED_GID = 35
+
+
+class TestLayerDraw(TestCase):
+    @staticmethod
+    def _load(filename: str, compact_layers: bool = False) -> tuple[TiledMap, TiledTileLayer]:
+        tiled_map = TiledMap(compact_layers=compact_layers)
+        tiled_map.load(filename)
+        animations = TiledTileAnimations()
+        for i in range(4):
+            animations.add_frame(TiledTileAnimation(ANIMATED_GID + i, 100))
+        tiled_map.tile_animations[ANIMATED_GID] = animations
+
+        layer = next(layer for layer in tiled_map.layers if isinstance(layer, TiledTileLayer))
+        layer.set_gid_at(4, 3, ANIMATED_GID)
+        layer.check_if_animated_gids()
+        return tiled_map, layer
+
+    @staticmethod
+    def _tile_by_tile(layer: TiledTileLayer, viewport: Rect, xo: int, yo: int, current_time: float) -> bytes:
+        tiled_map = layer.map
+        frame_gids = tiled_map.animation_frame_gids(current_time)
+        surface = Surface((400, 300))
+        surface.fill((10, 20, 30))
+        with_clip = surface.get_clip()
+        surface.set_clip(viewport)
+        for row in range(-yo // tiled_map.tileheight - 1, (viewport.height - yo) // tiled_map.tileheight + 1):
+            for column in range(-xo // tiled_map.tilewidth - 1, (viewport.width - xo) // tiled_map.tilewidth + 1):
+                gid = layer.gid_at(column, row)
+                if gid > 0:
+                    surface.blit(tiled_map.images[frame_gids.get(gid, gid)],
+                                 (viewport.x + xo + column * tiled_map.tilewidth, viewport.y + yo + row * tiled_map.tileheight))
+        surface.set_clip(with_clip)
+        return pygame.image.tobytes(surface, "RGB")
+
+    @staticmethod
+    def _draw(layer: TiledTileLayer, viewport: Rect, xo: int, yo: int, current_time: float) -> bytes:
+        surface = Surface((400, 300))
+        surface.fill((10, 20, 30))
+        surface.set_clip(viewport)
+        layer.draw(surface, viewport, xo, yo, current_time)
+        return pygame.image.tobytes(surface, "RGB")
+
+    def assert_same_as_tile_by_tile(self, layer: TiledTileLayer) -> None:
+        viewport = Rect(10, 20, 330, 250)
+        for xo, yo, current_time in [(0, 0, 0.0), (-37, -55, 0.15), (-400, -290, 0.25), (53, 7, 0.35), (53, 7, 0.45)]:
+            self.assertEqual(self._tile_by_tile(layer, viewport, xo, yo, current_time), self._draw(layer, viewport, xo, yo, current_time),
+                             f"at {xo}, {yo}, {current_time}")
+
+    def test_blits_are_same_as_tile_by_tile(self) -> None:
+        with TemporaryDirectory() as t:
+            filename = os.path.join(t, "map.tmx")
+            write_synthetic_map(filename, 40, 30)
+            for compact_layers in COMPACT_LAYERS_OPTIONS:
+                self.assert_same_as_tile_by_tile(self._load(filename, compact_layers)[1])
+
+            filename = os.path.join(t, "infinite.tmx")
+            write_synthetic_infinite_map(filename, 40, 30, [(0, 0), (-1, -1), (1, 1)])
+            self.assert_same_as_tile_by_tile(self._load(filename)[1])
+
+    def test_blits_are_kept_while_nothing_changes(self) -> None:
+        with TemporaryDirectory() as t:
+            filename = os.path.join(t, "map.tmx")
+            write_synthetic_map(filename, 40, 30)
+            tiled_map, layer = self._load(filename)
+            viewport = Rect(0, 0, 400, 300)
+
+            self._draw(layer, viewport, -5, -5, 0.0)
+            blits = layer._blits
+            self._draw(layer, viewport, -5, -5, 0.2)
+            self.assertIs(blits, layer._blits)
+
+            layer.set_gid_at(1, 1, 0 if layer.gid_at(1, 1) else 1)
+            self._draw(layer, viewport, -5, -5, 0.2)
+            self.assertIsNot(blits, layer._blits)
+            blits = layer._blits
+
+            self._draw(layer, viewport, -6, -5, 0.2)
+            self.assertIsNot(blits, layer._blits)
+
+            self.assertEqual(self._tile_by_tile(layer, viewport, -6, -5, 0.3), self._draw(layer, viewport, -6, -5, 0.3))
@@ -0,0 +1,136 @@
+import os
+from tempfile import TemporaryDirectory
+from typing import cast
+from unittest import TestCase
+from unittest.mock import patch
+
+import pygame
+from pygame import Rect
+
+import engine.level
+from engine.level import Level, CompositeTileLayers
+from engine.tmx import TiledMap, TiledTileLayer, CHUNK_CACHE_SIZE, CHUNK_CACHE_MEMORY
+from tests.fixtures import write_synthetic_map
+
+
+class TestLevelRendering(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        pygame.display.init()
+        pygame.display.set_mode((1, 1))
+
+    @staticmethod
+    def _level(directory: str, width: int = 60, height: int = 40) -> Level:
+        filename = os.path.join(directory, "map.tmx")
+        write_synthetic_map(filename, width, height, density=0.3, objects=30, layer_names=["background", "main", "foreground"])
+        tiled_map = TiledMap()
+        tiled_map.load(filename)
+        tiled_map.object_by_name["object_0"].name = "player"
+        return Level(Rect(0, 0, 320, 240), tiled_map)
+
+    def assert_same_as_full_render(self, level: Level) -> None:
+        rendered = pygame.image.tobytes(level.offscreen_surface, "RGBA")
+        level.render_offscreen(full=True)
+        self.assertEqual(pygame.image.tobytes(level.offscreen_surface, "RGBA"), rendered)
+
+    def test_only_what_changed_is_rendered_again(self) -> None:
+        with TemporaryDirectory() as t, patch("engine.level.time.time", return_value=1.0) as current_time:
+            level = self._level(t)
+            level.x_offset, level.y_offset = 100, 50
+            whole = level.offscreen_surface.get_rect()
+            self.assertEqual([whole], level.render_offscreen())
+
+            # nothing has changed
+            self.assertEqual([], level.render_offscreen())
+
+            # scrolled right and up - only exposed strips are rendered but all of it has changed
+            level.x_offset += 5
+            level.y_offset -= 3
+            with patch.object(Level, "_render_area", wraps=level._render_area) as render_area:
+                self.assertEqual([whole], level.render_offscreen())
+            self.assertEqual([Rect(315, 0, 5, 240), Rect(0, 0, 320, 3)], [c.args[1] for c in render_area.call_args_list])
+            self.assert_same_as_full_render(level)
+
+            # moved object, changed tile and time that moved animations on
+            obj = level.map.object_by_name["object_10"]
+            obj.x += 7
+            main_layer = next(layer for layer in level.layers if isinstance(layer, TiledTileLayer) and layer.name == "main")
+            main_layer.set_gid_at(10, 5, 0 if main_layer.gid_at(10, 5) else 3)
+            current_time.return_value = 1.5
+            dirty = level.render_offscreen()
+            self.assertNotIn(whole, dirty)
+            self.assertTrue(any(rect.contains(Rect(180 - 105, 90 - 47, 18, 18)) for rect in dirty))
+            self.assert_same_as_full_render(level)
+
+            # scrolled further than viewport
+            level.x_offset += 400
+            self.assertEqual([whole], level.render_offscreen())
+
+    def test_tile_layers_next_to_each_other_are_composited(self) -> None:
+        with TemporaryDirectory() as t, patch("engine.level.time.time", return_value=1.0):
+            level = self._level(t)
+            try:
+                engine.level.composite_layers = False
+                separate = self._level(t)
+            finally:
+                engine.level.composite_layers = True
+
+            self.assertEqual(["background", "main"], [layer.name for layer in level.drawn_layers[0].layers])
+            self.assertEqual(level.layers[2:], level.drawn_layers[1:])
+            self.assertEqual(separate.layers, separate.drawn_layers)
+            # layers drawn through composite have no chunks of their own and all caches share one budget
+            self.assertEqual([None, None], [layer.chunk_cache for layer in level.drawn_layers[0].layers])
+            separate_caches = [layer.chunk_cache for layer in separate.layers if isinstance(layer, TiledTileLayer)]
+            self.assertEqual(3, len(separate_caches))
+            self.assertLessEqual(sum(cache.max_chunks * CHUNK_CACHE_SIZE * CHUNK_CACHE_SIZE * 4 for cache in separate_caches), CHUNK_CACHE_MEMORY)
+
+            def assert_same_as_separate() -> None:
+                level.render_offscreen(full=True)
+                separate.render_offscreen(full=True)
+                self.assertEqual(pygame.image.tobytes(separate.offscreen_surface, "RGBA"), pygame.image.tobytes(level.offscreen_surface, "RGBA"))
+
+            for level_ in [level, separate]:
+                level_.x_offset, level_.y_offset = 100, 50
+            assert_same_as_separate()
+
+            # small map is composited into one surface
+            composite = cast(CompositeTileLayers, level.drawn_layers[0])
+            self.assertEqual([(0, 0)], list(composite.chunk_cache.chunks))
+            chunks = dict(composite.chunk_cache.chunks)
+            for level_ in [level, separate]:
+                level_.main_layer.set_gid_at(10, 5, 0 if level_.main_layer.gid_at(10, 5) else 3)
+            self.assertEqual(chunks, composite.chunk_cache.chunks)
+            assert_same_as_separate()
+
+            # animated tile under static tile of the layer above it
+            animated_gid = next(iter(level.map.tile_animations))
+            for level_ in [level, separate]:
+                level_.background_layer.set_gid_at(8, 4, animated_gid)
+                level_.main_layer.set_gid_at(8, 4, 3)
+            self.assertIn((8 * 18, 4 * 18, 3), composite.chunk_cache.chunks[(0, 0)][1])
+            assert_same_as_separate()
+
+            # hidden layer is not in composite
+            level.background_layer.visible = False
+            separate.background_layer.visible = False
+            self.assertFalse(composite.composited())
+            assert_same_as_separate()
+
+    def test_wide_map_is_composited_into_one_surface(self) -> None:
+        with TemporaryDirectory() as t, patch("engine.level.time.time", return_value=1.0):
+            # 7200x360 pixels - square chunk of its width would not fit in the budget
+            level = self._level(t, 400, 20)
+            try:
+                engine.level.composite_layers = False
+                separate = self._level(t, 400, 20)
+            finally:
+                engine.level.composite_layers = True
+
+            composite = cast(CompositeTileLayers, level.drawn_layers[0])
+            self.assertEqual((400 * 18, 20 * 18), (composite.chunk_cache.chunk_width, composite.chunk_cache.chunk_height))
+            for level_ in [level, separate]:
+                level_.x_offset, level_.y_offset = 3000, 20
+                level_.render_offscreen(full=True)
+            self.assertEqual([(0, 0)], list(composite.chunk_cache.chunks))
+            self.assertEqual(pygame.image.tobytes(separate.offscreen_surface, "RGBA"), pygame.image.tobytes(level.offscreen_surface, "RGBA"))
@@ -0,0 +1,169 @@
+import io
+import pickle
+from pathlib import Path
+from unittest import TestCase
+from xml.etree import ElementTree
+
+import pygame
+from pygame import Rect
+
+from engine.tmx import TiledMap, TiledTileLayer, TiledObjectGroup, TiledObject, TiledTileset, TiledElement, F, convert_to_int
+
+
+class TestLoad(TestCase):
+    def setUp(self) -> None:
+        self.project_root = Path(__file__).parent.parent.parent.absolute()
+
+    @staticmethod
+    def _save_to_string(tiled_map: TiledMap) -> str:
+        stream = io.StringIO()
+        tiled_map._save(stream, 0)
+        return stream.getvalue()
+
+    def test_streaming_load_is_same_as_dom_load(self) -> None:
+        for path in ["side_scroller/level1.tmx", "side_scroller/level2.tmx", "top_down/test-level.tmx"]:
+            tmx_file = str(self.project_root / "assets" / path)
+            dom_map = TiledMap()
+            dom_map.load(tmx_file, streaming=False)
+            streamed_map = TiledMap()
+            streamed_map.load(tmx_file, streaming=True)
+
+            self.assertEqual(self._save_to_string(dom_map), self._save_to_string(streamed_map))
+            self.assertEqual(dom_map.properties, streamed_map.properties)
+            self.assertEqual(list(dom_map.layer_id_map.keys()), list(streamed_map.layer_id_map.keys()))
+            self.assertEqual(dom_map.new_gids, streamed_map.new_gids)
+            for dom_layer, streamed_layer in zip(dom_map.layers, streamed_map.layers):
+                if isinstance(dom_layer, TiledTileLayer):
+                    self.assertEqual(dom_layer.data, streamed_layer.data)
+                elif isinstance(dom_layer, TiledObjectGroup):
+                    self.assertEqual(
+                        [(o.id, o.name, o.gid, o.rect, dict(o.properties)) for o in dom_layer.objects],
+                        [(o.id, o.name, o.gid, o.rect, dict(o.properties)) for o in streamed_layer.objects])
+
+    def test_lazy_layers_decode_on_first_access(self) -> None:
+        tmx_file = str(self.project_root / "assets" / "side_scroller" / "level1.tmx")
+        eager_map = TiledMap()
+        eager_map.load(tmx_file)
+        lazy_map = TiledMap(lazy_layers=True)
+        lazy_map.load(tmx_file)
+
+        lazy_layers = [layer for layer in lazy_map.layers if isinstance(layer, TiledTileLayer)]
+        self.assertFalse(any(layer.decoded for layer in lazy_layers))
+        # nothing is allocated next to undecoded tiles
+        self.assertEqual([([], None)] * len(lazy_layers), [(layer._data, layer._array) for layer in lazy_layers])
+
+        for eager_layer, lazy_layer in zip(eager_map.layers, lazy_map.layers):
+            if isinstance(eager_layer, TiledTileLayer):
+                # asking if layer animates decodes it
+                self.assertEqual(eager_layer.animate_layer, lazy_layer.animate_layer)
+                self.assertTrue(lazy_layer.decoded)
+                self.assertEqual(
+                    [[eager_map.gid_to_original_gid_and_tile_flags(gid) for gid in row] for row in eager_layer.data],
+                    [[lazy_map.gid_to_original_gid_and_tile_flags(gid) for gid in row] for row in lazy_layer.data])
+
+    def test_lazy_layers_without_tiles_are_allocated_on_first_access(self) -> None:
+        tiled_map = TiledMap(lazy_layers=True)
+        tiled_map.width, tiled_map.height = 20, 10
+        layer = TiledTileLayer(tiled_map)
+        layer.width = 30
+        self.assertEqual(([], None), (layer._data, layer._array))
+
+        self.assertEqual(0, layer.data[5][25])
+        self.assertEqual((10, 30), (len(layer.data), len(layer.data[0])))
+        layer.height = 12
+        self.assertEqual([0] * 30, list(layer.data[11]))
+
+    def test_lazy_layers_save_untouched_payload(self) -> None:
+        tmx_file = str(self.project_root / "assets" / "side_scroller" / "level1.tmx")
+        eager_map = TiledMap()
+        eager_map.load(tmx_file)
+        lazy_map = TiledMap(lazy_layers=True)
+        lazy_map.load(tmx_file)
+
+        self.assertEqual(self._save_to_string(eager_map), self._save_to_string(lazy_map))
+        self.assertFalse(any(layer.decoded for layer in lazy_map.layers if isinstance(layer, TiledTileLayer)))
+
+    def test_parallel_image_loading_gives_same_images(self) -> None:
+        for path in ["side_scroller/level1.tmx", "top_down/test-level.tmx"]:
+            tmx_file = str(self.project_root / "assets" / path)
+            sequential_map = TiledMap()
+            sequential_map.load(tmx_file, parallel_images=False)
+            parallel_map = TiledMap()
+            parallel_map.load(tmx_file, parallel_images=True)
+
+            self.assertIsNone(parallel_map.image_loader)
+            self.assertEqual(len(sequential_map.images), len(parallel_map.images))
+            for sequential_image, parallel_image in zip(sequential_map.images, parallel_map.images):
+                if sequential_image is None:
+                    self.assertIsNone(parallel_image)
+                else:
+                    self.assertEqual(pygame.image.tobytes(sequential_image, "RGBA"), pygame.image.tobytes(parallel_image, "RGBA"))
+
+    def test_attribute_binders_are_built_once_per_class(self) -> None:
+        tmx_file = str(self.project_root / "assets" / "side_scroller" / "level1.tmx")
+        tiled_map = TiledMap()
+        tiled_map.load(tmx_file)
+
+        binders = TiledObject._attribute_binders()
+        self.assertIs(binders, TiledObject._attribute_binders())
+        self.assertIsNot(binders, TiledTileLayer._attribute_binders())
+        self.assertEqual((float, "x"), binders["x"])
+        # TiledTileset.tilecount is read only property
+        self.assertEqual("_tilecount", TiledTileset._attribute_binders()["tilecount"][1])
+
+        obj = TiledObject(next(layer for layer in tiled_map.layers if isinstance(layer, TiledObjectGroup)))
+        obj._parse_xml(ElementTree.fromstring("<object id=\"123\" name=\"door\" x=\"3.5\" y=\"4\" unknown=\"1\"/>"))
+        self.assertEqual((123, "door", 3, 4), (obj.id, obj.name, obj.x, obj.y))
+        self.assertIsNone(binders["unknown"])
+        self.assertFalse(hasattr(obj, "unknown"))
+
+    def test_attribute_binders_do_not_depend_on_first_instance(self) -> None:
+        class Element(TiledElement):
+            ATTRIBUTES = {"size": F(convert_to_int, True)}
+
+            def _tag_name(self) -> str: return "element"
+
+            @property
+            def size(self) -> int:
+                # not there until set - hasattr of the first instance would say element has no such attribute
+                return self._size
+
+            @size.setter
+            def size(self, size: int) -> None:
+                self._size = size
+
+        first = Element()
+        first._parse_xml(ElementTree.fromstring("<element size=\"3\"/>"))
+        second = Element()
+        second._parse_xml(ElementTree.fromstring("<element size=\"4\"/>"))
+        self.assertEqual((3, 4), (first.size, second.size))
+        self.assertEqual((convert_to_int, "size"), Element._attribute_binders()["size"])
+
+    def test_objects_and_tiles_are_compact(self) -> None:
+        tmx_file = str(self.project_root / "assets" / "side_scroller" / "level1.tmx")
+        tiled_map = TiledMap()
+        tiled_map.load(tmx_file)
+
+        objects = [obj for layer in tiled_map.layers if isinstance(layer, TiledObjectGroup) for obj in layer.objects]
+        obj = objects[0]
+        self.assertFalse(hasattr(obj, "__dict__"))
+        self.assertIsNone(obj._collisions)
+        self.assertIsNone(obj._next_rect)
+        self.assertEqual(Rect(0, 0, 0, 0), obj.next_rect)
+        self.assertEqual(set(), obj.collisions)
+
+        tiles = [tile for tileset in tiled_map.tilesets for tile in tileset.tiles.values()]
+        self.assertFalse(hasattr(tiles[0], "__dict__"))
+        self.assertTrue(any(tile._properties is None for tile in tiles))
+        self.assertNotIn("animated_id", next(tile for tile in tiles if tile._properties is None))
+
+        # property names are interned while parsing
+        keys = {}
+        for o in objects:
+            for key in dict.keys(o.properties):
+                self.assertIs(keys.setdefault(key, key), key)
+
+        restored = pickle.loads(pickle.dumps(tiled_map))
+        restored_obj = next(o for layer in restored.layers if isinstance(layer, TiledObjectGroup) for o in layer.objects)
+        self.assertEqual((obj.id, obj.name, obj.rect, dict(obj.properties)), (restored_obj.id, restored_obj.name, restored_obj.rect, dict(restored_obj.properties)))
+        self.assertIs(restored, restored_obj.map)
@@ -0,0 +1,112 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import pygame
+from pygame import Rect, Surface
+
+from engine.tmx import TiledMap, TiledObjectGroup, TiledObject
+from tests.fixtures import write_synthetic_map
+
+
+class TestObjectDrawing(TestCase):
+    @staticmethod
+    def _load(directory: str) -> TiledObjectGroup:
+        filename = os.path.join(directory, "map.tmx")
+        write_synthetic_map(filename, 60, 40, objects=300)
+        tiled_map = TiledMap()
+        tiled_map.load(filename)
+        return next(layer for layer in tiled_map.layers if isinstance(layer, TiledObjectGroup))
+
+    @staticmethod
+    def _one_by_one(layer: TiledObjectGroup, viewport: Rect, xo: int, yo: int) -> bytes:
+        surface = Surface((400, 300))
+        surface.fill((10, 20, 30))
+        surface.set_clip(viewport)
+        layer.map.animation_frame_gids(0.0)
+        for obj in layer.objects:
+            if obj.image and obj.visible:
+                surface.blit(obj.image, (obj.x + xo + viewport.x, obj.y + yo + viewport.y))
+        return pygame.image.tobytes(surface, "RGB")
+
+    @staticmethod
+    def _draw(layer: TiledObjectGroup, viewport: Rect, xo: int, yo: int) -> bytes:
+        surface = Surface((400, 300))
+        surface.fill((10, 20, 30))
+        surface.set_clip(viewport)
+        layer.draw(surface, viewport, xo, yo, 0.0)
+        return pygame.image.tobytes(surface, "RGB")
+
+    def assert_same_as_one_by_one(self, layer: TiledObjectGroup) -> None:
+        viewport = Rect(10, 20, 330, 250)
+        for xo, yo in [(0, 0), (-37, -55), (-700, -290), (53, 7)]:
+            self.assertEqual(self._one_by_one(layer, viewport, xo, yo), self._draw(layer, viewport, xo, yo), f"at {xo}, {yo}")
+
+    def test_only_objects_near_area_are_visited(self) -> None:
+        with TemporaryDirectory() as t:
+            layer = self._load(t)
+            self.assert_same_as_one_by_one(layer)
+
+            area = Rect(0, 0, 100, 100)
+            near = layer.objects_in(area)
+            self.assertLess(len(near), len(layer))
+            self.assertEqual([obj for obj in layer.objects if obj.rect.colliderect(area)], [obj for obj in near if obj.rect.colliderect(area)])
+
+            # moved, added and removed objects
+            far = next(obj for obj in layer.objects if obj not in near)
+            far.x = 50
+            far.y = 50
+            self.assertIn(far, layer.objects_in(area))
+            layer.remove_object(near[0])
+            self.assertNotIn(near[0], layer.objects_in(area))
+            layer.add_object(near[0])
+            self.assertEqual(near[0], layer.objects_in(area)[-1])
+            self.assert_same_as_one_by_one(layer)
+
+            # moved through its rect, in and out of view
+            obj = layer.objects_in(area)[0]
+            obj.rect.topleft = (700, 500)
+            self.assertNotIn(obj, layer.objects_in(area))
+            self.assertIn(obj, layer.objects_in(Rect(700, 500, 10, 10)))
+            far = next(obj for obj in layer.objects if obj not in layer.objects_in(area))
+            far.rect.update(20, 30, far.rect.width, far.rect.height)
+            self.assertIn(far, layer.objects_in(area))
+            far.rect.move_ip(2000, 0)
+            self.assertNotIn(far, layer.objects_in(area))
+            far.rect = Rect(40, 40, 18, 18)
+            self.assertIn(far, layer.objects_in(area))
+            far.rect.x = 5000
+            self.assertNotIn(far, layer.objects_in(area))
+            self.assert_same_as_one_by_one(layer)
+
+    def test_topdown_objects_are_drawn_by_y(self) -> None:
+        with TemporaryDirectory() as t:
+            layer = self._load(t)
+            area = Rect(0, 0, 300, 300)
+            objects = list(layer.objects_in(area))
+
+            layer.draworder = "topdown"
+            self.assertEqual(sorted(objects, key=lambda o: o.rect.bottom), layer.objects_in(area))
+
+            objects[0].y = 100
+            objects[1].y = 110
+            topdown = layer.objects_in(area)
+            self.assertEqual(sorted(objects, key=lambda o: o.rect.bottom), topdown)
+            self.assertLess(topdown.index(objects[0]), topdown.index(objects[1]))
+
+            objects[0].y = 120
+            topdown = layer.objects_in(area)
+            self.assertLess(topdown.index(objects[1]), topdown.index(objects[0]))
+
+    def test_object_created_in_code_is_indexed(self) -> None:
+        with TemporaryDirectory() as t:
+            layer = self._load(t)
+            layer.objects_in(Rect(0, 0, 10, 10))
+
+            obj = TiledObject(layer)
+            obj.x = 2000
+            obj.y = 20
+            obj.width = 18
+            obj.height = 18
+            layer.add_object(obj)
+            self.assertEqual([obj], layer.objects_in(Rect(2000, 20, 10, 10)))
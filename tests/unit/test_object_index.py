@@ -0,0 +1,122 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import pygame
+from pygame import Rect
+
+from editor.actions_controller import ActionsController
+from engine.level import Level
+from engine.tmx import TiledMap, TiledObjectGroup, TiledObject
+from tests.fixtures import write_synthetic_map
+
+
+class TestObjectIndex(TestCase):
+    @staticmethod
+    def _load(directory: str) -> tuple[TiledMap, TiledObjectGroup]:
+        filename = os.path.join(directory, "map.tmx")
+        write_synthetic_map(filename, 16, 16, objects=5)
+        tiled_map = TiledMap()
+        tiled_map.load(filename)
+        return tiled_map, next(layer for layer in tiled_map.layers if isinstance(layer, TiledObjectGroup))
+
+    def test_objects_are_found_by_name_and_type(self) -> None:
+        with TemporaryDirectory() as t:
+            tiled_map, layer = self._load(t)
+
+            self.assertEqual(4, layer["object_3"].id)
+            self.assertIs(layer["object_3"], tiled_map.object_by_name["object_3"])
+            self.assertEqual([1, 2, 3, 4, 5], [o.id for o in layer.objects_of_type("coin")])
+            self.assertNotIn("object_5", layer)
+            self.assertEqual([], layer.objects_of_type("door"))
+
+            obj = TiledObject(layer)
+            obj.name = "door"
+            obj.type = "door"
+            layer.add_object(obj)
+            self.assertIs(obj, layer["door"])
+            self.assertEqual([obj], layer.objects_of_type("door"))
+
+            obj.name = "gate"
+            self.assertNotIn("door", layer)
+            self.assertIs(obj, layer["gate"])
+
+            layer.remove_object(obj)
+            self.assertNotIn("gate", layer)
+            self.assertEqual([], layer.objects_of_type("door"))
+
+    def test_duplicate_names_resolve_to_first_object(self) -> None:
+        with TemporaryDirectory() as t:
+            _, layer = self._load(t)
+
+            layer["object_3"].name = "object_0"
+            self.assertEqual(1, layer["object_0"].id)
+            layer.remove_object(layer["object_0"])
+            self.assertEqual(4, layer["object_0"].id)
+
+    def test_level_objects_by_name_skip_objects_not_in_level(self) -> None:
+        pygame.display.init()
+        pygame.display.set_mode((1, 1))
+        with TemporaryDirectory() as t:
+            tiled_map, layer = self._load(t)
+            layer["object_0"].name = "player"
+            level = Level(Rect(0, 0, 160, 120), tiled_map)
+            first = layer["object_1"]
+            second = layer["object_2"]
+            second.name = "object_1"
+
+            self.assertIs(first, level.objects_by_name["object_1"])
+            del level.objects[first]
+            self.assertIs(second, level.objects_by_name["object_1"])
+            del level.objects[second]
+            with self.assertRaises(KeyError):
+                _ = level.objects_by_name["object_1"]
+
+    def test_editor_attribute_change_updates_index(self) -> None:
+        with TemporaryDirectory() as t:
+            tiled_map, layer = self._load(t)
+            actions_controller = ActionsController()
+            actions_controller.tiled_map = tiled_map
+
+            obj = layer["object_2"]
+            actions_controller.update_element_attribute(obj, "name", "key")
+            self.assertIs(obj, layer["key"])
+            self.assertNotIn("object_2", layer)
+
+            actions_controller.undo()
+            self.assertIs(obj, layer["object_2"])
+            self.assertNotIn("key", layer)
+
+            actions_controller.redo()
+            self.assertIs(obj, layer["key"])
+
+            actions_controller.delete_object(obj)
+            self.assertNotIn("key", layer)
+            actions_controller.undo()
+            self.assertIs(obj, layer["key"])
+
+    def test_ids_come_from_running_counters(self) -> None:
+        with TemporaryDirectory() as t:
+            tiled_map, layer = self._load(t)
+            self.assertEqual(6, tiled_map.nextobjectid)
+
+            added = [TiledObject(layer) for _ in range(3)]
+            for obj in added:
+                layer.add_object(obj)
+            self.assertEqual([6, 7, 8], [obj.id for obj in added])
+            self.assertEqual(9, tiled_map.nextobjectid)
+
+            next_layer_id = tiled_map.nextlayerid
+            new_layer = TiledObjectGroup(tiled_map)
+            new_layer.name = "more_objects"
+            tiled_map.add_layer(new_layer)
+            self.assertEqual(next_layer_id, new_layer.id)
+            self.assertEqual(next_layer_id + 1, tiled_map.nextlayerid)
+
+            obj = TiledObject(new_layer)
+            obj.name = "lamp"
+            new_layer.add_object(obj)
+            self.assertEqual(9, obj.id)
+            self.assertIs(obj, tiled_map.object_by_name["lamp"])
+            self.assertIs(layer["object_0"], tiled_map.object_by_name["object_0"])
+            self.assertEqual([layer, new_layer], tiled_map.object_by_name.maps)
@@ -0,0 +1,70 @@
+import os
+from tempfile import TemporaryDirectory
+from typing import Optional
+from unittest import TestCase
+from unittest.mock import patch
+
+import pygame
+from pygame import Rect, Surface
+
+from engine.game import Game, open_display
+from engine.game_context import GameContext
+from engine.level import Level
+from engine.tmx import TiledMap
+from tests.fixtures import write_synthetic_map
+
+
+class TestScaledScreen(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        pygame.display.init()
+
+    def test_screen_is_scaled_to_window(self) -> None:
+        screen, window = open_display((400, 300), scale=2)
+        self.assertEqual((200, 150), screen.get_size())
+        self.assertEqual((400, 300), window.get_size())
+        self.assertIs(pygame.display.get_surface(), window)
+
+        with TemporaryDirectory() as t, patch("engine.level.time.time", return_value=1.0):
+            filename = os.path.join(t, "map.tmx")
+            write_synthetic_map(filename, 60, 40, density=0.3, objects=30, layer_names=["background", "main"])
+            tiled_map = TiledMap()
+            tiled_map.load(filename)
+            tiled_map.object_by_name["object_0"].name = "player"
+            level = Level(screen.get_rect(), tiled_map)
+            game_context = GameContext({"level": level})
+            game_context.set_level(level)
+            game = Game(screen, game_context, 60, dirty_rects=True, window=window)
+
+            label = Surface((20, 10))
+            label.fill((200, 100, 50))
+            game.draw_after_map = lambda surface: [surface.blit(label, (150, 0))]
+
+            def draw_frame() -> Optional[list[Rect]]:
+                with patch("pygame.display.flip") as flip, patch("pygame.display.update") as update:
+                    game.draw_dirty_rects()
+                    return None if flip.called else update.call_args.args[0]
+
+            def assert_window_is_scaled_screen() -> None:
+                scaled = pygame.transform.scale(screen, window.get_size())
+                self.assertEqual(pygame.image.tobytes(scaled, "RGB"), pygame.image.tobytes(window, "RGB"))
+
+            self.assertIsNone(draw_frame())
+            assert_window_is_scaled_screen()
+
+            # only what changed is scaled, in window's pixels
+            self.assertEqual([Rect(300, 0, 40, 20)], draw_frame())
+            level.x_offset += 3
+            self.assertIn(Rect(0, 0, 400, 300), draw_frame())
+            assert_window_is_scaled_screen()
+
+        self.assertRaises(ValueError, Game, Surface((150, 150)), game_context, 60, window=window)
+
+    def test_window_is_whole_multiple_of_screen(self) -> None:
+        screen, window = open_display((1366, 768), scale=3)
+        self.assertEqual((455, 256), screen.get_size())
+        self.assertEqual((1365, 768), window.get_size())
+
+        game = Game(screen, GameContext({}), 60, window=window)
+        self.assertEqual(3, game.scale)
@@ -0,0 +1,157 @@
+import io
+import os
+import shutil
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from engine.tmx import TiledMap, TiledObjectGroup, TiledTileLayer, tileset_registry
+from engine.tmx_cache import load_map
+
+
+MAP_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.11" tiledversion="1.11.0" orientation="orthogonal" renderorder="right-down" width="2" height="1" tilewidth="16" tileheight="15" infinite="0" nextlayerid="2" nextobjectid="1">
+{tilesets}
+ <layer id="1" name="main" width="2" height="1">
+  <data encoding="csv">
+{gid},0
+</data>
+ </layer>
+</map>
+"""
+
+
+class TestSharedTilesets(TestCase):
+    def setUp(self) -> None:
+        self.project_root = Path(__file__).parent.parent.parent.absolute()
+        tileset_registry.clear()
+
+    def tearDown(self) -> None:
+        tileset_registry.clear()
+
+    @staticmethod
+    def _save_to_string(tiled_map: TiledMap) -> str:
+        stream = io.StringIO()
+        tiled_map._save(stream, 0)
+        return stream.getvalue()
+
+    @staticmethod
+    def _animations(tiled_map: TiledMap) -> dict[int, list[tuple[int, int]]]:
+        return {gid: [(frame.tileid, frame.duration) for frame in animations.frames] for gid, animations in tiled_map.tile_animations.items()}
+
+    @staticmethod
+    def _tile_animations(tiled_map: TiledMap) -> dict[int, list[tuple[int, int]]]:
+        return {
+            tile.id + ts.firstgid: [(frame.tileid, frame.duration) for frame in tile.animations.frames]
+            for ts in tiled_map.tilesets for tile in ts.tiles.values() if tile.animations is not None
+        }
+
+    def _write_map(self, directory: Path, name: str, tilesets: list[str]) -> str:
+        firstgid = 1
+        tileset_elements = []
+        for tileset in tilesets:
+            tileset_elements.append(f' <tileset firstgid="{firstgid}" source="tilemap/{tileset}"/>')
+            firstgid += 256 if tileset == "tileb.tsx" else 128
+        filename = str(directory / name)
+        with open(filename, "w") as f:
+            f.write(MAP_TEMPLATE.format(tilesets="\n".join(tileset_elements), gid=firstgid - 1))
+        return filename
+
+    def test_maps_share_tileset_data(self) -> None:
+        for filename in ["assets/side_scroller/level1.tmx", "assets/top_down/test-level.tmx"]:
+            tiled_map = TiledMap()
+            tiled_map.load(str(self.project_root / filename))
+            first_shared_map = TiledMap(shared_tilesets=True)
+            first_shared_map.load(str(self.project_root / filename))
+            second_shared_map = TiledMap(shared_tilesets=True)
+            second_shared_map.load(str(self.project_root / filename), parallel_images=False)
+
+            self.assertEqual(self._save_to_string(tiled_map), self._save_to_string(first_shared_map))
+            self.assertEqual(self._save_to_string(tiled_map), self._save_to_string(second_shared_map))
+            self.assertEqual(self._animations(tiled_map), self._animations(second_shared_map))
+            for ts, shared_ts in zip(first_shared_map.tilesets, second_shared_map.tilesets):
+                self.assertIs(ts.image_surface, shared_ts.image_surface)
+                self.assertIsNot(ts.tiles, shared_ts.tiles)
+                self.assertIs(ts.tile_images(), shared_ts.tile_images())
+                self.assertIs(ts.tile_images()[0], second_shared_map.images[shared_ts.firstgid])
+
+    def test_maps_have_own_tiles(self) -> None:
+        filename = str(self.project_root / "assets" / "side_scroller" / "level1.tmx")
+        first_map = TiledMap(shared_tilesets=True)
+        first_map.load(filename)
+        second_map = TiledMap(shared_tilesets=True)
+        second_map.load(filename)
+
+        gid = next(gid for gid, tile in first_map.tiles.items() if "on_collision" in tile)
+        self.assertIsNot(first_map.tiles[gid], second_map.tiles[gid])
+        self.assertIsNot(first_map.tiles[gid].properties, second_map.tiles[gid].properties)
+        on_collision = second_map.tiles[gid]["on_collision"]
+        self.assertEqual(first_map.tiles[gid]["on_collision"], on_collision)
+        first_map.tiles[gid].properties["x"] = 1
+        self.assertNotIn("x", second_map.tiles[gid])
+
+        # object properties fall back to its tile's - writing them changes only that map's tile
+        obj = next(obj for layer in first_map.layers if isinstance(layer, TiledObjectGroup) for obj in layer.objects)
+        obj.gid = gid
+        obj.properties["on_collision"] = "changed"
+        self.assertEqual(on_collision, second_map.tiles[gid]["on_collision"])
+        shared = first_map.tilesets[0].shared
+        self.assertEqual(on_collision, shared.tiles[gid - shared.firstgid]["on_collision"])
+
+    def test_maps_keep_own_firstgid(self) -> None:
+        with TemporaryDirectory() as t:
+            shutil.copytree(self.project_root / "assets" / "top_down" / "tilemap", Path(t) / "tilemap")
+            first_filename = self._write_map(Path(t), "first.tmx", ["tileb.tsx"])
+            second_filename = self._write_map(Path(t), "second.tmx", ["objects.tsx", "tileb.tsx"])
+
+            first_map = TiledMap(shared_tilesets=True)
+            first_map.load(first_filename)
+            second_map = TiledMap(shared_tilesets=True)
+            second_map.load(second_filename)
+            expected_map = TiledMap()
+            expected_map.load(second_filename)
+            expected_first_map = TiledMap()
+            expected_first_map.load(first_filename)
+
+            self.assertIs(first_map.tilesets[0].image_surface, second_map.tilesets[1].image_surface)
+            self.assertEqual([1, 129], [ts.firstgid for ts in second_map.tilesets])
+            self.assertTrue(len(expected_map.tile_animations) > 0)
+            self.assertEqual(self._animations(expected_map), self._animations(second_map))
+            self.assertTrue(len(self._tile_animations(expected_map)) > 0)
+            self.assertEqual(self._tile_animations(expected_map), self._tile_animations(second_map))
+            self.assertEqual(self._tile_animations(expected_first_map), self._tile_animations(first_map))
+            self.assertEqual(self._save_to_string(expected_map), self._save_to_string(second_map))
+
+    def test_animation_elements_are_keyed_by_gid(self) -> None:
+        with TemporaryDirectory() as t:
+            shutil.copytree(self.project_root / "assets" / "top_down" / "tilemap", Path(t) / "tilemap")
+            filename = os.path.join(t, "map.tmx")
+            # tile 230 of tileb.tsx has <animation> of tiles 230 and 246
+            with open(filename, "w") as f:
+                f.write(MAP_TEMPLATE.format(
+                    tilesets=' <tileset firstgid="1" source="tilemap/objects.tsx"/>\n <tileset firstgid="129" source="tilemap/tileb.tsx"/>',
+                    gid=129 + 230))
+            tiled_map = TiledMap()
+            tiled_map.load(filename)
+
+            self.assertEqual([129 + 230], list(tiled_map.tile_animations))
+            self.assertEqual([129 + 230, 129 + 246], [frame.tileid for frame in tiled_map.tile_animations[129 + 230].frames])
+            layer = next(layer for layer in tiled_map.layers if isinstance(layer, TiledTileLayer))
+            self.assertTrue(layer.animate_layer)
+            self.assertEqual([(0, 0, 129 + 230)], list(layer.animated_cells(layer.bounds)))
+
+    def test_changed_tileset_is_loaded_again(self) -> None:
+        with TemporaryDirectory() as t:
+            shutil.copytree(self.project_root / "assets" / "side_scroller", Path(t) / "side_scroller")
+            tmx_file = str(Path(t) / "side_scroller" / "level1.tmx")
+            tsx_file = Path(t) / "side_scroller" / "tilemap" / "tileset-tiles.tsx"
+
+            first_map = load_map(tmx_file, shared_tilesets=True)
+            second_map = load_map(tmx_file, shared_tilesets=True)
+            self.assertIs(first_map.tilesets[0].image_surface, second_map.tilesets[0].image_surface)
+
+            stat = os.stat(tsx_file)
+            os.utime(tsx_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            third_map = load_map(tmx_file, shared_tilesets=True)
+            self.assertIsNot(first_map.tilesets[0].image_surface, third_map.tilesets[0].image_surface)
+            self.assertEqual(self._save_to_string(first_map), self._save_to_string(third_map))
@@ -0,0 +1,51 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from engine.tmx import TiledMap
+from tests.fixtures import write_synthetic_map
+
+
+class TestTilesetLookups(TestCase):
+    @staticmethod
+    def _load(directory: str) -> TiledMap:
+        filename = os.path.join(directory, "map.tmx")
+        write_synthetic_map(filename, 16, 16)
+        tiled_map = TiledMap()
+        tiled_map.load(filename)
+        return tiled_map
+
+    def test_gid_resolves_to_tileset_and_tile_id(self) -> None:
+        with TemporaryDirectory() as t:
+            tiled_map = self._load(t)
+            tiles, characters = tiled_map.tilesets
+
+            self.assertEqual([1, 181], tiled_map.tilesets_firstgids)
+            self.assertEqual((tiles, 0), tiled_map.tileset_for_gid(1))
+            self.assertEqual((tiles, 179), tiled_map.tileset_for_gid(180))
+            self.assertEqual((characters, 0), tiled_map.tileset_for_gid(181))
+            self.assertEqual((characters, characters.tilecount - 1), tiled_map.tileset_for_gid(tiled_map.maxgid))
+            self.assertIsNone(tiled_map.tileset_for_gid(0))
+            self.assertIsNone(tiled_map.tileset_for_gid(tiled_map.maxgid + 1))
+
+            self.assertIs(characters.tiles[3], tiled_map.tiles[184])
+            for gid, animations in characters.tile_animations.items():
+                self.assertIs(animations, tiled_map.tile_animations[gid])
+
+    def test_lookups_follow_added_and_removed_tilesets(self) -> None:
+        with TemporaryDirectory() as t:
+            tiled_map = self._load(t)
+            tiles, characters = tiled_map.tilesets
+            animated_gids = set(characters.tile_animations)
+
+            tiled_map.remove_tileset(characters)
+            self.assertEqual([1], tiled_map.tilesets_firstgids)
+            self.assertIsNone(tiled_map.tileset_for_gid(181))
+            self.assertNotIn(181, tiled_map.tiles)
+            self.assertFalse(animated_gids & set(tiled_map.tile_animations))
+            self.assertIs(tiles.tiles[0], tiled_map.tiles[1])
+
+            tiled_map.add_tileset(characters)
+            self.assertEqual([1, characters.firstgid], tiled_map.tilesets_firstgids)
+            self.assertEqual((characters, 2), tiled_map.tileset_for_gid(characters.firstgid + 2))
+            self.assertIs(characters.tiles[2], tiled_map.tiles[characters.firstgid + 2])
@@ -0,0 +1,113 @@
+import io
+import os
+import shutil
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from engine.tmx import TiledMap, TiledTileLayer, TiledObjectGroup
+from engine.tmx_cache import load_map, read_cache, write_cache, cache_filename, _file_key
+from tests.unit import COMPACT_LAYERS_OPTIONS
+
+
+class TestTmxCache(TestCase):
+    def setUp(self) -> None:
+        self.project_root = Path(__file__).parent.parent.parent.absolute()
+
+    @staticmethod
+    def _save_to_string(tiled_map: TiledMap) -> str:
+        stream = io.StringIO()
+        tiled_map._save(stream, 0)
+        return stream.getvalue()
+
+    def _assert_same_maps(self, expected: TiledMap, actual: TiledMap) -> None:
+        self.assertEqual(self._save_to_string(expected), self._save_to_string(actual))
+        self.assertEqual(expected.new_gids, actual.new_gids)
+        self.assertEqual(len(expected.images), len(actual.images))
+        self.assertEqual(list(expected.tiles.keys()), list(actual.tiles.keys()))
+        self.assertEqual(dict(expected.tile_animations).keys(), dict(actual.tile_animations).keys())
+        for expected_layer, actual_layer in zip(expected.layers, actual.layers):
+            if isinstance(expected_layer, TiledTileLayer):
+                self.assertEqual(expected_layer.data, list(actual_layer.data.tolist() if actual_layer.compact else actual_layer.data))
+                self.assertEqual(expected_layer.animate_layer, actual_layer.animate_layer)
+            elif isinstance(expected_layer, TiledObjectGroup):
+                self.assertEqual(
+                    [(o.id, o.name, o.gid, o.rect, dict(o.properties)) for o in expected_layer.objects],
+                    [(o.id, o.name, o.gid, o.rect, dict(o.properties)) for o in actual_layer.objects])
+
+    def test_cache_is_written_and_used(self) -> None:
+        with TemporaryDirectory() as t:
+            shutil.copytree(self.project_root / "assets" / "side_scroller", Path(t) / "side_scroller")
+            tmx_file = str(Path(t) / "side_scroller" / "level1.tmx")
+
+            self.assertIsNone(read_cache(tmx_file))
+            xml_map = load_map(tmx_file)
+            self.assertTrue(os.path.exists(cache_filename(tmx_file)))
+
+            for compact_layers in COMPACT_LAYERS_OPTIONS:
+                cached_map = read_cache(tmx_file, compact_layers=compact_layers)
+                self.assertIsNotNone(cached_map)
+                self._assert_same_maps(xml_map, cached_map)
+
+            tile = next(tile for tile in xml_map.tiles.values() if "colliders" in tile.properties)
+            cached_tile = read_cache(tmx_file).tiles[tile.id + tile.tiledset.firstgid]
+            self.assertEqual([o.rect for o in tile.properties["colliders"]], [o.rect for o in cached_tile.properties["colliders"]])
+
+    def test_lazy_layers_are_not_decoded_to_write_or_read_cache(self) -> None:
+        with TemporaryDirectory() as t:
+            shutil.copytree(self.project_root / "assets" / "side_scroller", Path(t) / "side_scroller")
+            tmx_file = str(Path(t) / "side_scroller" / "level1.tmx")
+            xml_map = TiledMap()
+            xml_map.load(tmx_file)
+
+            lazy_map = load_map(tmx_file, lazy_layers=True)
+            self.assertFalse(any(layer.decoded for layer in lazy_map.layers if isinstance(layer, TiledTileLayer)))
+
+            for decoded_layers in [0, 2]:
+                # layers decoded before cache was written are stored as arrays, others keep their payload
+                for layer in [layer for layer in lazy_map.layers if isinstance(layer, TiledTileLayer)][:decoded_layers]:
+                    self.assertIsNotNone(layer.data)
+                write_cache(lazy_map)
+
+                for compact_layers in COMPACT_LAYERS_OPTIONS:
+                    for lazy_layers in [False, True]:
+                        cached_map = read_cache(tmx_file, compact_layers=compact_layers, lazy_layers=lazy_layers)
+                        layers = [layer for layer in cached_map.layers if isinstance(layer, TiledTileLayer)]
+                        self.assertEqual([not lazy_layers] * len(layers), [layer.decoded for layer in layers])
+                        # transformed gids are registered in order layers are decoded - only original gids are the same
+                        self.assertEqual(self._save_to_string(xml_map), self._save_to_string(cached_map))
+                        for xml_layer, layer in zip([layer for layer in xml_map.layers if isinstance(layer, TiledTileLayer)], layers):
+                            self.assertEqual(
+                                [[xml_map.gid_to_original_gid_and_tile_flags(gid) for gid in row] for row in xml_layer.data],
+                                [[cached_map.gid_to_original_gid_and_tile_flags(gid) for gid in row] for row in layer.data])
+                            self.assertEqual(xml_layer.animate_layer, layer.animate_layer)
+
+    def test_touched_files_are_hashed_once(self) -> None:
+        with TemporaryDirectory() as t:
+            shutil.copytree(self.project_root / "assets" / "side_scroller", Path(t) / "side_scroller")
+            tmx_file = str(Path(t) / "side_scroller" / "level1.tmx")
+            tsx_file = Path(t) / "side_scroller" / "tilemap" / "tileset-tiles.tsx"
+
+            xml_map = load_map(tmx_file)
+            os.utime(tsx_file, ns=(0, 0))
+            with patch("engine.tmx_cache._file_key", side_effect=_file_key) as file_key:
+                for compact_layers in COMPACT_LAYERS_OPTIONS:
+                    self._assert_same_maps(xml_map, read_cache(tmx_file, compact_layers=compact_layers))
+                self.assertEqual(1, file_key.call_count)
+
+    def test_stale_cache_is_not_used(self) -> None:
+        with TemporaryDirectory() as t:
+            shutil.copytree(self.project_root / "assets" / "side_scroller", Path(t) / "side_scroller")
+            tmx_file = str(Path(t) / "side_scroller" / "level1.tmx")
+            tsx_file = Path(t) / "side_scroller" / "tilemap" / "tileset-tiles.tsx"
+
+            load_map(tmx_file)
+            os.utime(tsx_file, ns=(0, 0))
+            self.assertIsNotNone(read_cache(tmx_file))
+
+            tsx_file.write_text(tsx_file.read_text().replace("<tileset ", "<tileset  "))
+            self.assertIsNone(read_cache(tmx_file))
+
+            load_map(tmx_file)
+            self.assertIsNotNone(read_cache(tmx_file))
@@ -0,0 +1,98 @@
+import io
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from engine.tmx import TiledMap, TiledTileLayer, GID_TRANS_FLIP_HORIZONTALLY, GID_TRANS_FLIP_VERTICALLY, GID_TRANS_ROTATE
+from tests.unit import COMPACT_LAYERS_OPTIONS
+
+
+MAP_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.11" tiledversion="1.11.0" orientation="orthogonal" renderorder="right-down" width="{width}" height="2" tilewidth="18" tileheight="18" infinite="0" nextlayerid="3" nextobjectid="1">
+ <tileset firstgid="1" source="{tileset}"/>
+ <layer id="1" name="first" width="{width}" height="2">
+  <data encoding="csv">
+{first}
+</data>
+ </layer>
+ <layer id="2" name="second" width="{width}" height="2">
+  <data encoding="csv">
+{second}
+</data>
+ </layer>
+</map>
+"""
+
+
+class TestTransformedGids(TestCase):
+    def setUp(self) -> None:
+        self.project_root = Path(__file__).parent.parent.parent.absolute()
+        self.tileset = self.project_root / "assets" / "side_scroller" / "tilemap" / "tileset-tiles.tsx"
+
+    @staticmethod
+    def _save_to_string(tiled_map: TiledMap) -> str:
+        stream = io.StringIO()
+        tiled_map._save(stream, 0)
+        return stream.getvalue()
+
+    def _load(self, directory: str, first: list[int], second: list[int], compact_layers: bool) -> TiledMap:
+        filename = str(Path(directory) / "map.tmx")
+        with open(filename, "w") as f:
+            f.write(MAP_TEMPLATE.format(
+                tileset=self.tileset, width=len(first) // 2,
+                first=",".join(str(gid) for gid in first), second=",".join(str(gid) for gid in second)))
+        tiled_map = TiledMap(compact_layers=compact_layers)
+        tiled_map.load(filename)
+        return tiled_map
+
+    def test_transformed_gids_are_interned(self) -> None:
+        first = [5 | GID_TRANS_FLIP_HORIZONTALLY] * 6 + [6, 180, 5 | GID_TRANS_FLIP_VERTICALLY, 5 | GID_TRANS_FLIP_HORIZONTALLY, 0, 180 | GID_TRANS_ROTATE]
+        second = [5 | GID_TRANS_FLIP_VERTICALLY, 180 | GID_TRANS_ROTATE] * 6
+
+        with TemporaryDirectory() as t:
+            for compact_layers in COMPACT_LAYERS_OPTIONS:
+                tiled_map = self._load(t, first, second, compact_layers)
+
+                self.assertEqual(180 + 3, tiled_map.maxgid)
+                self.assertEqual(3, len(tiled_map.new_gids))
+                self.assertEqual(tiled_map.maxgid + 1, len(tiled_map.images))
+                # Last tile of the tileset keeps its own image
+                self.assertEqual(tiled_map.tilesets[0].tile_images()[179], tiled_map.images[180])
+                self.assertNotIn(180, tiled_map.new_gids)
+
+                layers = [layer for layer in tiled_map.layers if isinstance(layer, TiledTileLayer)]
+                for raw_gids, layer in zip([first, second], layers):
+                    gids = [gid for row in layer.data for gid in row]
+                    self.assertEqual(raw_gids, [tiled_map.gid_to_original_gid_and_tile_flags(gid) for gid in gids])
+                    self.assertTrue(all(tiled_map.images[gid] is not None for gid in gids if gid > 0))
+                self.assertEqual(layers[0].data[0][0], layers[0].data[1][3])
+
+    def test_interned_gids_save_the_same(self) -> None:
+        first = [5 | GID_TRANS_FLIP_HORIZONTALLY, 5 | GID_TRANS_FLIP_HORIZONTALLY, 7]
+        second = [7 | GID_TRANS_FLIP_HORIZONTALLY | GID_TRANS_FLIP_VERTICALLY, 0, 5 | GID_TRANS_FLIP_HORIZONTALLY]
+
+        with TemporaryDirectory() as t:
+            saved = []
+            for compact_layers in COMPACT_LAYERS_OPTIONS:
+                tiled_map = self._load(t, first * 2, second * 2, compact_layers)
+                saved.append(self._save_to_string(tiled_map))
+
+            with open(Path(t) / "map.tmx", "w") as f:
+                f.write(saved[0])
+            reloaded_map = TiledMap()
+            reloaded_map.load(str(Path(t) / "map.tmx"))
+
+            self.assertEqual([saved[0]] * len(saved), saved)
+            self.assertEqual(saved[0], self._save_to_string(reloaded_map))
+
+    def test_save_without_numpy(self) -> None:
+        first = [5 | GID_TRANS_FLIP_HORIZONTALLY, 180, 7 | GID_TRANS_ROTATE]
+        second = [0, 5 | GID_TRANS_FLIP_HORIZONTALLY, 7]
+
+        with TemporaryDirectory() as t:
+            expected = self._save_to_string(self._load(t, first * 2, second * 2, False))
+            with patch("engine.tmx.numpy", None):
+                tiled_map = self._load(t, first * 2, second * 2, False)
+                self.assertIsInstance(tiled_map.original_gid_table(), list)
+                self.assertEqual(expected, self._save_to_string(tiled_map))